@@ -17,6 +17,8 @@
 
 import asyncio
 import logging
+import time
+from contextlib import nullcontext
 from typing import (
     Any,
     AsyncIterable,
@@ -28,6 +30,7 @@ from typing import (
     List,
     MutableMapping,
     Optional,
+    Sequence,
     Tuple,
     TypeVar,
     Union,
@@ -39,12 +42,24 @@ from ..helpers.actions import (
     _TYPE_BULK_ACTION_BODY,
     _TYPE_BULK_ACTION_HEADER,
     _TYPE_BULK_ACTION_HEADER_AND_BODY,
+    ActionCoalescer,
+    AdaptiveChunkSize,
+    BulkCheckpoint,
+    BulkChunkStats,
+    BulkErrors,
+    ScanCursor,
     _ActionChunker,
+    _bulk_item_slices,
+    _check_shards,
+    _chunk_stats,
+    _pit_sort,
+    _pop_transport_kwargs,
     _process_bulk_chunk_error,
     _process_bulk_chunk_success,
+    _reopened_search_after,
+    _slice_scan_kwargs,
     expand_action,
 )
-from ..helpers.errors import ScanError
 from ..serializer import Serializer
 from .client import AsyncElasticsearch  # noqa
 
@@ -55,9 +70,10 @@ T = TypeVar("T")
 
 async def _chunk_actions(
     actions: AsyncIterable[_TYPE_BULK_ACTION_HEADER_AND_BODY],
-    chunk_size: int,
+    chunk_size: Union[int, AdaptiveChunkSize],
     max_chunk_bytes: int,
     serializer: Serializer,
+    max_chunk_compressed_bytes: Optional[int] = None,
 ) -> AsyncIterable[
     Tuple[
         List[
@@ -73,13 +89,22 @@ async def _chunk_actions(
     Split actions into chunks by number or size, serialize them into strings in
     the process.
     """
+    adaptive = None
+    if isinstance(chunk_size, AdaptiveChunkSize):
+        adaptive, chunk_size = chunk_size, chunk_size.chunk_size
     chunker = _ActionChunker(
-        chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, serializer=serializer
+        chunk_size=chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        serializer=serializer,
+        max_chunk_compressed_bytes=max_chunk_compressed_bytes,
     )
     async for action, data in actions:
         ret = chunker.feed(action, data)
         if ret:
             yield ret
+            # the chunk has been sent by now, pick up any adjustment
+            if adaptive:
+                chunker.chunk_size = adaptive.chunk_size
     ret = chunker.flush()
     if ret:
         yield ret
@@ -98,6 +123,10 @@ async def _process_bulk_chunk(
     raise_on_error: bool = True,
     ignore_status: Union[int, Collection[int]] = (),
     *args: Any,
+    adaptive_chunk_size: Optional[AdaptiveChunkSize] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    serialization_time: float = 0.0,
+    attempt: int = 0,
     **kwargs: Any,
 ) -> AsyncIterable[Tuple[bool, Dict[str, Any]]]:
     """
@@ -106,10 +135,26 @@ async def _process_bulk_chunk(
     if isinstance(ignore_status, int):
         ignore_status = (ignore_status,)
 
+    start = time.monotonic()
     try:
         # send the actual request
         resp = await client.bulk(*args, operations=bulk_actions, **kwargs)  # type: ignore[arg-type]
     except ApiError as e:
+        if adaptive_chunk_size is not None:
+            adaptive_chunk_size.record_error(
+                len(bulk_data), time.monotonic() - start, e
+            )
+        if on_chunk_complete is not None:
+            on_chunk_complete(
+                _chunk_stats(
+                    bulk_actions,
+                    len(bulk_data),
+                    serialization_time,
+                    time.monotonic() - start,
+                    attempt,
+                    error=e,
+                )
+            )
         gen = _process_bulk_chunk_error(
             error=e,
             bulk_data=bulk_data,
@@ -118,6 +163,21 @@ async def _process_bulk_chunk(
             raise_on_error=raise_on_error,
         )
     else:
+        if adaptive_chunk_size is not None:
+            adaptive_chunk_size.record_response(
+                len(bulk_data), time.monotonic() - start, resp.body
+            )
+        if on_chunk_complete is not None:
+            on_chunk_complete(
+                _chunk_stats(
+                    bulk_actions,
+                    len(bulk_data),
+                    serialization_time,
+                    time.monotonic() - start,
+                    attempt,
+                    resp=resp.body,
+                )
+            )
         gen = _process_bulk_chunk_success(
             resp=resp.body,
             bulk_data=bulk_data,
@@ -144,6 +204,66 @@ def aiter(x: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
     return f().__aiter__()
 
 
+async def _atimed(iterable: AsyncIterable[T]) -> AsyncIterable[Tuple[float, T]]:
+    """
+    Pair the items of an async iterable with the number of seconds it took to
+    produce each of them.
+    """
+    iterator = iterable.__aiter__()
+    while True:
+        start = time.perf_counter()
+        try:
+            item = await iterator.__anext__()
+        except StopAsyncIteration:
+            return
+        yield time.perf_counter() - start, item
+
+
+async def _aprefetch(iterable: AsyncIterable[T], prefetch: int) -> AsyncIterable[T]:
+    """
+    Iterate over ``iterable`` from a background task, up to ``prefetch``
+    items ahead of the consumer, see :func:`~elasticsearch.helpers.actions._prefetch`.
+    """
+    # the items, then whether the iterable is exhausted along with the
+    # exception it raised if any
+    queue: asyncio.Queue[Tuple[bool, Any]] = asyncio.Queue(prefetch)
+    stopped = False
+
+    async def produce() -> None:
+        iterator = iterable.__aiter__()
+        error = None
+        try:
+            async for item in iterator:
+                await queue.put((False, item))
+                if stopped:
+                    break
+        except Exception as e:
+            error = e
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            await queue.put((True, error))
+
+    task = asyncio.ensure_future(produce())
+    done = False
+    try:
+        while True:
+            done, item = await queue.get()
+            if done:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        if not done:
+            stopped = True
+            # unblock the producer until it closes the iterable
+            while not (await queue.get())[0]:
+                pass
+        await task
+
+
 async def azip(
     *iterables: Union[Iterable[T], AsyncIterable[T]]
 ) -> AsyncIterable[Tuple[T, ...]]:
@@ -161,7 +281,7 @@ async def azip(
 async def async_streaming_bulk(
     client: AsyncElasticsearch,
     actions: Union[Iterable[_TYPE_BULK_ACTION], AsyncIterable[_TYPE_BULK_ACTION]],
-    chunk_size: int = 500,
+    chunk_size: Union[int, AdaptiveChunkSize] = 500,
     max_chunk_bytes: int = 100 * 1024 * 1024,
     raise_on_error: bool = True,
     expand_action_callback: Callable[
@@ -174,6 +294,12 @@ async def async_streaming_bulk(
     yield_ok: bool = True,
     ignore_status: Union[int, Collection[int]] = (),
     retry_on_status: Union[int, Collection[int]] = (429,),
+    max_concurrency: int = 1,
+    ordered: bool = True,
+    max_chunk_compressed_bytes: Optional[int] = None,
+    checkpoint: Optional[BulkCheckpoint] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    coalesce: Optional[ActionCoalescer] = None,
     *args: Any,
     **kwargs: Any,
 ) -> AsyncIterable[Tuple[bool, Dict[str, Any]]]:
@@ -193,7 +319,9 @@ async def async_streaming_bulk(
 
     :arg client: instance of :class:`~elasticsearch.AsyncElasticsearch` to use
     :arg actions: iterable or async iterable containing the actions to be executed
-    :arg chunk_size: number of docs in one chunk sent to es (default: 500)
+    :arg chunk_size: number of docs in one chunk sent to es (default: 500), or
+        an :class:`~elasticsearch.helpers.AdaptiveChunkSize` instance to adjust
+        it while the actions are being sent
     :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
     :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
         from the execution of the last chunk when some occur. By default we raise.
@@ -213,8 +341,33 @@ async def async_streaming_bulk(
     :arg max_backoff: maximum number of seconds a retry will wait
     :arg yield_ok: if set to False will skip successful documents in the output
     :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg max_concurrency: maximum number of chunks sent to elasticsearch at the
+        same time through the client (default: 1). Each chunk is retried on
+        its own and its results are yielded once the whole chunk is done.
+    :arg ordered: with ``max_concurrency`` above 1, set to ``False`` to yield
+        the results of each chunk as soon as it is done instead of in the
+        order of the actions
+    :arg max_chunk_compressed_bytes: the maximum size of the request in bytes
+        once gzip compressed, for clients created with ``http_compress=True``.
+        The compressed size is estimated while the chunk is being serialized,
+        which takes some CPU on top of the compression done by the transport
+        when the chunk is sent.
+    :arg checkpoint: :class:`~elasticsearch.helpers.BulkCheckpoint` to resume
+        the ingest from and to record its progress in, the chunks sent
+        concurrently are recorded as done once all the chunks before them are
+    :arg on_chunk_complete: callback called with the
+        :class:`~elasticsearch.helpers.BulkChunkStats` of every bulk request
+        once it is answered
+    :arg coalesce: :class:`~elasticsearch.helpers.ActionCoalescer` merging
+        the actions on the same document before they are sent, can't be used
+        along with ``checkpoint``
     """
 
+    if max_concurrency < 1:
+        raise ValueError("'max_concurrency' must be at least 1")
+    if checkpoint is not None and coalesce is not None:
+        raise ValueError("'checkpoint' can't be used with 'coalesce'")
+
     client = client.options()
     client._client_meta = (("h", "bp"),)
 
@@ -222,23 +375,39 @@ async def async_streaming_bulk(
         retry_on_status = (retry_on_status,)
 
     async def map_actions() -> AsyncIterable[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        skip = 0 if checkpoint is None else checkpoint.offset
         async for item in aiter(actions):
+            if skip:
+                skip -= 1
+                continue
             yield expand_action_callback(item)
 
+    async def coalesce_actions(
+        coalescer: ActionCoalescer,
+    ) -> AsyncIterable[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        async for action, data in map_actions():
+            for item in coalescer.feed(action, data):
+                yield item
+        for item in coalescer.flush():
+            yield item
+
     serializer = client.transport.serializers.get_serializer("application/json")
+    adaptive_chunk_size = (
+        chunk_size if isinstance(chunk_size, AdaptiveChunkSize) else None
+    )
 
-    bulk_data: List[
-        Union[
-            Tuple[_TYPE_BULK_ACTION_HEADER],
-            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
-        ]
-    ]
-    bulk_actions: List[bytes]
-    async for bulk_data, bulk_actions in _chunk_actions(
-        map_actions(), chunk_size, max_chunk_bytes, serializer
-    ):
+    async def process_chunk(
+        bulk_data: List[
+            Union[
+                Tuple[_TYPE_BULK_ACTION_HEADER],
+                Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+            ]
+        ],
+        bulk_actions: List[bytes],
+        serialization_time: float,
+    ) -> AsyncIterable[Tuple[bool, Dict[str, Any]]]:
         for attempt in range(max_retries + 1):
-            to_retry: List[bytes] = []
+            to_retry: List[memoryview] = []
             to_retry_data: List[
                 Union[
                     Tuple[_TYPE_BULK_ACTION_HEADER],
@@ -250,14 +419,17 @@ async def async_streaming_bulk(
                     min(max_backoff, initial_backoff * 2 ** (attempt - 1))
                 )
 
+            item_slices: Optional[List[memoryview]] = None
             try:
+                i: int
                 data: Union[
                     Tuple[_TYPE_BULK_ACTION_HEADER],
                     Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
                 ]
                 ok: bool
                 info: Dict[str, Any]
-                async for data, (ok, info) in azip(  # type: ignore[assignment, misc]
+                async for i, data, (ok, info) in azip(  # type: ignore[assignment, misc]
+                    range(len(bulk_data)),
                     bulk_data,
                     _process_bulk_chunk(
                         client,
@@ -267,6 +439,10 @@ async def async_streaming_bulk(
                         raise_on_error,
                         ignore_status,
                         *args,
+                        adaptive_chunk_size=adaptive_chunk_size,
+                        on_chunk_complete=on_chunk_complete,
+                        serialization_time=0.0 if attempt else serialization_time,
+                        attempt=attempt,
                         **kwargs,
                     ),
                 ):
@@ -279,9 +455,11 @@ async def async_streaming_bulk(
                             and info["status"] in retry_on_status
                             and (attempt + 1) <= max_retries
                         ):
-                            # _process_bulk_chunk expects strings so we need to
-                            # re-serialize the data
-                            to_retry.extend(map(serializer.dumps, data))
+                            # reuse the bytes the item was already
+                            # serialized to instead of serializing it again
+                            if item_slices is None:
+                                item_slices = _bulk_item_slices(bulk_actions, bulk_data)
+                            to_retry.append(item_slices[i])
                             to_retry_data.append(data)
                         else:
                             yield ok, {action: info}
@@ -297,7 +475,102 @@ async def async_streaming_bulk(
                 if not to_retry:
                     break
                 # retry only subset of documents that didn't succeed
-                bulk_actions, bulk_data = to_retry, to_retry_data
+                bulk_actions, bulk_data = [b"".join(to_retry)], to_retry_data
+
+    async def collect_chunk(
+        bulk_data: List[
+            Union[
+                Tuple[_TYPE_BULK_ACTION_HEADER],
+                Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+            ]
+        ],
+        bulk_actions: List[bytes],
+        chunk_start: int,
+        serialization_time: float,
+    ) -> Tuple[int, int, List[Tuple[bool, Dict[str, Any]]]]:
+        return (
+            chunk_start,
+            len(bulk_data),
+            [
+                item
+                async for item in process_chunk(
+                    bulk_data, bulk_actions, serialization_time
+                )
+            ],
+        )
+
+    bulk_data: List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ]
+    bulk_actions: List[bytes]
+    chunks = _chunk_actions(
+        map_actions() if coalesce is None else coalesce_actions(coalesce),
+        chunk_size,
+        max_chunk_bytes,
+        serializer,
+        max_chunk_compressed_bytes,
+    )
+    chunk_end = 0 if checkpoint is None else checkpoint.offset
+    if max_concurrency == 1:
+        with checkpoint or nullcontext():
+            async for serialization_time, (bulk_data, bulk_actions) in _atimed(chunks):
+                chunk_start, chunk_end = chunk_end, chunk_end + len(bulk_data)
+                async for item in process_chunk(
+                    bulk_data, bulk_actions, serialization_time
+                ):
+                    yield item
+                if checkpoint is not None:
+                    checkpoint.ack(chunk_start, chunk_end - chunk_start)
+        return
+
+    # keep up to 'max_concurrency' chunks in flight, oldest first
+    in_flight: List[
+        "asyncio.Task[Tuple[int, int, List[Tuple[bool, Dict[str, Any]]]]]"
+    ] = []
+
+    async def next_done() -> AsyncIterable[Tuple[bool, Dict[str, Any]]]:
+        if ordered:
+            task = in_flight[0]
+            await asyncio.wait((task,))
+        else:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            # pick the oldest of the finished chunks
+            task = next(task for task in in_flight if task in done)
+        in_flight.remove(task)
+        chunk_start, count, items = task.result()
+        for item in items:
+            yield item
+        # only once the consumer got all the results of the chunk
+        if checkpoint is not None:
+            checkpoint.ack(chunk_start, count)
+
+    try:
+        async for serialization_time, (bulk_data, bulk_actions) in _atimed(chunks):
+            chunk_start, chunk_end = chunk_end, chunk_end + len(bulk_data)
+            if len(in_flight) >= max_concurrency:
+                async for item in next_done():
+                    yield item
+            in_flight.append(
+                asyncio.ensure_future(
+                    collect_chunk(
+                        bulk_data, bulk_actions, chunk_start, serialization_time
+                    )
+                )
+            )
+        while in_flight:
+            async for item in next_done():
+                yield item
+    finally:
+        # don't leave requests behind when the consumer stops early or fails
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.wait(in_flight)
+        if checkpoint is not None:
+            checkpoint.save()
 
 
 async def async_bulk(
@@ -306,6 +579,8 @@ async def async_bulk(
     stats_only: bool = False,
     ignore_status: Union[int, Collection[int]] = (),
     *args: Any,
+    max_errors: Optional[int] = None,
+    on_error: Optional[Callable[[Dict[str, Any]], None]] = None,
     **kwargs: Any,
 ) -> Tuple[int, Union[int, List[Any]]]:
     """
@@ -322,7 +597,8 @@ async def async_bulk(
     error dictionary which can lead to an extra high memory usage. If you need
     to process a lot of data and want to ignore/collect errors please consider
     using the :func:`~elasticsearch.helpers.async_streaming_bulk` helper which will
-    just return the errors and not store them in memory.
+    just return the errors and not store them in memory, or bound the number
+    of errors kept with ``max_errors``.
 
 
     :arg client: instance of :class:`~elasticsearch.AsyncElasticsearch` to use
@@ -330,6 +606,11 @@ async def async_bulk(
     :arg stats_only: if `True` only report number of successful/failed
         operations instead of just number of successful and a list of error responses
     :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg max_errors: number of errors to keep, the errors are then returned as
+        a :class:`~elasticsearch.helpers.BulkErrors` counting all of them by
+        status and error type
+    :arg on_error: callback called with every error as it occurs, also when
+        ``stats_only`` is set
 
     Any additional keyword arguments will be passed to
     :func:`~elasticsearch.helpers.async_streaming_bulk` which is used to execute
@@ -339,7 +620,7 @@ async def async_bulk(
     success, failed = 0, 0
 
     # list of errors to be collected is not stats_only
-    errors = []
+    errors: List[Dict[str, Any]] = [] if max_errors is None else BulkErrors(max_errors)
 
     # make streaming_bulk yield successful results so we can count them
     kwargs["yield_ok"] = True
@@ -348,6 +629,8 @@ async def async_bulk(
     ):
         # go through request-response pairs and detect failures
         if not ok:
+            if on_error is not None:
+                on_error(item)
             if not stats_only:
                 errors.append(item)
             failed += 1
@@ -367,6 +650,7 @@ async def async_scan(
     request_timeout: Optional[float] = None,
     clear_scroll: bool = True,
     scroll_kwargs: Optional[MutableMapping[str, Any]] = None,
+    prefetch: int = 0,
     **kwargs: Any,
 ) -> AsyncIterable[Dict[str, Any]]:
     """
@@ -397,6 +681,11 @@ async def async_scan(
         to true.
     :arg scroll_kwargs: additional kwargs to be passed to
         :meth:`~elasticsearch.AsyncElasticsearch.scroll`
+    :arg prefetch: number of pages to fetch ahead from a background task
+        while the hits of the current one are being consumed, ``0`` (default)
+        to fetch each page once the previous one is consumed. At most
+        ``prefetch + 2`` pages are held in memory: the ones fetched ahead, the
+        one being consumed and the one fetched next, waiting for room.
 
     Any additional keyword arguments will be passed to the initial
     :meth:`~elasticsearch.AsyncElasticsearch.search` call:
@@ -409,28 +698,61 @@ async def async_scan(
             index="orders-*"
         )
     """
+    pages = async_scan_batches(
+        client,
+        query,
+        scroll=scroll,
+        raise_on_error=raise_on_error,
+        preserve_order=preserve_order,
+        size=size,
+        request_timeout=request_timeout,
+        clear_scroll=clear_scroll,
+        scroll_kwargs=scroll_kwargs,
+        prefetch=prefetch,
+        **kwargs,
+    )
+    try:
+        async for page in pages:
+            for hit in page:
+                yield hit
+    finally:
+        await pages.aclose()  # type: ignore[attr-defined]
+
+
+async def async_scan_batches(
+    client: AsyncElasticsearch,
+    query: Optional[Any] = None,
+    scroll: str = "5m",
+    raise_on_error: bool = True,
+    preserve_order: bool = False,
+    size: int = 1000,
+    request_timeout: Optional[float] = None,
+    clear_scroll: bool = True,
+    scroll_kwargs: Optional[MutableMapping[str, Any]] = None,
+    prefetch: int = 0,
+    **kwargs: Any,
+) -> AsyncIterable[List[Dict[str, Any]]]:
+    """
+    Version of :func:`~elasticsearch.helpers.async_scan` yielding the hits a
+    whole page at a time, as the lists returned by the scroll requests:
+
+    .. code-block:: python
+
+        async for hits in async_scan_batches(client, index="orders-*"):
+            await export([hit["_source"] for hit in hits])
+
+    The arguments are the same as the ones of
+    :func:`~elasticsearch.helpers.async_scan`, ``size`` being the (per shard)
+    number of hits of each page.
+    """
     scroll_kwargs = scroll_kwargs or {}
 
     if not preserve_order:
         query = query.copy() if query else {}
         query["sort"] = "_doc"
 
-    def pop_transport_kwargs(kw: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
-        # Grab options that should be propagated to every
-        # API call within this helper instead of just 'search()'
-        transport_kwargs = {}
-        for key in ("headers", "api_key", "http_auth", "basic_auth", "bearer_auth"):
-            try:
-                value = kw.pop(key)
-                if key == "http_auth":
-                    key = "basic_auth"
-                transport_kwargs[key] = value
-            except KeyError:
-                pass
-        return transport_kwargs
-
     client = client.options(
-        request_timeout=request_timeout, **pop_transport_kwargs(kwargs)
+        request_timeout=request_timeout, **_pop_transport_kwargs(kwargs)
     )
     client._client_meta = (("h", "s"),)
 
@@ -456,51 +778,273 @@ async def async_scan(
         search_kwargs["size"] = size
         resp = await client.search(body=query, **search_kwargs)
 
-    scroll_id: Optional[str] = resp.get("_scroll_id")
-    scroll_transport_kwargs = pop_transport_kwargs(scroll_kwargs)
+    scroll_transport_kwargs = _pop_transport_kwargs(scroll_kwargs)
     if scroll_transport_kwargs:
         scroll_client = client.options(**scroll_transport_kwargs)
     else:
         scroll_client = client
 
+    async def scroll_pages(resp: Any) -> AsyncIterable[List[Dict[str, Any]]]:
+        scroll_id: Optional[str] = resp.get("_scroll_id")
+        try:
+            while scroll_id and resp["hits"]["hits"]:
+                yield resp["hits"]["hits"]
+
+                _check_shards(resp["_shards"], "Scroll", scroll_id, raise_on_error)
+                resp = await scroll_client.scroll(
+                    scroll_id=scroll_id, scroll=scroll, **scroll_kwargs
+                )
+                scroll_id = resp.get("_scroll_id")
+
+        finally:
+            if scroll_id and clear_scroll:
+                await client.options(ignore_status=404).clear_scroll(
+                    scroll_id=scroll_id
+                )
+
+    pages = scroll_pages(resp)
+    if prefetch:
+        pages = _aprefetch(pages, prefetch)
     try:
-        while scroll_id and resp["hits"]["hits"]:
-            for hit in resp["hits"]["hits"]:
-                yield hit
+        async for page in pages:
+            yield page
+    finally:
+        await pages.aclose()  # type: ignore[attr-defined]
+
+
+async def async_pit_scan(
+    client: AsyncElasticsearch,
+    query: Optional[Any] = None,
+    index: Optional[Union[str, Sequence[str]]] = None,
+    keep_alive: str = "5m",
+    raise_on_error: bool = True,
+    size: int = 1000,
+    request_timeout: Optional[float] = None,
+    pit_id: Optional[str] = None,
+    cursor: Optional[ScanCursor] = None,
+    **kwargs: Any,
+) -> AsyncIterable[Dict[str, Any]]:
+    """
+    Version of :func:`~elasticsearch.helpers.async_scan` paginating with a
+    point in time and ``search_after`` instead of a scroll, see
+    :func:`~elasticsearch.helpers.pit_scan`.
+
+    .. code-block:: python
+
+        async for doc in async_pit_scan(
+            client,
+            query={"query": {"match": {"title": "python"}}},
+            index="orders-*",
+        ):
+            print(doc)
+
+    :arg client: instance of :class:`~elasticsearch.AsyncElasticsearch` to use
+    :arg query: body for the :meth:`~elasticsearch.AsyncElasticsearch.search` api
+    :arg index: indices to open the point in time against
+    :arg keep_alive: how long the point in time is kept alive between two
+        requests
+    :arg raise_on_error: raises an exception (``ScanError``) if an error is
+        encountered (some shards fail to execute). By default we raise.
+    :arg size: number of hits fetched by each request
+    :arg request_timeout: explicit timeout for each request
+    :arg pit_id: id of an already opened point in time to search instead of
+        opening one for ``index``, it isn't closed at the end
+    :arg cursor: :class:`~elasticsearch.helpers.ScanCursor` to resume the
+        scan from, and to move forward after each page
+
+    Any additional keyword arguments will be passed to the
+    :meth:`~elasticsearch.AsyncElasticsearch.search` calls.
+    """
+    client = client.options(
+        request_timeout=request_timeout, **_pop_transport_kwargs(kwargs)
+    )
+    client._client_meta = (("h", "s"),)
 
-            # Default to 0 if the value isn't included in the response
-            shards_info: Dict[str, int] = resp["_shards"]
-            shards_successful = shards_info.get("successful", 0)
-            shards_skipped = shards_info.get("skipped", 0)
-            shards_total = shards_info.get("total", 0)
-
-            # check if we have any errors
-            if (shards_successful + shards_skipped) < shards_total:
-                shards_message = "Scroll request has only succeeded on %d (+%d skipped) shards out of %d."
-                logger.warning(
-                    shards_message,
-                    shards_successful,
-                    shards_skipped,
-                    shards_total,
+    search_kwargs = query.copy() if query else {}
+    search_kwargs.update(kwargs)
+    search_kwargs["sort"] = _pit_sort(search_kwargs.get("sort"))
+    search_kwargs["size"] = size
+    search_kwargs.setdefault("track_total_hits", False)
+
+    if cursor is not None:
+        if pit_id is not None:
+            raise ValueError("'pit_id' and 'cursor' can't be used together")
+        pit_id = cursor.pit_id
+        search_after = cursor.search_after
+        if search_after is not None and pit_id is None:
+            # the scan goes on in a new point in time
+            search_after = _reopened_search_after(search_kwargs["sort"], search_after)
+            if search_after is None:
+                raise ValueError(
+                    "Hits only sorted by '_shard_doc' can't be resumed "
+                    "without their point in time"
                 )
-                if raise_on_error:
-                    raise ScanError(
-                        scroll_id,
-                        shards_message
-                        % (
-                            shards_successful,
-                            shards_skipped,
-                            shards_total,
-                        ),
+        if search_after is not None:
+            search_kwargs["search_after"] = search_after
+
+    # the point in time of a cursor is kept open until the scan is complete
+    close_pit = pit_id is None and cursor is None
+    if pit_id is None:
+        if index is None:
+            raise ValueError("'index' is required to open a point in time")
+        pit = await client.open_point_in_time(index=index, keep_alive=keep_alive)
+        pit_id = pit["id"]
+    done = False
+    try:
+        while True:
+            try:
+                resp = await client.search(
+                    pit={"id": pit_id, "keep_alive": keep_alive}, **search_kwargs
+                )
+            except NotFoundError:
+                # the point in time of a resumed scan expired, go on from a new one
+                if cursor is None or index is None:
+                    raise
+                if "search_after" in search_kwargs:
+                    search_after = _reopened_search_after(
+                        search_kwargs["sort"], search_kwargs["search_after"]
                     )
-            resp = await scroll_client.scroll(
-                scroll_id=scroll_id, scroll=scroll, **scroll_kwargs
+                    if search_after is None:
+                        raise
+                    search_kwargs["search_after"] = search_after
+                pit = await client.open_point_in_time(
+                    index=index, keep_alive=keep_alive
+                )
+                pit_id = pit["id"]
+                resp = await client.search(
+                    pit={"id": pit_id, "keep_alive": keep_alive}, **search_kwargs
+                )
+            # the id can change from one response to the next
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp["hits"]["hits"]
+            for hit in hits:
+                yield hit
+
+            _check_shards(resp["_shards"], "Search", pit_id, raise_on_error)
+            if hits:
+                search_kwargs["search_after"] = hits[-1]["sort"]
+            if cursor is not None:
+                cursor.advance(pit_id, search_kwargs.get("search_after"))
+            if len(hits) < size:
+                done = True
+                break
+
+    finally:
+        if close_pit or (cursor is not None and done):
+            await client.options(ignore_status=404).close_point_in_time(id=pit_id)
+        if cursor is not None:
+            if done:
+                cursor.pit_id = None
+            cursor.save()
+
+
+async def async_parallel_scan(
+    client: AsyncElasticsearch,
+    query: Optional[Any] = None,
+    slices: int = 4,
+    max_concurrency: Optional[int] = None,
+    queue_size: int = 4,
+    on_slice_error: Optional[Callable[[int, Exception], None]] = None,
+    point_in_time: bool = False,
+    size: int = 1000,
+    **kwargs: Any,
+) -> AsyncIterable[Dict[str, Any]]:
+    """
+    Parallel version of :func:`~elasticsearch.helpers.async_scan` splitting
+    the scroll in ``slices`` sliced scrolls read at the same time, see
+    :func:`~elasticsearch.helpers.parallel_scan`.
+
+    .. code-block:: python
+
+        async for hit in async_parallel_scan(client, index="logs-*", slices=8):
+            await export(hit)
+
+    :arg client: instance of :class:`~elasticsearch.AsyncElasticsearch` to use
+    :arg query: body for the :meth:`~elasticsearch.AsyncElasticsearch.search` api
+    :arg slices: number of slices to split the scroll in, usually a multiple
+        of the number of shards of the index (default: 4)
+    :arg max_concurrency: number of slices read at the same time, all of them
+        by default
+    :arg queue_size: number of pages of hits read ahead of the ones being
+        yielded
+    :arg on_slice_error: callback called with the id of a slice and the
+        exception it failed with, the other slices then go on. By default the
+        exception is raised and all the slices are stopped.
+    :arg point_in_time: slice a point in time opened for ``index`` instead
+        of a scroll, read with :func:`~elasticsearch.helpers.async_pit_scan`
+    :arg size: size (per shard) of the batch send at each iteration.
+
+    Any additional keyword arguments (``scroll``, ``raise_on_error``...) will
+    be passed to :func:`~elasticsearch.helpers.async_scan`, or
+    :func:`~elasticsearch.helpers.async_pit_scan`, for each slice.
+    """
+    if slices < 1:
+        raise ValueError("'slices' must be at least 1")
+    if point_in_time and kwargs.get("index") is None:
+        raise ValueError("point_in_time requires an index")
+    query = query.copy() if query else {}
+    # pages of hits of the slices, an exception when one failed and None once
+    # one is done
+    pages: asyncio.Queue[Tuple[int, Union[None, Exception, List[Dict[str, Any]]]]] = (
+        asyncio.Queue(max(queue_size, 1))
+    )
+    semaphore = asyncio.Semaphore(min(max_concurrency or slices, slices))
+
+    async def scan_slice(slice_id: int) -> None:
+        async with semaphore:
+            hits = (async_pit_scan if point_in_time else async_scan)(
+                client,
+                {**query, "slice": {"id": slice_id, "max": slices}},
+                size=size,
+                **_slice_scan_kwargs(kwargs),
             )
-            scroll_id = resp.get("_scroll_id")
+            try:
+                page: List[Dict[str, Any]] = []
+                async for hit in hits:
+                    page.append(hit)
+                    if len(page) == size:
+                        await pages.put((slice_id, page))
+                        page = []
+                if page:
+                    await pages.put((slice_id, page))
+            except Exception as e:
+                await pages.put((slice_id, e))
+            finally:
+                # clears the scroll of the slice
+                await hits.aclose()  # type: ignore[attr-defined]
+        await pages.put((slice_id, None))
+
+    pit_client = client.options(**_pop_transport_kwargs(dict(kwargs)))
+    if point_in_time:
+        kwargs["pit_id"] = (
+            await pit_client.open_point_in_time(
+                index=kwargs.pop("index"), keep_alive=kwargs.get("keep_alive", "5m")
+            )
+        )["id"]
 
+    tasks = [asyncio.ensure_future(scan_slice(slice_id)) for slice_id in range(slices)]
+    running = slices
+    try:
+        while running:
+            slice_id, page = await pages.get()
+            if page is None:
+                running -= 1
+            elif isinstance(page, Exception):
+                if on_slice_error is None:
+                    raise page
+                on_slice_error(slice_id, page)
+            else:
+                for hit in page:
+                    yield hit
     finally:
-        if scroll_id and clear_scroll:
-            await client.options(ignore_status=404).clear_scroll(scroll_id=scroll_id)
+        # don't leave scrolls behind when the consumer stops early or fails
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+        if point_in_time:
+            await pit_client.options(ignore_status=404).close_point_in_time(
+                id=kwargs["pit_id"]
+            )
 
 
 async def async_reindex(
@@ -566,7 +1110,7 @@ async def async_reindex(
                 h.update(h.pop("fields"))
             yield h
 
-    kwargs = {"stats_only": True}
+    kwargs: Dict[str, Any] = {"stats_only": True}
     kwargs.update(bulk_kwargs)
 
     is_data_stream = False
@@ -19,6 +19,7 @@ import contextlib
 from typing import (
     TYPE_CHECKING,
     Any,
+    AsyncIterable,
     AsyncIterator,
     Dict,
     Iterator,
@@ -30,7 +31,7 @@ from typing import (
 from typing_extensions import Self
 
 from elasticsearch.exceptions import ApiError
-from elasticsearch.helpers import async_scan
+from elasticsearch.helpers import ScanCursor, _aprefetch, async_pit_scan, async_scan
 
 from ..async_connections import get_connection
 from ..response import Response
@@ -156,10 +157,17 @@ class AsyncSearch(SearchBase[_R]):
         search = self.index().extra(pit={"id": pit["id"], "keep_alive": keep_alive})
         if not search._sort:
             search = search.sort("_shard_doc")
-        yield search
-        await es.close_point_in_time(id=pit["id"])
-
-    async def iterate(self, keep_alive: str = "1m") -> AsyncIterator[_R]:
+        try:
+            yield search
+        finally:
+            await es.close_point_in_time(id=pit["id"])
+
+    async def iterate(
+        self,
+        keep_alive: str = "1m",
+        prefetch: int = 0,
+        cursor: Optional[ScanCursor] = None,
+    ) -> AsyncIterator[_R]:
         """
         Return a generator that iterates over all the documents matching the query.
 
@@ -167,16 +175,52 @@ class AsyncSearch(SearchBase[_R]):
         the index is changing. It should be preferred over ``scan()``.
 
         :arg keep_alive: the time to live for the point in time, renewed with each new search request
+        :arg prefetch: number of pages of results to fetch ahead in the
+            background while the current one is being consumed, ``0`` (default)
+            to fetch each page once the previous one is consumed. At most
+            ``prefetch + 2`` pages are held in memory.
+        :arg cursor: :class:`~elasticsearch.helpers.ScanCursor` to resume the
+            iteration from, and to move forward after each page, like the
+            ``cursor`` of the point in time scan helpers. It can't be combined
+            with ``prefetch``.
         """
-        async with self.point_in_time(keep_alive=keep_alive) as s:
+        if cursor is not None:
+            if prefetch:
+                raise ValueError("'prefetch' and 'cursor' can't be used together")
+            es = get_connection(self._using)
+            query = self.to_dict()
+            async for doc in async_pit_scan(
+                es,
+                query=query,
+                index=self._index or "*",
+                keep_alive=keep_alive,
+                size=query.pop("size", 1000),
+                cursor=cursor,
+                **self._params,
+            ):
+                yield self._get_result(cast(AttrDict[Any], doc))
+            return
+
+        async def pages(s: Self) -> AsyncIterator[Response[_R]]:
             while True:
                 r = await s.execute()
-                for hit in r:
-                    yield hit
+                yield r
                 if len(r.hits) == 0:
                     break
                 s = s.search_after()
 
+        async with self.point_in_time(keep_alive=keep_alive) as s:
+            responses: AsyncIterable[Response[_R]] = pages(s)
+            if prefetch:
+                responses = _aprefetch(responses, prefetch)
+            try:
+                async for r in responses:
+                    for hit in r:
+                        yield hit
+            finally:
+                # stop fetching pages before the point in time is closed
+                await responses.aclose()  # type: ignore[attr-defined]
+
 
 class AsyncMultiSearch(MultiSearchBase[_R]):
     """
@@ -20,6 +20,7 @@ from typing import (
     TYPE_CHECKING,
     Any,
     Dict,
+    Iterable,
     Iterator,
     List,
     Optional,
@@ -29,7 +30,7 @@ from typing import (
 from typing_extensions import Self
 
 from elasticsearch.exceptions import ApiError
-from elasticsearch.helpers import scan
+from elasticsearch.helpers import ScanCursor, _prefetch, pit_scan, scan
 
 from ..connections import get_connection
 from ..response import Response
@@ -149,10 +150,17 @@ class Search(SearchBase[_R]):
         search = self.index().extra(pit={"id": pit["id"], "keep_alive": keep_alive})
         if not search._sort:
             search = search.sort("_shard_doc")
-        yield search
-        es.close_point_in_time(id=pit["id"])
-
-    def iterate(self, keep_alive: str = "1m") -> Iterator[_R]:
+        try:
+            yield search
+        finally:
+            es.close_point_in_time(id=pit["id"])
+
+    def iterate(
+        self,
+        keep_alive: str = "1m",
+        prefetch: int = 0,
+        cursor: Optional[ScanCursor] = None,
+    ) -> Iterator[_R]:
         """
         Return a generator that iterates over all the documents matching the query.
 
@@ -160,16 +168,52 @@ class Search(SearchBase[_R]):
         the index is changing. It should be preferred over ``scan()``.
 
         :arg keep_alive: the time to live for the point in time, renewed with each new search request
+        :arg prefetch: number of pages of results to fetch ahead in the
+            background while the current one is being consumed, ``0`` (default)
+            to fetch each page once the previous one is consumed. At most
+            ``prefetch + 2`` pages are held in memory.
+        :arg cursor: :class:`~elasticsearch.helpers.ScanCursor` to resume the
+            iteration from, and to move forward after each page, like the
+            ``cursor`` of the point in time scan helpers. It can't be combined
+            with ``prefetch``.
         """
-        with self.point_in_time(keep_alive=keep_alive) as s:
+        if cursor is not None:
+            if prefetch:
+                raise ValueError("'prefetch' and 'cursor' can't be used together")
+            es = get_connection(self._using)
+            query = self.to_dict()
+            for doc in pit_scan(
+                es,
+                query=query,
+                index=self._index or "*",
+                keep_alive=keep_alive,
+                size=query.pop("size", 1000),
+                cursor=cursor,
+                **self._params,
+            ):
+                yield self._get_result(cast(AttrDict[Any], doc))
+            return
+
+        def pages(s: Self) -> Iterator[Response[_R]]:
             while True:
                 r = s.execute()
-                for hit in r:
-                    yield hit
+                yield r
                 if len(r.hits) == 0:
                     break
                 s = s.search_after()
 
+        with self.point_in_time(keep_alive=keep_alive) as s:
+            responses: Iterable[Response[_R]] = pages(s)
+            if prefetch:
+                responses = _prefetch(responses, prefetch)
+            try:
+                for r in responses:
+                    for hit in r:
+                        yield hit
+            finally:
+                # stop fetching pages before the point in time is closed
+                responses.close()  # type: ignore[attr-defined]
+
 
 class MultiSearch(MultiSearchBase[_R]):
     """
@@ -15,23 +15,78 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
-from .._async.helpers import async_bulk, async_reindex, async_scan, async_streaming_bulk
+from .._async.helpers import _aprefetch  # noqa: F401
+from .._async.helpers import (
+    async_bulk,
+    async_parallel_scan,
+    async_pit_scan,
+    async_reindex,
+    async_scan,
+    async_scan_batches,
+    async_streaming_bulk,
+)
 from .._utils import fixup_module_metadata
 from .actions import _chunk_actions  # noqa: F401
+from .actions import _prefetch  # noqa: F401
 from .actions import _process_bulk_chunk  # noqa: F401
-from .actions import bulk, expand_action, parallel_bulk, reindex, scan, streaming_bulk
+from .actions import (
+    ActionCoalescer,
+    AdaptiveChunkSize,
+    BulkCheckpoint,
+    BulkChunkResult,
+    BulkChunkStats,
+    BulkErrors,
+    ScanCursor,
+    bulk,
+    bulk_from_file,
+    expand_action,
+    fanout_bulk,
+    ndjson_actions,
+    parallel_bulk,
+    parallel_scan,
+    pit_scan,
+    reindex,
+    replay_dead_letters,
+    scan,
+    scan_batches,
+    streaming_bulk,
+    streaming_bulk_chunks,
+)
+from .arrow import arrow_actions, bulk_from_arrow, scan_to_arrow, scan_to_pandas
 from .errors import BulkIndexError, ScanError
 
 __all__ = [
+    "ActionCoalescer",
+    "AdaptiveChunkSize",
+    "BulkCheckpoint",
+    "BulkChunkResult",
+    "BulkChunkStats",
+    "BulkErrors",
     "BulkIndexError",
+    "ScanCursor",
     "ScanError",
     "expand_action",
     "streaming_bulk",
+    "streaming_bulk_chunks",
     "bulk",
     "parallel_bulk",
+    "fanout_bulk",
+    "bulk_from_file",
+    "bulk_from_arrow",
+    "arrow_actions",
+    "ndjson_actions",
+    "replay_dead_letters",
     "scan",
+    "scan_batches",
+    "scan_to_arrow",
+    "scan_to_pandas",
+    "parallel_scan",
+    "pit_scan",
     "reindex",
     "async_scan",
+    "async_scan_batches",
+    "async_parallel_scan",
+    "async_pit_scan",
     "async_bulk",
     "async_reindex",
     "async_streaming_bulk",
@@ -15,22 +15,36 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
+import json
 import logging
+import mmap
+import os
+import threading
 import time
+import zlib
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from json.encoder import encode_basestring
 from operator import methodcaller
-from queue import Queue
+from queue import Empty, Full, Queue
 from typing import (
+    IO,
     Any,
     Callable,
     Collection,
+    Deque,
     Dict,
+    Generator,
     Iterable,
     Iterator,
     List,
     Mapping,
     MutableMapping,
     Optional,
+    Sequence,
     Tuple,
+    TypeVar,
     Union,
 )
 
@@ -39,17 +53,59 @@ from elastic_transport import OpenTelemetrySpan
 from .. import Elasticsearch
 from ..compat import to_bytes
 from ..exceptions import ApiError, NotFoundError, TransportError
-from ..serializer import Serializer
+from ..serializer import JsonSerializer, Serializer
 from .errors import BulkIndexError, ScanError
+from .routing import _ShardRouter
 
 logger = logging.getLogger("elasticsearch.helpers")
 
-_TYPE_BULK_ACTION = Union[bytes, str, Dict[str, Any]]
-_TYPE_BULK_ACTION_HEADER = Dict[str, Any]
+T = TypeVar("T")
+
+_TYPE_BULK_RAW_ACTION = Tuple[bytes, Optional[bytes]]
+_TYPE_BULK_ACTION = Union[bytes, str, Dict[str, Any], _TYPE_BULK_RAW_ACTION]
+_TYPE_BULK_ACTION_HEADER = Union[bytes, Dict[str, Any]]
 _TYPE_BULK_ACTION_BODY = Union[None, bytes, Dict[str, Any]]
 _TYPE_BULK_ACTION_HEADER_AND_BODY = Tuple[
     _TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY
 ]
+_TYPE_DEAD_LETTERS = Union[str, "os.PathLike[str]", IO[bytes]]
+# the actions of a chunk and its serialized body
+_TYPE_BULK_CHUNK = Tuple[
+    List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ],
+    List[bytes],
+]
+# line number of the action line, then start and end offsets of the action
+# line and of the data line (empty for deletes) of an item in a bulk file
+_TYPE_BULK_FILE_ITEM = Tuple[int, int, int, int, int]
+
+# fields of the actions moved to their action line, by their key in it
+_ACTION_METADATA_KEYS = {
+    "_id": "_id",
+    "_index": "_index",
+    "_if_seq_no": "if_seq_no",
+    "_if_primary_term": "if_primary_term",
+    "_parent": "parent",
+    "_percolate": "_percolate",
+    "_retry_on_conflict": "retry_on_conflict",
+    "_routing": "routing",
+    "_timestamp": "_timestamp",
+    "_type": "_type",
+    "_version": "version",
+    "_version_type": "version_type",
+    "if_seq_no": "if_seq_no",
+    "if_primary_term": "if_primary_term",
+    "parent": "parent",
+    "pipeline": "pipeline",
+    "retry_on_conflict": "retry_on_conflict",
+    "routing": "routing",
+    "version": "version",
+    "version_type": "version_type",
+}
 
 
 def expand_action(data: _TYPE_BULK_ACTION) -> _TYPE_BULK_ACTION_HEADER_AND_BODY:
@@ -57,7 +113,15 @@ def expand_action(data: _TYPE_BULK_ACTION) -> _TYPE_BULK_ACTION_HEADER_AND_BODY:
     From one document or action definition passed in by the user extract the
     action/data lines needed for elasticsearch's
     :meth:`~elasticsearch.Elasticsearch.bulk` api.
+
+    Actions that are already serialized can be passed in as a tuple of the
+    action line and the data line (``None`` for ``delete``), both as bytes.
+    They are forwarded to elasticsearch as-is without being parsed.
     """
+    # already serialized action/data lines
+    if isinstance(data, tuple):
+        return data
+
     # when given a string, assume user wants to index raw json
     if isinstance(data, (bytes, str)):
         return {"index": {}}, to_bytes(data, "utf-8")
@@ -77,41 +141,9 @@ def expand_action(data: _TYPE_BULK_ACTION) -> _TYPE_BULK_ACTION_HEADER_AND_BODY:
     ):
         action[op_type]["_source"] = data.pop("_source")
 
-    for key in (
-        "_id",
-        "_index",
-        "_if_seq_no",
-        "_if_primary_term",
-        "_parent",
-        "_percolate",
-        "_retry_on_conflict",
-        "_routing",
-        "_timestamp",
-        "_type",
-        "_version",
-        "_version_type",
-        "if_seq_no",
-        "if_primary_term",
-        "parent",
-        "pipeline",
-        "retry_on_conflict",
-        "routing",
-        "version",
-        "version_type",
-    ):
+    for key, action_key in _ACTION_METADATA_KEYS.items():
         if key in data:
-            if key in {
-                "_if_seq_no",
-                "_if_primary_term",
-                "_parent",
-                "_retry_on_conflict",
-                "_routing",
-                "_version",
-                "_version_type",
-            }:
-                action[op_type][key[1:]] = data.pop(key)
-            else:
-                action[op_type][key] = data.pop(key)
+            action[op_type][action_key] = data.pop(key)
 
     # no data payload for delete
     if op_type == "delete":
@@ -120,17 +152,134 @@ def expand_action(data: _TYPE_BULK_ACTION) -> _TYPE_BULK_ACTION_HEADER_AND_BODY:
     return action, data.get("_source", data)
 
 
+def ndjson_actions(
+    lines: Iterable[Union[bytes, str]],
+) -> Iterable[_TYPE_BULK_RAW_ACTION]:
+    """
+    Group the lines of a bulk NDJSON body (for example a file previously
+    exported in the bulk format) into already serialized actions accepted by
+    :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk` and
+    :func:`~elasticsearch.helpers.parallel_bulk`. Documents are never parsed,
+    only the action lines that mention a ``delete`` are to find out that no
+    data line follows them::
+
+        with open("export.ndjson", "rb") as f:
+            bulk(client, ndjson_actions(f))
+
+    :arg lines: iterable of alternating action and data lines
+    """
+    header: Optional[bytes] = None
+    for line in lines:
+        line = to_bytes(line, "utf-8").rstrip(b"\r\n")
+        if not line:
+            continue
+        if header is not None:
+            yield header, line
+            header = None
+        elif b'"delete"' in line and "delete" in json.loads(line):
+            yield line, None
+        else:
+            header = line
+
+    if header is not None:
+        raise ValueError(f"Action line {header!r} is missing its data line")
+
+
+def _action_header(header: _TYPE_BULK_ACTION_HEADER) -> Dict[str, Any]:
+    """
+    Copy of the action line of a bulk item, parsing it when the item was passed
+    in already serialized.
+    """
+    if isinstance(header, bytes):
+        return json.loads(header)  # type: ignore[no-any-return]
+    return header.copy()
+
+
+@contextmanager
+def _open_dead_letters(
+    dead_letters: Optional[_TYPE_DEAD_LETTERS], mode: str
+) -> Iterator[Optional[IO[bytes]]]:
+    if dead_letters is None or not isinstance(dead_letters, (str, os.PathLike)):
+        yield dead_letters
+    else:
+        with open(dead_letters, mode) as f:
+            yield f
+
+
+def _write_dead_letter(
+    dead_letters: IO[bytes], info: Dict[str, Any], lines: Union[bytes, memoryview]
+) -> None:
+    """
+    Append a failed bulk item to a dead letter file: the bulk response item it
+    got on a single line, followed by the action and data lines it was sent
+    with, as they were sent.
+    """
+    ((op_type, item),) = info.items()
+    # the data line is already there, and exceptions can't be serialized
+    item = {k: v for k, v in item.items() if k != "data" and k != "exception"}
+    dead_letters.write(
+        json.dumps({op_type: item}, separators=(",", ":"), default=str).encode()
+        + b"\n"
+        + lines
+    )
+
+
+def _dead_letter_actions(lines: Iterable[bytes]) -> Iterable[_TYPE_BULK_RAW_ACTION]:
+    """
+    Already serialized actions of a dead letter file, see
+    :func:`_write_dead_letter`.
+    """
+    lines = (line.rstrip(b"\r\n") for line in lines)
+    for line in lines:
+        if not line:
+            continue
+        (op_type,) = json.loads(line)
+        header = next(lines, None)
+        data = None if op_type == "delete" else next(lines, None)
+        if header is None or (data is None and op_type != "delete"):
+            raise ValueError(f"Dead letter {line!r} is missing its action lines")
+        yield header, data
+
+
 class _ActionChunker:
     def __init__(
-        self, chunk_size: int, max_chunk_bytes: int, serializer: Serializer
+        self,
+        chunk_size: int,
+        max_chunk_bytes: int,
+        serializer: Serializer,
+        max_chunk_compressed_bytes: Optional[int] = None,
     ) -> None:
         self.chunk_size = chunk_size
         self.max_chunk_bytes = max_chunk_bytes
         self.serializer = serializer
+        self.max_chunk_compressed_bytes = max_chunk_compressed_bytes
+        # The gzipped size of the chunk is tracked with a compressor fed as
+        # the lines are added, only to enforce max_chunk_compressed_bytes:
+        # its output is thrown away, the transport can't send a compressed
+        # body and compresses the chunk again. The fastest level keeps that
+        # extra work small, and as it compresses less than the transport
+        # does, the chunks stay on the safe side of the limit.
+        self.compressor: Optional["zlib._Compress"] = None
+        # bytes output by the compressor, and the size of the whole stream
+        # when it was last measured
+        self.compressed_output = 0
+        self.compressed_size = 0
+        # number of lines of the buffer fed to the compressor, and the size
+        # of the ones that weren't
+        self.compressed_lines = 0
+        self.uncompressed_pending = 0
+        # size of the lines fed to the compressor since it was last flushed
+        self.unflushed = 0
+        # serialized beginning of the action lines, per op type, index and
+        # pipeline. See _dumps_header().
+        self.header_prefixes: Dict[Tuple[str, Optional[str], Optional[str]], str] = {}
 
         self.size = 0
         self.action_count = 0
-        self.bulk_actions: List[bytes] = []
+        # serialized lines and their newline separators, in the order they
+        # appear in the NDJSON body. Joined once when the chunk is complete.
+        self.buffer: List[bytes] = []
         self.bulk_data: List[
             Union[
                 Tuple[_TYPE_BULK_ACTION_HEADER],
@@ -154,39 +303,150 @@ class _ActionChunker:
         ret = None
         raw_action = action
         raw_data = data
-        action_bytes = to_bytes(self.serializer.dumps(action), "utf-8")
+        action_bytes = (
+            self._dumps(action)
+            if isinstance(action, bytes)
+            else self._dumps_header(action)
+        )
         # +1 to account for the trailing new line character
         cur_size = len(action_bytes) + 1
 
         data_bytes: Optional[bytes]
         if data is not None:
-            data_bytes = to_bytes(self.serializer.dumps(data), "utf-8")
+            data_bytes = self._dumps(data)
             cur_size += len(data_bytes) + 1
         else:
             data_bytes = None
 
+        lines = [action_bytes, b"\n"]
+        if data_bytes is not None:
+            lines += (data_bytes, b"\n")
+
         # full chunk, send it and start a new one
-        if self.bulk_actions and (
+        if self.buffer and (
             self.size + cur_size > self.max_chunk_bytes
-            or self.action_count == self.chunk_size
+            or self.action_count >= self.chunk_size
+            or (
+                self.max_chunk_compressed_bytes is not None
+                and self._exceeds_compressed_size(lines, cur_size)
+            )
         ):
-            ret = (self.bulk_data, self.bulk_actions)
-            self.bulk_actions = []
-            self.bulk_data = []
-            self.size = 0
-            self.action_count = 0
+            ret = self._take()
 
-        self.bulk_actions.append(action_bytes)
+        self.buffer += lines
         if data_bytes is not None:
-            self.bulk_actions.append(data_bytes)
             self.bulk_data.append((raw_action, raw_data))
         else:
             self.bulk_data.append((raw_action,))
 
         self.size += cur_size
+        # the lines may have been fed to the compressor already
+        if self.max_chunk_compressed_bytes is not None and self.compressed_lines < len(
+            self.buffer
+        ):
+            self.uncompressed_pending += cur_size
+            # fed to the compressor in batches, a line at a time is slower
+            if self.uncompressed_pending >= 16 * 1024:
+                self._compress()
         self.action_count += 1
         return ret
 
+    def _exceeds_compressed_size(self, lines: List[bytes], size: int) -> bool:
+        assert self.max_chunk_compressed_bytes is not None
+        # The lines not fed to the compressor yet can't take much more than
+        # their size once compressed, they are only fed to it along with the
+        # new ones when that may not fit anymore. Close to the limit, that's
+        # every new line.
+        if (
+            self.compressed_size + self.uncompressed_pending + size + 32
+            <= self.max_chunk_compressed_bytes
+        ):
+            return False
+        # if the new lines don't fit, the compressor starts over with the
+        # next chunk
+        self._compress(lines)
+        # the transport compresses harder, but that can still take a few
+        # more bytes on data that barely compresses
+        return self.compressed_size > self.max_chunk_compressed_bytes * 0.99
+
+    def _compress(self, lines: Sequence[bytes] = ()) -> None:
+        if self.compressor is None:
+            self.compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+        data = b"".join(self.buffer[self.compressed_lines :] + list(lines))
+        self.compressed_output += len(self.compressor.compress(data))
+        self.compressed_lines = len(self.buffer) + len(lines)
+        self.uncompressed_pending = 0
+        self.unflushed += len(data)
+        if self.unflushed >= 16 * 1024:
+            self.compressed_output += len(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+            self.unflushed = 0
+            # finishing the stream adds an empty block and the 8 bytes trailer
+            self.compressed_size = self.compressed_output + 10
+        else:
+            # finishing it on a copy gives the size of the few lines fed
+            # since the last flush without cutting their compression short
+            self.compressed_size = self.compressed_output + len(
+                self.compressor.copy().flush()
+            )
+
+    def _dumps(self, line: Union[bytes, Dict[str, Any]]) -> bytes:
+        if not isinstance(line, bytes):
+            line = to_bytes(self.serializer.dumps(line), "utf-8")
+        # pre-serialized lines may already carry the line terminator
+        if line.endswith(b"\n"):
+            return line[:-1]
+        return line
+
+    def _dumps_header(self, action: Dict[str, Any]) -> bytes:
+        # Actions of a stream usually only differ in their '_id' or 'routing'.
+        # The beginning of the action line made of the op type, index and
+        # pipeline is serialized once and only the remaining metadata is
+        # serialized for every action. It's formatted like the stock JSON
+        # serializer does, any other serializer gets the whole action.
+        if type(self.serializer) is not JsonSerializer or len(action) != 1:
+            return self._dumps(action)
+        ((op_type, meta),) = action.items()
+        if type(meta) is not dict:
+            return self._dumps(action)
+        index = meta.get("_index")
+        pipeline = meta.get("pipeline")
+        if (index is None and "_index" in meta) or (
+            pipeline is None and "pipeline" in meta
+        ):
+            return self._dumps(action)
+
+        fields = []
+        for key, value in meta.items():
+            if key == "_index" or key == "pipeline":
+                if type(value) is not str:
+                    return self._dumps(action)
+                continue
+            # anything but plain strings and integers goes through the serializer
+            if type(value) is str:
+                fields.append(f"{encode_basestring(key)}:{encode_basestring(value)}")
+            elif type(value) is int:
+                fields.append(f"{encode_basestring(key)}:{value}")
+            else:
+                return self._dumps(action)
+
+        template = (op_type, index, pipeline)
+        prefix = self.header_prefixes.get(template)
+        if prefix is None:
+            static = {key: meta[key] for key in ("_index", "pipeline") if key in meta}
+            # drop the closing braces, they're added back after the other fields
+            prefix = self._dumps({op_type: static})[:-2].decode(
+                "utf-8", "surrogatepass"
+            )
+            # bound the cache for streams spread over many indices
+            if len(self.header_prefixes) < 1024:
+                self.header_prefixes[template] = prefix
+
+        if fields:
+            if not prefix.endswith("{"):
+                prefix += ","
+            prefix += ",".join(fields)
+        return (prefix + "}}").encode("utf-8", "surrogatepass")
+
     def flush(
         self,
     ) -> Optional[
@@ -201,18 +461,699 @@ class _ActionChunker:
         ]
     ]:
         ret = None
-        if self.bulk_actions:
-            ret = (self.bulk_data, self.bulk_actions)
-            self.bulk_actions = []
-            self.bulk_data = []
+        if self.buffer:
+            ret = self._take()
+        return ret
+
+    def _take(
+        self,
+    ) -> Tuple[
+        List[
+            Union[
+                Tuple[_TYPE_BULK_ACTION_HEADER],
+                Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+            ]
+        ],
+        List[bytes],
+    ]:
+        # The size of the body is known upfront so b"".join() allocates the
+        # final buffer once and copies every line into it exactly one time.
+        # The body already ends with a newline so the NDJSON serializer
+        # forwards it to the transport as-is instead of joining it again.
+        ret = (self.bulk_data, [b"".join(self.buffer)])
+        self.compressor = None
+        self.compressed_output = self.compressed_size = 0
+        self.compressed_lines = self.uncompressed_pending = self.unflushed = 0
+        self.buffer = []
+        self.bulk_data = []
+        self.size = 0
+        self.action_count = 0
+        return ret
+
+
+class AdaptiveChunkSize:
+    """
+    Adjusts the number of actions sent in each chunk by the bulk helpers based
+    on how the cluster handled the previous chunks. Pass an instance as the
+    ``chunk_size`` of :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk` or their async variants.
+
+    The size is adjusted with additive increase and multiplicative decrease
+    (AIMD): every full chunk that is neither rejected nor slow grows the next
+    ones by ``increase_step`` actions, while a chunk whose items are rejected
+    with a ``429`` status code, or that takes longer than ``target_latency``
+    (measured on the client and reported by elasticsearch as ``took``),
+    multiplies the size by ``decrease_factor``. The size always stays within
+    ``min_chunk_size`` and ``max_chunk_size``. ``max_chunk_bytes`` still
+    applies on top of it.
+
+    .. code-block:: python
+
+        chunk_size = AdaptiveChunkSize(
+            initial_chunk_size=500,
+            max_chunk_size=5000,
+            target_latency=2.0,
+            on_adjust=lambda old, new, reason: print(old, new, reason),
+        )
+        for ok, info in streaming_bulk(client, actions, chunk_size=chunk_size):
+            ...
+
+    :arg initial_chunk_size: number of actions in the first chunk (default: 500)
+    :arg min_chunk_size: smallest number of actions in one chunk (default: 10)
+    :arg max_chunk_size: largest number of actions in one chunk (default: 10000)
+    :arg target_latency: number of seconds a bulk request may take before
+        chunks are made smaller (default: 5)
+    :arg increase_step: number of actions added to the chunk size after a full
+        chunk was indexed in time without rejections (default: 100)
+    :arg decrease_factor: factor applied to the chunk size after a chunk was
+        slow or rejected (default: 0.5)
+    :arg max_rejected_ratio: share of the items of a chunk that may be
+        rejected with a ``429`` status code before chunks are made smaller
+        (default: 0)
+    :arg on_adjust: callback called with the previous chunk size, the new one
+        and the reason of the change (``"increase"``, ``"rejected"`` or
+        ``"latency"``) every time the chunk size changes
+    """
+
+    def __init__(
+        self,
+        initial_chunk_size: int = 500,
+        min_chunk_size: int = 10,
+        max_chunk_size: int = 10000,
+        target_latency: float = 5.0,
+        increase_step: int = 100,
+        decrease_factor: float = 0.5,
+        max_rejected_ratio: float = 0.0,
+        on_adjust: Optional[Callable[[int, int, str], None]] = None,
+    ) -> None:
+        if not 1 <= min_chunk_size <= max_chunk_size:
+            raise ValueError(
+                "'min_chunk_size' must be at least 1 and at most 'max_chunk_size'"
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError("'decrease_factor' must be between 0 and 1")
+
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_latency = target_latency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.max_rejected_ratio = max_rejected_ratio
+        self.on_adjust = on_adjust
+        self.chunk_size = min(max(initial_chunk_size, min_chunk_size), max_chunk_size)
+
+    def record(
+        self,
+        action_count: int,
+        duration: float,
+        took: Optional[int] = None,
+        rejected_count: int = 0,
+    ) -> None:
+        """
+        Adjust the chunk size after a bulk request.
+
+        :arg action_count: number of actions sent in the request
+        :arg duration: number of seconds the request took on the client
+        :arg took: number of milliseconds elasticsearch reported the request
+            took, if any
+        :arg rejected_count: number of actions rejected with a ``429``
+        """
+        chunk_size = self.chunk_size
+        if action_count and rejected_count / action_count > self.max_rejected_ratio:
+            reason = "rejected"
+        elif max(duration, (took or 0) / 1000) > self.target_latency:
+            reason = "latency"
+        elif action_count >= chunk_size:
+            reason = "increase"
+        else:
+            # a partial chunk, likely the last one, says nothing about capacity
+            return
+
+        if reason == "increase":
+            new_chunk_size = min(chunk_size + self.increase_step, self.max_chunk_size)
+        else:
+            new_chunk_size = max(
+                int(chunk_size * self.decrease_factor), self.min_chunk_size
+            )
+        if new_chunk_size == chunk_size:
+            return
+
+        self.chunk_size = new_chunk_size
+        logger.debug(
+            "Changing bulk chunk size from %d to %d (%s)",
+            chunk_size,
+            new_chunk_size,
+            reason,
+        )
+        if self.on_adjust is not None:
+            self.on_adjust(chunk_size, new_chunk_size, reason)
+
+    def record_response(
+        self, action_count: int, duration: float, resp: Dict[str, Any]
+    ) -> None:
+        """
+        Adjust the chunk size after a successful bulk request, based on its
+        response body.
+        """
+        rejected_count = 0
+        if resp.get("errors"):
+            rejected_count = sum(
+                1
+                for item in resp["items"]
+                if next(iter(item.values())).get("status") == 429
+            )
+        self.record(action_count, duration, resp.get("took"), rejected_count)
+
+    def record_error(self, action_count: int, duration: float, error: ApiError) -> None:
+        """
+        Adjust the chunk size after a bulk request failed as a whole.
+        """
+        self.record(
+            action_count,
+            duration,
+            rejected_count=action_count if error.status_code == 429 else 0,
+        )
+
+
+def _deep_merge(base: Mapping[str, Any], update: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of ``base`` with the fields of ``update`` merged into it, like
+    elasticsearch merges a partial document into the one it updates.
+    """
+    merged = dict(base)
+    for key, value in update.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class ActionCoalescer:
+    """
+    Merges the actions targeting the same document within a window of
+    consecutive actions before they are sent, so that a stream emitting
+    several changes to a document in a row (like a change data capture
+    stream) results in a single bulk item. Pass an instance as the
+    ``coalesce`` of :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk`,
+    :func:`~elasticsearch.helpers.parallel_bulk` or
+    :func:`~elasticsearch.helpers.async_streaming_bulk`.
+
+    Actions on the same ``_index``, ``_id`` and ``routing`` with the same
+    other metadata are merged as long as the result is the same as applying
+    them in order: an ``index`` replaces the ``index`` or ``update`` before
+    it, and an ``update`` with a partial ``doc`` is merged into the previous
+    ``index`` source or ``update`` doc (with the same ``doc_as_upsert``).
+    Other actions, like ``delete``, ``create`` or scripted updates, are kept
+    as they are and the ones that follow aren't merged past them.
+
+    .. code-block:: python
+
+        coalescer = ActionCoalescer(window=1000)
+        bulk(client, change_events(), coalesce=coalescer)
+        print(f"{coalescer.merged_count} actions were merged")
+
+    :arg window: number of consecutive actions that are held back and merged
+        together (default: 500)
+    """
+
+    def __init__(self, window: int = 500) -> None:
+        if window < 1:
+            raise ValueError("'window' must be at least 1")
+        self.window = window
+        #: number of actions merged into previous ones
+        self.merged_count = 0
+        self.count = 0
+        self.buffer: List[_TYPE_BULK_ACTION_HEADER_AND_BODY] = []
+        # position in the buffer of the last action on each document
+        self.latest: Dict[Tuple[Any, Any, Any], int] = {}
+
+    def coalesce(
+        self, actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY]
+    ) -> Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        """
+        Merge expanded actions, see :func:`~elasticsearch.helpers.expand_action`.
+        """
+        for action, data in actions:
+            yield from self.feed(action, data)
+        yield from self.flush()
+
+    def feed(
+        self, action: _TYPE_BULK_ACTION_HEADER, data: _TYPE_BULK_ACTION_BODY
+    ) -> List[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        """
+        Add an expanded action, return the actions of the window when it is
+        complete.
+        """
+        self.count += 1
+        key = None
+        if isinstance(action, dict) and len(action) == 1:
+            ((op_type, metadata),) = action.items()
+            if "_id" in metadata:
+                key = (
+                    metadata.get("_index"),
+                    metadata["_id"],
+                    metadata.get("routing"),
+                )
+        if key is not None and key in self.latest:
+            position = self.latest[key]
+            merged = self._merge(self.buffer[position], (action, data))
+            if merged is not None:
+                self.buffer[position] = merged
+                self.merged_count += 1
+                return self.flush() if self.count >= self.window else []
+        if key is not None:
+            self.latest[key] = len(self.buffer)
+        self.buffer.append((action, data))
+        return self.flush() if self.count >= self.window else []
+
+    def flush(self) -> List[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        """
+        Return the actions held back.
+        """
+        ret, self.buffer = self.buffer, []
+        self.latest.clear()
+        self.count = 0
         return ret
 
+    @staticmethod
+    def _merge(
+        previous: _TYPE_BULK_ACTION_HEADER_AND_BODY,
+        current: _TYPE_BULK_ACTION_HEADER_AND_BODY,
+    ) -> Optional[_TYPE_BULK_ACTION_HEADER_AND_BODY]:
+        previous_action, previous_data = previous
+        action, data = current
+        if not isinstance(previous_action, dict) or not isinstance(action, dict):
+            return None
+        ((previous_op, previous_metadata),) = previous_action.items()
+        ((op_type, metadata),) = action.items()
+        if previous_metadata != metadata or previous_op not in ("index", "update"):
+            return None
+        if op_type == "index":
+            return current
+        if (
+            op_type != "update"
+            or not isinstance(data, dict)
+            or not isinstance(data.get("doc"), Mapping)
+            or not data.keys() <= {"doc", "doc_as_upsert"}
+            or not isinstance(previous_data, dict)
+        ):
+            return None
+        if previous_op == "index":
+            return previous_action, _deep_merge(previous_data, data["doc"])
+        if (
+            isinstance(previous_data.get("doc"), Mapping)
+            and previous_data.keys() <= {"doc", "doc_as_upsert"}
+            and previous_data.get("doc_as_upsert") == data.get("doc_as_upsert")
+        ):
+            return previous_action, {
+                **previous_data,
+                "doc": _deep_merge(previous_data["doc"], data["doc"]),
+            }
+        return None
+
+
+class BulkChunkStats:
+    """
+    Numbers about one bulk request sent by the bulk helpers, passed to their
+    ``on_chunk_complete`` callback once elasticsearch answered it, to feed
+    dashboards or autoscalers. A chunk retried because some of its items were
+    rejected is reported once per request.
+
+    .. code-block:: python
+
+        def report(stats):
+            print(stats.action_count, stats.body_size, stats.request_time)
+
+        bulk(client, actions, on_chunk_complete=report)
+
+    :arg action_count: number of actions sent in the request
+    :arg body_size: size of the request body in bytes, before compression
+    :arg serialization_time: number of seconds spent reading and serializing
+        the actions of the chunk, ``0`` for retries which reuse their bytes
+    :arg request_time: number of seconds the request took on the client
+    :arg took: number of milliseconds elasticsearch reported the request took,
+        ``None`` if the request failed as a whole
+    :arg attempt: ``0`` for the first request of a chunk, then the number of
+        the retry
+    :arg status_counts: number of items by HTTP status code. When the request
+        failed as a whole, all of them count for its status code.
+    :arg error: the error the request failed with as a whole, if any
+    """
+
+    def __init__(
+        self,
+        action_count: int,
+        body_size: int,
+        serialization_time: float,
+        request_time: float,
+        took: Optional[int],
+        attempt: int,
+        status_counts: Dict[int, int],
+        error: Optional[ApiError] = None,
+    ) -> None:
+        self.action_count = action_count
+        self.body_size = body_size
+        self.serialization_time = serialization_time
+        self.request_time = request_time
+        self.took = took
+        self.attempt = attempt
+        self.status_counts = status_counts
+        self.error = error
+
+    def __repr__(self) -> str:
+        return (
+            f"BulkChunkStats(action_count={self.action_count}, "
+            f"body_size={self.body_size}, "
+            f"serialization_time={self.serialization_time:.3f}, "
+            f"request_time={self.request_time:.3f}, took={self.took}, "
+            f"attempt={self.attempt}, status_counts={self.status_counts})"
+        )
+
+
+class BulkChunkResult:
+    """
+    Outcome of one chunk of actions sent by
+    :func:`~elasticsearch.helpers.streaming_bulk_chunks`.
+
+    :arg action_count: number of actions in the chunk
+    :arg failed: the items that failed, in the format
+        :func:`~elasticsearch.helpers.streaming_bulk` yields them, empty when
+        elasticsearch reported no errors for the chunk
+    :arg took: number of milliseconds elasticsearch reported the last request
+        of the chunk took, ``None`` if it failed as a whole
+    """
+
+    def __init__(
+        self,
+        action_count: int,
+        failed: List[Dict[str, Any]],
+        took: Optional[int] = None,
+    ) -> None:
+        self.action_count = action_count
+        self.failed = failed
+        self.took = took
+
+    @property
+    def success_count(self) -> int:
+        """
+        Number of actions that succeeded.
+        """
+        return self.action_count - len(self.failed)
+
+    def __repr__(self) -> str:
+        return (
+            f"BulkChunkResult(action_count={self.action_count}, "
+            f"success_count={self.success_count}, took={self.took})"
+        )
+
+
+def _chunk_stats(
+    bulk_actions: List[bytes],
+    action_count: int,
+    serialization_time: float,
+    request_time: float,
+    attempt: int,
+    resp: Optional[Dict[str, Any]] = None,
+    error: Optional[ApiError] = None,
+) -> BulkChunkStats:
+    status_counts: Dict[int, int] = {}
+    if resp is not None:
+        for item in resp["items"]:
+            status = next(iter(item.values())).get("status", 500)
+            status_counts[status] = status_counts.get(status, 0) + 1
+    elif error is not None:
+        status_counts[error.status_code] = action_count
+    return BulkChunkStats(
+        action_count=action_count,
+        body_size=sum(map(len, bulk_actions)),
+        serialization_time=serialization_time,
+        request_time=request_time,
+        took=None if resp is None else resp.get("took"),
+        attempt=attempt,
+        status_counts=status_counts,
+        error=error,
+    )
+
+
+def _timed(iterable: Iterable[T]) -> Iterable[Tuple[float, T]]:
+    """
+    Pair the items of an iterable with the number of seconds it took to
+    produce each of them.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        yield time.perf_counter() - start, item
+
+
+def _drain(generator: Generator[Any, None, T]) -> T:
+    """
+    Exhaust ``generator``, discarding what it yields, and return its return
+    value.
+    """
+    while True:
+        try:
+            next(generator)
+        except StopIteration as e:
+            return e.value  # type: ignore[no-any-return]
+
+
+def _prefetch(iterable: Iterable[T], prefetch: int) -> Iterable[T]:
+    """
+    Iterate over ``iterable`` from a background thread, up to ``prefetch``
+    items ahead of the consumer (plus the one the thread waits to queue), so
+    that producing the next items (like fetching the next pages of a search)
+    overlaps with consuming the current one. ``iterable`` is closed from that
+    thread when the consumer stops.
+    """
+    # the items, then whether the iterable is exhausted along with the
+    # exception it raised if any
+    queue: Queue[Tuple[bool, Any]] = Queue(prefetch)
+    stopped = threading.Event()
+
+    def produce() -> None:
+        iterator = iter(iterable)
+        error = None
+        try:
+            for item in iterator:
+                queue.put((False, item))
+                if stopped.is_set():
+                    break
+        except BaseException as e:
+            error = e
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            queue.put((True, error))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    done = False
+    try:
+        while True:
+            done, item = queue.get()
+            if done:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        if not done:
+            stopped.set()
+            # unblock the producer until it closes the iterable
+            while not queue.get()[0]:
+                pass
+        thread.join()
+
+
+class BulkCheckpoint:
+    """
+    Durable record of how far the actions of a bulk ingest were acknowledged
+    by elasticsearch, to resume an interrupted ingest instead of starting it
+    over. Pass an instance as the ``checkpoint`` of
+    :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk`,
+    :func:`~elasticsearch.helpers.parallel_bulk` or
+    :func:`~elasticsearch.helpers.async_streaming_bulk`, along with the same
+    actions in the same order every time the ingest is started.
+
+    The helpers skip the first ``offset`` actions and move it forward as
+    chunks are acknowledged, even when they complete out of order: it is the
+    number of actions from the start that were all indexed or reported as
+    failed. It is written to ``path`` at most every ``interval`` seconds and
+    when the helper stops. Delete the file to start over.
+
+    .. code-block:: python
+
+        checkpoint = BulkCheckpoint("backfill.checkpoint", interval=30)
+        bulk(client, generate_actions(), checkpoint=checkpoint)
+
+    :arg path: file the offset is kept in, read when it already exists
+    :arg interval: minimum number of seconds between two writes of the file
+        (default: 10)
+    """
+
+    def __init__(
+        self, path: Union[str, "os.PathLike[str]"], interval: float = 10.0
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        try:
+            with open(path, "rb") as f:
+                self.offset = int(f.read())
+        except FileNotFoundError:
+            self.offset = 0
+        self.saved_offset = self.offset
+        self.saved_at = time.monotonic()
+        # end offset of the chunks acknowledged after 'offset', by start offset
+        self.pending: Dict[int, int] = {}
+
+    def ack(self, start: int, count: int) -> None:
+        """
+        Record that the ``count`` actions starting at offset ``start`` were
+        acknowledged.
+        """
+        if start > self.offset:
+            self.pending[start] = start + count
+            return
+        self.offset = max(self.offset, start + count)
+        while self.offset in self.pending:
+            self.offset = self.pending.pop(self.offset)
+        if time.monotonic() - self.saved_at >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Write the offset to the file, replacing it atomically.
+        """
+        if self.offset != self.saved_offset:
+            tmp_path = f"{os.fspath(self.path)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"%d\n" % self.offset)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.saved_offset = self.offset
+        self.saved_at = time.monotonic()
+
+    def __enter__(self) -> "BulkCheckpoint":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.save()
+
+
+class ScanCursor:
+    """
+    Position of a :func:`~elasticsearch.helpers.pit_scan`, to resume an
+    interrupted scan instead of starting it over: the id of its point in time
+    and the sort values of the last hit of the last page that was consumed.
+    Pass an instance as the ``cursor`` of
+    :func:`~elasticsearch.helpers.pit_scan`,
+    :func:`~elasticsearch.helpers.async_pit_scan` or ``Search.iterate()``,
+    along with the same query every time the scan is started.
+
+    The helpers search after the sort values of the cursor and move it
+    forward after each page. It is written to ``path`` at most every
+    ``interval`` seconds and when the helper stops, so that up to
+    ``interval`` seconds of hits can be yielded again after a crash. Delete
+    the file to start over.
+
+    The point in time is kept open until the scan is complete, to be
+    resumed. When it expired in the meantime, a new one is opened and
+    searched after the same sort values, which only works when the hits are
+    sorted by fields of their own: the ``_shard_doc`` tiebreaker doesn't
+    carry from a point in time to another, so the hits having the same sort
+    values as the last one are yielded again.
+
+    .. code-block:: python
+
+        cursor = ScanCursor("export.cursor")
+        for hit in pit_scan(client, {"sort": ["@timestamp", "id"]}, index="logs",
+                            cursor=cursor):
+            export(hit)
+
+    :arg path: file the cursor is kept in, read when it already exists,
+        ``None`` to only keep it in memory
+    :arg interval: minimum number of seconds between two writes of the file
+        (default: 10)
+    :arg pit_id: id of the point in time to resume, when not read from
+        ``path``
+    :arg search_after: sort values to resume after, when not read from
+        ``path``
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, "os.PathLike[str]"]] = None,
+        interval: float = 10.0,
+        pit_id: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self.pit_id = pit_id
+        self.search_after = search_after
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    state = json.loads(f.read())
+                self.pit_id = state["pit_id"]
+                self.search_after = state["search_after"]
+            except FileNotFoundError:
+                pass
+        self.saved = (self.pit_id, self.search_after)
+        self.saved_at = time.monotonic()
+
+    def advance(self, pit_id: Optional[str], search_after: Optional[List[Any]]) -> None:
+        """
+        Record that the hits up to the ones sorted by ``search_after`` were
+        consumed, from the point in time ``pit_id``.
+        """
+        self.pit_id = pit_id
+        self.search_after = search_after
+        if time.monotonic() - self.saved_at >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Write the cursor to the file, replacing it atomically.
+        """
+        if self.path is not None and (self.pit_id, self.search_after) != self.saved:
+            tmp_path = f"{os.fspath(self.path)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(
+                    json.dumps(
+                        {"pit_id": self.pit_id, "search_after": self.search_after}
+                    ).encode()
+                    + b"\n"
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.saved = (self.pit_id, self.search_after)
+        self.saved_at = time.monotonic()
+
+    def __enter__(self) -> "ScanCursor":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.save()
+
 
 def _chunk_actions(
     actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY],
-    chunk_size: int,
+    chunk_size: Union[int, AdaptiveChunkSize],
     max_chunk_bytes: int,
     serializer: Serializer,
+    max_chunk_compressed_bytes: Optional[int] = None,
 ) -> Iterable[
     Tuple[
         List[
@@ -228,84 +1169,445 @@ def _chunk_actions(
     Split actions into chunks by number or size, serialize them into strings in
     the process.
     """
+    adaptive = None
+    if isinstance(chunk_size, AdaptiveChunkSize):
+        adaptive, chunk_size = chunk_size, chunk_size.chunk_size
     chunker = _ActionChunker(
-        chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, serializer=serializer
+        chunk_size=chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        serializer=serializer,
+        max_chunk_compressed_bytes=max_chunk_compressed_bytes,
     )
     for action, data in actions:
         ret = chunker.feed(action, data)
         if ret:
             yield ret
+            # the chunk has been sent by now, pick up any adjustment
+            if adaptive:
+                chunker.chunk_size = adaptive.chunk_size
     ret = chunker.flush()
     if ret:
         yield ret
 
 
-def _process_bulk_chunk_success(
-    resp: Dict[str, Any],
-    bulk_data: List[
-        Union[
-            Tuple[_TYPE_BULK_ACTION_HEADER],
-            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
-        ]
-    ],
-    ignore_status: Collection[int],
-    raise_on_error: bool = True,
-) -> Iterator[Tuple[bool, Dict[str, Any]]]:
-    # if raise on error is set, we need to collect errors per chunk before raising them
-    errors = []
+def _chunk_actions_by_node(
+    client: Elasticsearch,
+    actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY],
+    chunk_size: Union[int, AdaptiveChunkSize],
+    max_chunk_bytes: int,
+    serializer: Serializer,
+    max_chunk_compressed_bytes: Optional[int] = None,
+    default_index: Optional[str] = None,
+) -> Iterable[
+    Tuple[
+        Elasticsearch,
+        Tuple[
+            List[
+                Union[
+                    Tuple[_TYPE_BULK_ACTION_HEADER],
+                    Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+                ]
+            ],
+            List[bytes],
+        ],
+        float,
+    ]
+]:
+    """
+    Same as :func:`_chunk_actions` but actions are grouped by the node holding
+    their primary shard, each chunk is yielded along with the client to send
+    it with and the number of seconds spent since the previous chunk resolving
+    shard layouts (requests to the cluster, not serialization). Actions whose
+    shard can't be known (no ``_id``, index that can't be routed, ...) are
+    sent through ``client`` as usual.
+    """
+    adaptive = None
+    if isinstance(chunk_size, AdaptiveChunkSize):
+        adaptive, chunk_size = chunk_size, chunk_size.chunk_size
+    router = _ShardRouter(client)
+    chunkers: Dict[Optional[Tuple[str, int]], _ActionChunker] = {}
+    try:
+        for action, data in actions:
+            header = action if isinstance(action, dict) else _action_header(action)
+            meta = next(iter(header.values()), None)
+            address = None
+            if isinstance(meta, dict):
+                routing = meta.get("routing", meta.get("_id"))
+                address = router.node_for(
+                    meta.get("_index", default_index),
+                    None if routing is None else str(routing),
+                )
 
-    # go through request-response pairs and detect failures
-    for data, (op_type, item) in zip(
-        bulk_data, map(methodcaller("popitem"), resp["items"])
-    ):
-        status_code = item.get("status", 500)
+            chunker = chunkers.get(address)
+            if chunker is None:
+                chunker = chunkers[address] = _ActionChunker(
+                    chunk_size=chunk_size,
+                    max_chunk_bytes=max_chunk_bytes,
+                    serializer=serializer,
+                    max_chunk_compressed_bytes=max_chunk_compressed_bytes,
+                )
+            ret = chunker.feed(action, data)
+            if ret:
+                resolve_time, router.resolve_time = router.resolve_time, 0.0
+                yield (
+                    client if address is None else router.client_for(address),
+                    ret,
+                    resolve_time,
+                )
+                # the chunk has been sent by now, pick up any adjustment
+                if adaptive:
+                    chunk_size = adaptive.chunk_size
+                    for chunker in chunkers.values():
+                        chunker.chunk_size = chunk_size
+                router.refresh()
+
+        for address, chunker in chunkers.items():
+            ret = chunker.flush()
+            if ret:
+                resolve_time, router.resolve_time = router.resolve_time, 0.0
+                yield (
+                    client if address is None else router.client_for(address),
+                    ret,
+                    resolve_time,
+                )
+    finally:
+        router.close()
 
-        ok = 200 <= status_code < 300
-        if not ok and raise_on_error and status_code not in ignore_status:
-            # include original document source
-            if len(data) > 1:
-                item["data"] = data[1]
-            errors.append({op_type: item})
 
-        if ok or not errors:
-            # if we are not just recording all errors to be able to raise
-            # them all at once, yield items individually
-            yield ok, {op_type: item}
+# serializer of the worker processes used by _chunk_actions_in_processes()
+_process_serializer: Optional[Serializer] = None
 
-    if errors:
-        raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
 
+def _init_serializer_process(serializer: Serializer) -> None:
+    global _process_serializer
+    _process_serializer = serializer
 
-def _process_bulk_chunk_error(
-    error: ApiError,
-    bulk_data: List[
-        Union[
-            Tuple[_TYPE_BULK_ACTION_HEADER],
-            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
-        ]
-    ],
-    ignore_status: Collection[int],
-    raise_on_exception: bool = True,
-    raise_on_error: bool = True,
-) -> Iterable[Tuple[bool, Dict[str, Any]]]:
-    # default behavior - just propagate exception
-    if raise_on_exception and error.status_code not in ignore_status:
-        raise error
 
-    # if we are not propagating, mark all actions in current chunk as failed
-    err_message = str(error)
-    exc_errors = []
+def _serialize_actions(
+    actions: List[_TYPE_BULK_ACTION_HEADER_AND_BODY],
+    max_chunk_bytes: int,
+    max_chunk_compressed_bytes: Optional[int] = None,
+) -> List[Tuple[int, bytes]]:
+    """
+    Serialize actions into one or more chunks (when they don't fit in
+    ``max_chunk_bytes``) in a worker process. Returns the number of actions and
+    the body of each chunk.
+    """
+    assert _process_serializer is not None
+    chunker = _ActionChunker(
+        chunk_size=len(actions),
+        max_chunk_bytes=max_chunk_bytes,
+        serializer=_process_serializer,
+        max_chunk_compressed_bytes=max_chunk_compressed_bytes,
+    )
+    chunks = []
+    for action, data in actions:
+        ret = chunker.feed(action, data)
+        if ret:
+            chunks.append((len(ret[0]), ret[1][0]))
+    ret = chunker.flush()
+    if ret:
+        chunks.append((len(ret[0]), ret[1][0]))
+    return chunks
 
-    for data in bulk_data:
-        # collect all the information about failed actions
-        op_type, action = data[0].copy().popitem()
-        info = {"error": err_message, "status": error.status_code, "exception": error}
-        if op_type != "delete" and len(data) > 1:
-            info["data"] = data[1]
-        info.update(action)
-        exc_errors.append({op_type: info})
 
-    # emulate standard behavior for failed actions
+def _chunk_actions_in_processes(
+    actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY],
+    chunk_size: int,
+    max_chunk_bytes: int,
+    serializer: Serializer,
+    process_count: int,
+    max_chunk_compressed_bytes: Optional[int] = None,
+    in_flight_bytes: Optional["_InFlightBytes"] = None,
+) -> Iterable[
+    Tuple[
+        List[
+            Union[
+                Tuple[_TYPE_BULK_ACTION_HEADER],
+                Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+            ]
+        ],
+        List[bytes],
+    ]
+]:
+    """
+    Same as :func:`_chunk_actions` but the actions are serialized by a pool of
+    worker processes, each one with its own copy of the serializer. Chunks are
+    still yielded in the order of the actions.
+
+    The chunks yielded are already counted in ``in_flight_bytes``. The bytes
+    of a batch of actions are acquired before it is sent to the processes,
+    estimated from the size of the previous batch once serialized.
+    """
+    import multiprocessing
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    actions = iter(actions)
+    # keep every worker busy while bounding the number of actions in memory
+    pending: Deque[
+        Tuple[
+            List[_TYPE_BULK_ACTION_HEADER_AND_BODY],
+            int,
+            "Future[List[Tuple[int, bytes]]]",
+        ]
+    ] = deque()
+    exhausted = False
+    # serialized size of the last batch, None until one is known
+    batch_size: Optional[int] = None
+    # The pool is started by whichever thread consumes the chunks first, one
+    # of the threads of the parallel_bulk() pool. Forking a process running
+    # threads can leave the child with locks held by threads that don't
+    # exist there.
+    with ProcessPoolExecutor(
+        process_count,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_serializer_process,
+        initargs=(serializer,),
+    ) as executor:
+        while True:
+            # only one batch at a time until the size of one is known
+            window = (
+                1
+                if in_flight_bytes is not None and batch_size is None
+                else 2 * process_count
+            )
+            while not exhausted and len(pending) < window:
+                reserved = batch_size or 0
+                if in_flight_bytes is not None:
+                    # the batches already sent only free bytes once yielded
+                    if not pending:
+                        in_flight_bytes.acquire(reserved)
+                    elif not in_flight_bytes.try_acquire(reserved):
+                        break
+                batch = list(islice(actions, chunk_size))
+                if not batch:
+                    if in_flight_bytes is not None:
+                        in_flight_bytes.release(reserved)
+                    exhausted = True
+                    break
+                pending.append(
+                    (
+                        batch,
+                        reserved,
+                        executor.submit(
+                            _serialize_actions,
+                            batch,
+                            max_chunk_bytes,
+                            max_chunk_compressed_bytes,
+                        ),
+                    )
+                )
+            if not pending:
+                break
+
+            batch, reserved, future = pending.popleft()
+            chunks = future.result()
+            batch_size = sum(len(body) for _, body in chunks)
+            if in_flight_bytes is not None:
+                # the estimate is replaced by the actual size, the memory is
+                # in use already
+                in_flight_bytes.resize(reserved, batch_size)
+            start = 0
+            for action_count, body in chunks:
+                yield [
+                    (action,) if data is None else (action, data)
+                    for action, data in batch[start : start + action_count]
+                ], [body]
+                start += action_count
+
+
+def _bulk_item_slices(
+    bulk_actions: List[bytes],
+    bulk_data: List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ],
+) -> List[memoryview]:
+    """
+    Slice a serialized bulk body back into the bytes of each of its items
+    (action line plus optional data line) without copying or re-serializing
+    anything.
+    """
+    body = bulk_actions[0] if len(bulk_actions) == 1 else b"".join(bulk_actions)
+    view = memoryview(body)
+    slices = []
+    start = 0
+    for data in bulk_data:
+        # every item is made of one line per element of its bulk data tuple
+        end = start
+        for _ in data:
+            end = body.index(b"\n", end) + 1
+        slices.append(view[start:end])
+        start = end
+    return slices
+
+
+def _chunk_offsets(
+    chunks: Iterable[
+        Tuple[
+            List[
+                Union[
+                    Tuple[_TYPE_BULK_ACTION_HEADER],
+                    Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+                ]
+            ],
+            List[bytes],
+        ]
+    ],
+    start: int,
+) -> Iterable[
+    Tuple[
+        int,
+        Tuple[
+            List[
+                Union[
+                    Tuple[_TYPE_BULK_ACTION_HEADER],
+                    Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+                ]
+            ],
+            List[bytes],
+        ],
+    ]
+]:
+    """
+    Pair chunks with the offset of their first action in the stream of actions.
+    """
+    for chunk in chunks:
+        yield start, chunk
+        start += len(chunk[0])
+
+
+class _InFlightBytes:
+    """
+    Number of bytes of the chunks that were serialized but whose results
+    weren't handled yet, holding back the serialization of more chunks while
+    it is over a limit.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self.condition:
+            # a chunk over the limit on its own is let through when alone
+            self.condition.wait_for(
+                lambda: self.closed or not self.used or self.used + size <= self.limit
+            )
+            self.used += size
+
+    def try_acquire(self, size: int) -> bool:
+        """
+        Same as :meth:`acquire` but returns ``False`` instead of waiting.
+        """
+        with self.condition:
+            if not self.closed and self.used and self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+    def resize(self, size: int, new_size: int) -> None:
+        """
+        Replace ``size`` bytes acquired by ``new_size`` ones, without waiting.
+        """
+        with self.condition:
+            self.used += new_size - size
+            self.condition.notify_all()
+
+    def close(self) -> None:
+        """
+        Stop holding back the producer, when the results aren't handled anymore.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def throttle(self, chunks: Iterable[T], size: Callable[[T], int]) -> Iterable[T]:
+        for chunk in chunks:
+            self.acquire(size(chunk))
+            yield chunk
+
+
+def _process_bulk_chunk_success(
+    resp: Dict[str, Any],
+    bulk_data: List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ],
+    ignore_status: Collection[int],
+    raise_on_error: bool = True,
+    yield_ok: bool = True,
+) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+    if not yield_ok and not resp["errors"]:
+        # nothing to report, spare going through the items
+        return
+
+    # if raise on error is set, we need to collect errors per chunk before raising them
+    errors = []
+
+    # go through request-response pairs and detect failures
+    for data, (op_type, item) in zip(
+        bulk_data, map(methodcaller("popitem"), resp["items"])
+    ):
+        status_code = item.get("status", 500)
+
+        ok = 200 <= status_code < 300
+        if not ok and raise_on_error and status_code not in ignore_status:
+            # include original document source
+            if len(data) > 1:
+                item["data"] = data[1]
+            errors.append({op_type: item})
+
+        if ok or not errors:
+            # if we are not just recording all errors to be able to raise
+            # them all at once, yield items individually
+            yield ok, {op_type: item}
+
+    if errors:
+        raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+
+
+def _process_bulk_chunk_error(
+    error: ApiError,
+    bulk_data: List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ],
+    ignore_status: Collection[int],
+    raise_on_exception: bool = True,
+    raise_on_error: bool = True,
+) -> Iterable[Tuple[bool, Dict[str, Any]]]:
+    # default behavior - just propagate exception
+    if raise_on_exception and error.status_code not in ignore_status:
+        raise error
+
+    # if we are not propagating, mark all actions in current chunk as failed
+    err_message = str(error)
+    exc_errors = []
+
+    for data in bulk_data:
+        # collect all the information about failed actions
+        op_type, action = _action_header(data[0]).popitem()
+        info = {"error": err_message, "status": error.status_code, "exception": error}
+        if op_type != "delete" and len(data) > 1:
+            info["data"] = data[1]
+        info.update(action)
+        exc_errors.append({op_type: info})
+
+    # emulate standard behavior for failed actions
     if raise_on_error and error.status_code not in ignore_status:
         raise BulkIndexError(
             f"{len(exc_errors)} document(s) failed to index.", exc_errors
@@ -329,19 +1631,41 @@ def _process_bulk_chunk(
     raise_on_error: bool = True,
     ignore_status: Union[int, Collection[int]] = (),
     *args: Any,
+    adaptive_chunk_size: Optional[AdaptiveChunkSize] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    serialization_time: float = 0.0,
+    attempt: int = 0,
+    yield_ok: bool = True,
     **kwargs: Any,
 ) -> Iterable[Tuple[bool, Dict[str, Any]]]:
     """
-    Send a bulk request to elasticsearch and process the output.
+    Send a bulk request to elasticsearch and process the output. With
+    ``yield_ok=False`` nothing is yielded for the responses without errors.
     """
     with client._otel.use_span(otel_span):
         if isinstance(ignore_status, int):
             ignore_status = (ignore_status,)
 
+        start = time.monotonic()
         try:
             # send the actual request
             resp = client.bulk(*args, operations=bulk_actions, **kwargs)  # type: ignore[arg-type]
         except ApiError as e:
+            if adaptive_chunk_size is not None:
+                adaptive_chunk_size.record_error(
+                    len(bulk_data), time.monotonic() - start, e
+                )
+            if on_chunk_complete is not None:
+                on_chunk_complete(
+                    _chunk_stats(
+                        bulk_actions,
+                        len(bulk_data),
+                        serialization_time,
+                        time.monotonic() - start,
+                        attempt,
+                        error=e,
+                    )
+                )
             gen = _process_bulk_chunk_error(
                 error=e,
                 bulk_data=bulk_data,
@@ -350,19 +1674,157 @@ def _process_bulk_chunk(
                 raise_on_error=raise_on_error,
             )
         else:
+            if adaptive_chunk_size is not None:
+                adaptive_chunk_size.record_response(
+                    len(bulk_data), time.monotonic() - start, resp.body
+                )
+            if on_chunk_complete is not None:
+                on_chunk_complete(
+                    _chunk_stats(
+                        bulk_actions,
+                        len(bulk_data),
+                        serialization_time,
+                        time.monotonic() - start,
+                        attempt,
+                        resp=resp.body,
+                    )
+                )
             gen = _process_bulk_chunk_success(
                 resp=resp.body,
                 bulk_data=bulk_data,
                 ignore_status=ignore_status,
                 raise_on_error=raise_on_error,
+                yield_ok=yield_ok,
             )
         yield from gen
 
 
+def _send_bulk_chunk(
+    client: Elasticsearch,
+    bulk_actions: List[bytes],
+    bulk_data: List[
+        Union[
+            Tuple[_TYPE_BULK_ACTION_HEADER],
+            Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+        ]
+    ],
+    otel_span: OpenTelemetrySpan,
+    raise_on_exception: bool,
+    raise_on_error: bool,
+    ignore_status: Collection[int],
+    max_retries: int,
+    initial_backoff: float,
+    max_backoff: float,
+    retry_on_status: Collection[int],
+    yield_ok: bool,
+    dead_letters_file: Optional[IO[bytes]],
+    *args: Any,
+    adaptive_chunk_size: Optional[AdaptiveChunkSize] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    serialization_time: float = 0.0,
+    **kwargs: Any,
+) -> Generator[Tuple[bool, Dict[str, Any]], None, BulkChunkResult]:
+    """
+    Send a chunk, retrying the items rejected with a status in
+    ``retry_on_status``, and yield the results of its items. Returns the
+    :class:`BulkChunkResult` of the chunk once all of them were yielded.
+    """
+    result = BulkChunkResult(len(bulk_data), [])
+
+    def chunk_complete(stats: BulkChunkStats) -> None:
+        # the last request of the chunk is the one reported
+        result.took = stats.took
+        if on_chunk_complete is not None:
+            on_chunk_complete(stats)
+
+    for attempt in range(max_retries + 1):
+        to_retry: List[memoryview] = []
+        to_retry_data: List[
+            Union[
+                Tuple[_TYPE_BULK_ACTION_HEADER],
+                Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
+            ]
+        ] = []
+        if attempt:
+            time.sleep(min(max_backoff, initial_backoff * 2 ** (attempt - 1)))
+
+        item_slices: Optional[List[memoryview]] = None
+        try:
+            for i, (data, (ok, info)) in enumerate(
+                zip(
+                    bulk_data,
+                    _process_bulk_chunk(
+                        client,
+                        bulk_actions,
+                        bulk_data,
+                        otel_span,
+                        raise_on_exception,
+                        raise_on_error and dead_letters_file is None,
+                        ignore_status,
+                        *args,
+                        adaptive_chunk_size=adaptive_chunk_size,
+                        on_chunk_complete=chunk_complete,
+                        serialization_time=(0.0 if attempt else serialization_time),
+                        attempt=attempt,
+                        yield_ok=yield_ok,
+                        **kwargs,
+                    ),
+                )
+            ):
+                if not ok:
+                    action, info = info.popitem()
+                    # retry if retries enabled, we are not in the last attempt,
+                    # and status in retry_on_status (defaulting to 429)
+                    if (
+                        max_retries
+                        and info["status"] in retry_on_status
+                        and (attempt + 1) <= max_retries
+                    ):
+                        # reuse the bytes the item was already
+                        # serialized to instead of serializing it again
+                        if item_slices is None:
+                            item_slices = _bulk_item_slices(bulk_actions, bulk_data)
+                        to_retry.append(item_slices[i])
+                        to_retry_data.append(data)
+                    else:
+                        if (
+                            dead_letters_file is not None
+                            and info["status"] not in ignore_status
+                        ):
+                            if item_slices is None:
+                                item_slices = _bulk_item_slices(bulk_actions, bulk_data)
+                            _write_dead_letter(
+                                dead_letters_file,
+                                {action: info},
+                                item_slices[i],
+                            )
+                        yield ok, {action: info}
+                        # include original document source
+                        result.failed.append(
+                            {action: {**info, "data": data[1]}}
+                            if len(data) > 1 and "data" not in info
+                            else {action: info}
+                        )
+                elif yield_ok:
+                    yield ok, info
+
+        except ApiError as e:
+            # suppress any status in retry_on_status (429 by default)
+            # since we will retry them
+            if attempt == max_retries or e.status_code not in retry_on_status:
+                raise
+        else:
+            if not to_retry:
+                break
+            # retry only subset of documents that didn't succeed
+            bulk_actions, bulk_data = [b"".join(to_retry)], to_retry_data
+    return result
+
+
 def streaming_bulk(
     client: Elasticsearch,
     actions: Iterable[_TYPE_BULK_ACTION],
-    chunk_size: int = 500,
+    chunk_size: Union[int, AdaptiveChunkSize] = 500,
     max_chunk_bytes: int = 100 * 1024 * 1024,
     raise_on_error: bool = True,
     expand_action_callback: Callable[
@@ -376,6 +1838,12 @@ def streaming_bulk(
     ignore_status: Union[int, Collection[int]] = (),
     retry_on_status: Union[int, Collection[int]] = (429,),
     span_name: str = "helpers.streaming_bulk",
+    max_chunk_compressed_bytes: Optional[int] = None,
+    shard_routing: bool = False,
+    dead_letters: Optional[_TYPE_DEAD_LETTERS] = None,
+    checkpoint: Optional[BulkCheckpoint] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    coalesce: Optional[ActionCoalescer] = None,
     *args: Any,
     **kwargs: Any,
 ) -> Iterable[Tuple[bool, Dict[str, Any]]]:
@@ -395,7 +1863,9 @@ def streaming_bulk(
 
     :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
     :arg actions: iterable containing the actions to be executed
-    :arg chunk_size: number of docs in one chunk sent to es (default: 500)
+    :arg chunk_size: number of docs in one chunk sent to es (default: 500), or
+        an :class:`~elasticsearch.helpers.AdaptiveChunkSize` instance to adjust
+        it while the actions are being sent
     :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
     :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
         from the execution of the last chunk when some occur. By default we raise.
@@ -415,15 +1885,55 @@ def streaming_bulk(
     :arg max_backoff: maximum number of seconds a retry will wait
     :arg yield_ok: if set to False will skip successful documents in the output
     :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg max_chunk_compressed_bytes: the maximum size of the request in bytes
+        once gzip compressed, for clients created with ``http_compress=True``.
+        The compressed size is estimated while the chunk is being serialized,
+        which takes some CPU on top of the compression done by the transport
+        when the chunk is sent.
+    :arg shard_routing: send each document straight to the node holding its
+        primary shard instead of to any node which would forward it. The
+        shard layout of the indices is read from the cluster state, which
+        requires the ``monitor`` cluster privilege. Chunks are then made of
+        the documents of a single node, results are yielded in the order the
+        chunks are sent rather than in the order of the actions.
+    :arg dead_letters: path of a file, or binary file object, to append the
+        items that failed to (except those with a status in
+        ``ignore_status``), along with their error. They are still yielded
+        but no ``BulkIndexError`` is raised for them. Use
+        :func:`~elasticsearch.helpers.replay_dead_letters` to send them again.
+    :arg checkpoint: :class:`~elasticsearch.helpers.BulkCheckpoint` to resume
+        the ingest from and to record its progress in, can't be used along
+        with ``shard_routing``
+    :arg on_chunk_complete: callback called with the
+        :class:`~elasticsearch.helpers.BulkChunkStats` of every bulk request
+        once it is answered
+    :arg coalesce: :class:`~elasticsearch.helpers.ActionCoalescer` merging
+        the actions on the same document before they are sent, can't be used
+        along with ``checkpoint``
     """
-    with client._otel.helpers_span(span_name) as otel_span:
+    if checkpoint is not None:
+        if shard_routing:
+            raise ValueError("'checkpoint' can't be used with 'shard_routing'")
+        if coalesce is not None:
+            raise ValueError("'checkpoint' can't be used with 'coalesce'")
+        actions = islice(actions, checkpoint.offset, None)
+    chunk_end = 0 if checkpoint is None else checkpoint.offset
+
+    with client._otel.helpers_span(span_name) as otel_span, _open_dead_letters(
+        dead_letters, "ab"
+    ) as dead_letters_file, (checkpoint or nullcontext()):
         client = client.options()
         client._client_meta = (("h", "bp"),)
 
         if isinstance(retry_on_status, int):
             retry_on_status = (retry_on_status,)
+        if isinstance(ignore_status, int):
+            ignore_status = (ignore_status,)
 
         serializer = client.transport.serializers.get_serializer("application/json")
+        adaptive_chunk_size = (
+            chunk_size if isinstance(chunk_size, AdaptiveChunkSize) else None
+        )
 
         bulk_data: List[
             Union[
@@ -432,207 +1942,1086 @@ def streaming_bulk(
             ]
         ]
         bulk_actions: List[bytes]
+        expanded_actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY] = map(
+            expand_action_callback, actions
+        )
+        if coalesce is not None:
+            expanded_actions = coalesce.coalesce(expanded_actions)
+        chunks = (
+            _chunk_actions_by_node(
+                client,
+                expanded_actions,
+                chunk_size,
+                max_chunk_bytes,
+                serializer,
+                max_chunk_compressed_bytes,
+                default_index=kwargs.get("index"),
+            )
+            if shard_routing
+            else (
+                (client, chunk, 0.0)
+                for chunk in _chunk_actions(
+                    expanded_actions,
+                    chunk_size,
+                    max_chunk_bytes,
+                    serializer,
+                    max_chunk_compressed_bytes,
+                )
+            )
+        )
+        for chunk_time, (
+            chunk_client,
+            (bulk_data, bulk_actions),
+            resolve_time,
+        ) in _timed(chunks):
+            # the requests resolving shard layouts aren't serialization
+            serialization_time = chunk_time - resolve_time
+            chunk_start, chunk_end = chunk_end, chunk_end + len(bulk_data)
+            yield from _send_bulk_chunk(
+                chunk_client,
+                bulk_actions,
+                bulk_data,
+                otel_span,
+                raise_on_exception,
+                raise_on_error,
+                ignore_status,
+                max_retries,
+                initial_backoff,
+                max_backoff,
+                retry_on_status,
+                yield_ok,
+                dead_letters_file,
+                *args,
+                adaptive_chunk_size=adaptive_chunk_size,
+                on_chunk_complete=on_chunk_complete,
+                serialization_time=serialization_time,
+                **kwargs,
+            )
+
+            if checkpoint is not None:
+                checkpoint.ack(chunk_start, chunk_end - chunk_start)
+
+
+def streaming_bulk_chunks(
+    client: Elasticsearch,
+    actions: Iterable[_TYPE_BULK_ACTION],
+    chunk_size: int = 500,
+    max_chunk_bytes: int = 100 * 1024 * 1024,
+    raise_on_error: bool = True,
+    expand_action_callback: Callable[
+        [_TYPE_BULK_ACTION], _TYPE_BULK_ACTION_HEADER_AND_BODY
+    ] = expand_action,
+    raise_on_exception: bool = True,
+    max_retries: int = 0,
+    initial_backoff: float = 2,
+    max_backoff: float = 600,
+    ignore_status: Union[int, Collection[int]] = (),
+    retry_on_status: Union[int, Collection[int]] = (429,),
+    max_chunk_compressed_bytes: Optional[int] = None,
+    *args: Any,
+    **kwargs: Any,
+) -> Iterable[BulkChunkResult]:
+    """
+    Version of :func:`~elasticsearch.helpers.streaming_bulk` yielding one
+    :class:`~elasticsearch.helpers.BulkChunkResult` per chunk instead of a
+    result per action. The items of the responses without errors aren't
+    looked at, which saves most of the time spent processing the results of
+    large ingests::
+
+        for result in streaming_bulk_chunks(client, actions):
+            indexed += result.success_count
+            for item in result.failed:
+                print("A document failed:", item)
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg actions: iterable containing the actions to be executed
+    :arg chunk_size: number of docs in one chunk sent to es (default: 500)
+    :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
+    :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
+        from the execution of the last chunk when some occur. By default we raise.
+    :arg raise_on_exception: if ``False`` then don't propagate exceptions from
+        call to ``bulk`` and just report the items that failed as failed.
+    :arg expand_action_callback: callback executed on each action passed in,
+        should return a tuple containing the action line and the data line
+        (`None` if data line should be omitted).
+    :arg max_retries: maximum number of times a document will be retried when
+        retry_on_status (defaulting to ``429``) is received,
+        set to 0 (default) for no retries
+    :arg initial_backoff: number of seconds we should wait before the first
+        retry. Any subsequent retries will be powers of ``initial_backoff *
+        2**retry_number``
+    :arg max_backoff: maximum number of seconds a retry will wait
+    :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg retry_on_status: HTTP status code that will trigger a retry.
+        (if `None` is specified only status 429 will retry).
+    :arg max_chunk_compressed_bytes: the maximum size of the request in bytes
+        once gzip compressed, for clients created with ``http_compress=True``.
+        The compressed size is estimated while the chunk is being serialized,
+        which takes some CPU on top of the compression done by the transport
+        when the chunk is sent.
+    """
+    if isinstance(retry_on_status, int):
+        retry_on_status = (retry_on_status,)
+    if isinstance(ignore_status, int):
+        ignore_status = (ignore_status,)
+
+    with client._otel.helpers_span("helpers.streaming_bulk_chunks") as otel_span:
+        client = client.options()
+        client._client_meta = (("h", "bp"),)
+        serializer = client.transport.serializers.get_serializer("application/json")
+
         for bulk_data, bulk_actions in _chunk_actions(
             map(expand_action_callback, actions),
             chunk_size,
             max_chunk_bytes,
             serializer,
+            max_chunk_compressed_bytes,
         ):
-            for attempt in range(max_retries + 1):
-                to_retry: List[bytes] = []
-                to_retry_data: List[
-                    Union[
-                        Tuple[_TYPE_BULK_ACTION_HEADER],
-                        Tuple[_TYPE_BULK_ACTION_HEADER, _TYPE_BULK_ACTION_BODY],
-                    ]
-                ] = []
-                if attempt:
-                    time.sleep(min(max_backoff, initial_backoff * 2 ** (attempt - 1)))
+            result = _drain(
+                _send_bulk_chunk(
+                    client,
+                    bulk_actions,
+                    bulk_data,
+                    otel_span,
+                    raise_on_exception,
+                    # raised once the rejected items were retried
+                    False,
+                    ignore_status,
+                    max_retries,
+                    initial_backoff,
+                    max_backoff,
+                    retry_on_status,
+                    # the failed items are in the result of the chunk
+                    False,
+                    None,
+                    *args,
+                    **kwargs,
+                )
+            )
+            if raise_on_error:
+                errors = [
+                    item
+                    for item in result.failed
+                    if next(iter(item.values())).get("status", 500) not in ignore_status
+                ]
+                if errors:
+                    raise BulkIndexError(
+                        f"{len(errors)} document(s) failed to index.", errors
+                    )
+            yield result
+
+
+class BulkErrors(List[Dict[str, Any]]):
+    """
+    List of the first ``max_errors`` errors returned by
+    :func:`~elasticsearch.helpers.bulk` when ``max_errors`` is given, along
+    with the number of all the errors by status and error type, so that the
+    memory used doesn't grow with the number of failed items.
+    """
+
+    def __init__(self, max_errors: int) -> None:
+        super().__init__()
+        self.max_errors = max_errors
+        #: number of errors by ``(status, error type)``, the type being
+        #: ``None`` for the items of bulk requests that failed as a whole
+        self.counts: Dict[Tuple[int, Optional[str]], int] = {}
+        #: number of errors, including the ones that weren't kept
+        self.total = 0
+
+    def append(self, item: Dict[str, Any]) -> None:
+        info = next(iter(item.values()))
+        error = info.get("error")
+        key = (
+            info.get("status", 500),
+            error.get("type") if isinstance(error, dict) else None,
+        )
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        if len(self) < self.max_errors:
+            super().append(item)
+
+    def __repr__(self) -> str:
+        return f"BulkErrors({super().__repr__()}, total={self.total})"
+
+
+def bulk(
+    client: Elasticsearch,
+    actions: Iterable[_TYPE_BULK_ACTION],
+    stats_only: bool = False,
+    ignore_status: Union[int, Collection[int]] = (),
+    *args: Any,
+    max_errors: Optional[int] = None,
+    on_error: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **kwargs: Any,
+) -> Tuple[int, Union[int, List[Dict[str, Any]]]]:
+    """
+    Helper for the :meth:`~elasticsearch.Elasticsearch.bulk` api that provides
+    a more human friendly interface - it consumes an iterator of actions and
+    sends them to elasticsearch in chunks. It returns a tuple with summary
+    information - number of successfully executed actions and either list of
+    errors or number of errors if ``stats_only`` is set to ``True``. Note that
+    by default we raise a ``BulkIndexError`` when we encounter an error so
+    options like ``stats_only`` only apply when ``raise_on_error`` is set to
+    ``False``.
+
+    When errors are being collected original document data is included in the
+    error dictionary which can lead to an extra high memory usage. If you need
+    to process a lot of data and want to ignore/collect errors please consider
+    using the :func:`~elasticsearch.helpers.streaming_bulk` helper which will
+    just return the errors and not store them in memory, or pass a
+    ``dead_letters`` file along with ``stats_only=True`` to write them to disk.
+    ``max_errors`` bounds the number of errors kept and ``on_error`` receives
+    every one of them as they occur::
+
+        success, errors = bulk(
+            client, actions, raise_on_error=False, max_errors=100, on_error=log_error
+        )
+        print(f"{errors.total} errors, by status and type: {errors.counts}")
+
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg actions: iterator containing the actions
+    :arg stats_only: if `True` only report number of successful/failed
+        operations instead of just number of successful and a list of error responses
+    :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg max_errors: number of errors to keep, the errors are then returned as
+        a :class:`~elasticsearch.helpers.BulkErrors` counting all of them by
+        status and error type
+    :arg on_error: callback called with every error as it occurs, also when
+        ``stats_only`` is set
+
+    Any additional keyword arguments will be passed to
+    :func:`~elasticsearch.helpers.streaming_bulk` which is used to execute
+    the operation, see :func:`~elasticsearch.helpers.streaming_bulk` for more
+    accepted parameters.
+    """
+    success, failed = 0, 0
+
+    # list of errors to be collected is not stats_only
+    errors: List[Dict[str, Any]] = [] if max_errors is None else BulkErrors(max_errors)
+
+    # make streaming_bulk yield successful results so we can count them
+    kwargs["yield_ok"] = True
+    for ok, item in streaming_bulk(
+        client, actions, ignore_status=ignore_status, span_name="helpers.bulk", *args, **kwargs  # type: ignore[misc]
+    ):
+        # go through request-response pairs and detect failures
+        if not ok:
+            if on_error is not None:
+                on_error(item)
+            if not stats_only:
+                errors.append(item)
+            failed += 1
+        else:
+            success += 1
+
+    return success, failed if stats_only else errors
+
+
+def parallel_bulk(
+    client: Elasticsearch,
+    actions: Iterable[_TYPE_BULK_ACTION],
+    thread_count: int = 4,
+    chunk_size: int = 500,
+    max_chunk_bytes: int = 100 * 1024 * 1024,
+    queue_size: int = 4,
+    expand_action_callback: Callable[
+        [_TYPE_BULK_ACTION], _TYPE_BULK_ACTION_HEADER_AND_BODY
+    ] = expand_action,
+    ignore_status: Union[int, Collection[int]] = (),
+    process_count: int = 0,
+    max_chunk_compressed_bytes: Optional[int] = None,
+    ordered: bool = True,
+    dead_letters: Optional[_TYPE_DEAD_LETTERS] = None,
+    checkpoint: Optional[BulkCheckpoint] = None,
+    max_in_flight_bytes: Optional[int] = None,
+    on_chunk_complete: Optional[Callable[[BulkChunkStats], None]] = None,
+    coalesce: Optional[ActionCoalescer] = None,
+    *args: Any,
+    **kwargs: Any,
+) -> Iterable[Tuple[bool, Any]]:
+    """
+    Parallel version of the bulk helper run in multiple threads at once.
+
+    Actions are serialized in the calling thread by default, which limits the
+    throughput to a single CPU core when serializing documents is expensive.
+    Set ``process_count`` to serialize them in a pool of worker processes
+    instead, the threads then only send the ready chunks. The actions
+    (after ``expand_action_callback``) and the client's JSON serializer must
+    be picklable in that case.
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg actions: iterator containing the actions
+    :arg thread_count: size of the threadpool to use for the bulk requests
+    :arg chunk_size: number of docs in one chunk sent to es (default: 500)
+    :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
+    :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
+        from the execution of the last chunk when some occur. By default we raise.
+    :arg raise_on_exception: if ``False`` then don't propagate exceptions from
+        call to ``bulk`` and just report the items that failed as failed.
+    :arg expand_action_callback: callback executed on each action passed in,
+        should return a tuple containing the action line and the data line
+        (`None` if data line should be omitted).
+    :arg queue_size: size of the task queue between the main thread (producing
+        chunks to send) and the processing threads.
+    :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg process_count: number of worker processes serializing the actions into
+        chunks, ``0`` (default) to serialize them in the calling thread. The
+        processes are spawned rather than forked, so the serializer of the
+        client must be picklable and the main module importable without side
+        effects (guarded by ``if __name__ == "__main__":``)
+    :arg max_chunk_compressed_bytes: the maximum size of the request in bytes
+        once gzip compressed, for clients created with ``http_compress=True``.
+        The compressed size is estimated while the chunk is being serialized,
+        which takes some CPU on top of the compression done by the transport
+        when the chunk is sent.
+    :arg ordered: set to ``False`` to yield the results of each chunk as soon
+        as it is processed instead of in the order of the actions, so that a
+        slow chunk doesn't hold back the results of the ones sent after it
+    :arg dead_letters: path of a file, or binary file object, to append the
+        items that failed to, see :func:`~elasticsearch.helpers.streaming_bulk`
+    :arg checkpoint: :class:`~elasticsearch.helpers.BulkCheckpoint` to resume
+        the ingest from and to record its progress in
+    :arg max_in_flight_bytes: maximum number of bytes of the chunks serialized
+        but whose results weren't yielded yet. Serializing chunks is paused
+        while it is reached, which bounds the memory used by the queued and
+        processing chunks regardless of ``queue_size``, ``thread_count`` and
+        ``max_chunk_bytes``. A chunk larger than the limit is only sent alone.
+        With ``process_count``, the actions being serialized by the processes
+        are counted too, estimated from the size of the previous ones.
+    :arg on_chunk_complete: callback called with the
+        :class:`~elasticsearch.helpers.BulkChunkStats` of every bulk request
+        once it is answered, from the thread that sent it
+    :arg coalesce: :class:`~elasticsearch.helpers.ActionCoalescer` merging
+        the actions on the same document before they are sent, can't be used
+        along with ``checkpoint``
+    """
+    # Avoid importing multiprocessing unless parallel_bulk is used
+    # to avoid exceptions on restricted environments like App Engine
+    from multiprocessing.pool import ThreadPool
+
+    if checkpoint is not None:
+        if coalesce is not None:
+            raise ValueError("'checkpoint' can't be used with 'coalesce'")
+        actions = islice(actions, checkpoint.offset, None)
+    expanded_actions: Iterable[_TYPE_BULK_ACTION_HEADER_AND_BODY] = map(
+        expand_action_callback, actions
+    )
+    if coalesce is not None:
+        expanded_actions = coalesce.coalesce(expanded_actions)
+    serializer = client.transport.serializers.get_serializer("application/json")
+
+    class BlockingPool(ThreadPool):
+        def _setup_queues(self) -> None:
+            super()._setup_queues()  # type: ignore[misc]
+            # The queue must be at least the size of the number of threads to
+            # prevent hanging when inserting sentinel values during teardown.
+            self._inqueue: Queue[
+                Tuple[
+                    List[
+                        Union[
+                            Tuple[Dict[str, Any]], Tuple[Dict[str, Any], Dict[str, Any]]
+                        ]
+                    ],
+                    List[bytes],
+                ]
+            ] = Queue(max(queue_size, thread_count))
+            self._quick_put = self._inqueue.put
+
+    if isinstance(ignore_status, int):
+        ignore_status = (ignore_status,)
+
+    in_flight_bytes = (
+        None if max_in_flight_bytes is None else _InFlightBytes(max_in_flight_bytes)
+    )
+
+    with client._otel.helpers_span(
+        "helpers.parallel_bulk"
+    ) as otel_span, _open_dead_letters(dead_letters, "ab") as dead_letters_file, (
+        checkpoint or nullcontext()
+    ):
+        if dead_letters_file is not None:
+            # failed items are written to the file instead
+            kwargs["raise_on_error"] = False
+        pool = BlockingPool(thread_count)
+        chunks = _timed(
+            _chunk_offsets(
+                (
+                    _chunk_actions_in_processes(
+                        expanded_actions,
+                        chunk_size,
+                        max_chunk_bytes,
+                        serializer,
+                        process_count,
+                        max_chunk_compressed_bytes,
+                        in_flight_bytes,
+                    )
+                    if process_count
+                    else _chunk_actions(
+                        expanded_actions,
+                        chunk_size,
+                        max_chunk_bytes,
+                        serializer,
+                        max_chunk_compressed_bytes,
+                    )
+                ),
+                0 if checkpoint is None else checkpoint.offset,
+            )
+        )
+        # the chunks serialized by processes are counted before being sent
+        # to them
+        if in_flight_bytes is not None and not process_count:
+            chunks = in_flight_bytes.throttle(
+                chunks, lambda bulk_chunk: sum(map(len, bulk_chunk[1][1][1]))
+            )
 
+        def process_chunk(
+            bulk_chunk: Tuple[float, Tuple[int, _TYPE_BULK_CHUNK]],
+        ) -> Tuple[int, _TYPE_BULK_CHUNK, List[Tuple[bool, Dict[str, Any]]]]:
+            serialization_time, (chunk_start, (bulk_data, bulk_actions)) = bulk_chunk
+            return (
+                chunk_start,
+                (bulk_data, bulk_actions),
+                list(
+                    _process_bulk_chunk(
+                        client,
+                        bulk_actions,
+                        bulk_data,
+                        otel_span=otel_span,
+                        ignore_status=ignore_status,  # type: ignore[misc]
+                        *args,
+                        on_chunk_complete=on_chunk_complete,
+                        serialization_time=serialization_time,
+                        **kwargs,
+                    )
+                ),
+            )
+
+        try:
+            for chunk_start, (bulk_data, bulk_actions), result in (
+                pool.imap if ordered else pool.imap_unordered
+            )(process_chunk, chunks):
+                if dead_letters_file is not None:
+                    item_slices: Optional[List[memoryview]] = None
+                    for i, (ok, info) in enumerate(result):
+                        if ok or next(iter(info.values()))["status"] in ignore_status:
+                            continue
+                        if item_slices is None:
+                            item_slices = _bulk_item_slices(bulk_actions, bulk_data)
+                        _write_dead_letter(dead_letters_file, info, item_slices[i])
+                yield from result
+                if checkpoint is not None:
+                    checkpoint.ack(chunk_start, len(bulk_data))
+                if in_flight_bytes is not None:
+                    in_flight_bytes.release(sum(map(len, bulk_actions)))
+
+        finally:
+            if in_flight_bytes is not None:
+                in_flight_bytes.close()
+            pool.close()
+            pool.join()
+
+
+def fanout_bulk(
+    clients: Sequence[Elasticsearch],
+    actions: Iterable[_TYPE_BULK_ACTION],
+    chunk_size: int = 500,
+    max_chunk_bytes: int = 100 * 1024 * 1024,
+    max_lag: int = 4,
+    raise_on_error: bool = True,
+    expand_action_callback: Callable[
+        [_TYPE_BULK_ACTION], _TYPE_BULK_ACTION_HEADER_AND_BODY
+    ] = expand_action,
+    raise_on_exception: bool = True,
+    max_retries: int = 0,
+    initial_backoff: float = 2,
+    max_backoff: float = 600,
+    yield_ok: bool = True,
+    ignore_status: Union[int, Collection[int]] = (),
+    retry_on_status: Union[int, Collection[int]] = (429,),
+    max_chunk_compressed_bytes: Optional[int] = None,
+    *args: Any,
+    **kwargs: Any,
+) -> Iterable[Tuple[int, bool, Dict[str, Any]]]:
+    """
+    Send the same actions to several clusters at once, like running
+    :func:`~elasticsearch.helpers.streaming_bulk` for each of them but with
+    every chunk serialized only once. Each cluster gets its chunks from its
+    own thread, retries them on its own and the results are yielded as
+    ``(cluster, ok, info)`` tuples, ``cluster`` being the position of its
+    client in ``clients``::
+
+        for cluster, ok, info in fanout_bulk([primary, replica], actions):
+            if not ok:
+                print(f"A document failed on cluster {cluster}:", info)
+
+    A cluster that is slower than the others holds them back only once it is
+    ``max_lag`` chunks behind, no more chunks are serialized until it catches
+    up. The results of each cluster are yielded in the order of the actions,
+    interleaved with the ones of the other clusters. An error raised for a
+    cluster (see ``raise_on_error`` and ``raise_on_exception``) stops them
+    all, the number of chunks that were then not sent to each cluster is
+    logged as a warning.
+
+    :arg clients: instances of :class:`~elasticsearch.Elasticsearch` to use,
+        one per cluster
+    :arg actions: iterable containing the actions to be executed
+    :arg chunk_size: number of docs in one chunk sent to es (default: 500)
+    :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
+    :arg max_lag: number of chunks a cluster can fall behind the fastest one
+        before the others wait for it (default: 4)
+    :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
+        from the execution of the last chunk when some occur. By default we raise.
+    :arg raise_on_exception: if ``False`` then don't propagate exceptions from
+        call to ``bulk`` and just report the items that failed as failed.
+    :arg expand_action_callback: callback executed on each action passed in,
+        should return a tuple containing the action line and the data line
+        (`None` if data line should be omitted).
+    :arg max_retries: maximum number of times a document will be retried when
+        retry_on_status (defaulting to ``429``) is received,
+        set to 0 (default) for no retries
+    :arg initial_backoff: number of seconds we should wait before the first
+        retry. Any subsequent retries will be powers of ``initial_backoff *
+        2**retry_number``
+    :arg max_backoff: maximum number of seconds a retry will wait
+    :arg yield_ok: if set to False will skip successful documents in the output
+    :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg retry_on_status: HTTP status code that will trigger a retry.
+        (if `None` is specified only status 429 will retry).
+    :arg max_chunk_compressed_bytes: the maximum size of the request in bytes
+        once gzip compressed, for clients created with ``http_compress=True``.
+        The compressed size is estimated while the chunk is being serialized,
+        which takes some CPU on top of the compression done by the transport
+        when the chunk is sent.
+    """
+    if not clients:
+        raise ValueError("'clients' must contain at least one client")
+    if max_lag < 1:
+        raise ValueError("'max_lag' must be at least 1")
+    if isinstance(retry_on_status, int):
+        retry_on_status = (retry_on_status,)
+    if isinstance(ignore_status, int):
+        ignore_status = (ignore_status,)
+
+    serializer = clients[0].transport.serializers.get_serializer("application/json")
+    # chunks waiting to be sent to each cluster, None once there are no more
+    chunk_queues: List[Queue[Optional[_TYPE_BULK_CHUNK]]] = [
+        Queue(max_lag) for _ in clients
+    ]
+    # results of the chunks sent to each cluster along with the exception that
+    # stopped it if any, None instead of the results once it is done. Room is
+    # left for every cluster to report its last chunk and stop once the
+    # others were stopped.
+    results: Queue[
+        Tuple[int, Optional[List[Tuple[bool, Dict[str, Any]]]], Optional[BaseException]]
+    ] = Queue((max_lag + 1) * len(clients))
+    running = len(clients)
+    stopped = threading.Event()
+    # number of chunks not sent to each cluster once stopped
+    dropped = [0] * len(clients)
+    # notified when a cluster takes a chunk or reports one
+    progress = threading.Condition()
+
+    with clients[0]._otel.helpers_span("helpers.fanout_bulk") as otel_span:
+
+        def send_chunks(cluster: int, client: Elasticsearch) -> None:
+            client = client.options()
+            client._client_meta = (("h", "bp"),)
+            chunk_queue = chunk_queues[cluster]
+            while True:
+                bulk_chunk = chunk_queue.get()
+                with progress:
+                    progress.notify()
+                if bulk_chunk is None:
+                    break
+                if stopped.is_set():
+                    # keep taking the chunks so that they aren't waited for
+                    dropped[cluster] += 1
+                    continue
+                bulk_data, bulk_actions = bulk_chunk
+                chunk_results: List[Tuple[bool, Dict[str, Any]]] = []
+                error: Optional[BaseException] = None
                 try:
-                    for data, (ok, info) in zip(
+                    for result in _send_bulk_chunk(
+                        client,
+                        bulk_actions,
                         bulk_data,
-                        _process_bulk_chunk(
-                            client,
-                            bulk_actions,
-                            bulk_data,
-                            otel_span,
-                            raise_on_exception,
-                            raise_on_error,
-                            ignore_status,
-                            *args,
-                            **kwargs,
-                        ),
+                        otel_span,
+                        raise_on_exception,
+                        raise_on_error,
+                        ignore_status,
+                        max_retries,
+                        initial_backoff,
+                        max_backoff,
+                        retry_on_status,
+                        yield_ok,
+                        None,
+                        *args,
+                        **kwargs,
                     ):
-                        if not ok:
-                            action, info = info.popitem()
-                            # retry if retries enabled, we are not in the last attempt,
-                            # and status in retry_on_status (defaulting to 429)
-                            if (
-                                max_retries
-                                and info["status"] in retry_on_status
-                                and (attempt + 1) <= max_retries
-                            ):
-                                # _process_bulk_chunk expects bytes so we need to
-                                # re-serialize the data
-                                to_retry.extend(map(serializer.dumps, data))
-                                to_retry_data.append(data)
-                            else:
-                                yield ok, {action: info}
-                        elif yield_ok:
-                            yield ok, info
-
-                except ApiError as e:
-                    # suppress any status in retry_on_status (429 by default)
-                    # since we will retry them
-                    if attempt == max_retries or e.status_code not in retry_on_status:
-                        raise
-                else:
-                    if not to_retry:
+                        chunk_results.append(result)
+                except BaseException as e:
+                    stopped.set()
+                    error = e
+                results.put((cluster, chunk_results, error))
+                with progress:
+                    progress.notify()
+            results.put((cluster, None, None))
+
+        def take_result() -> Iterable[Tuple[int, bool, Dict[str, Any]]]:
+            nonlocal running
+            cluster, chunk_results, error = results.get()
+            if chunk_results is None:
+                running -= 1
+                return
+            for ok, info in chunk_results:
+                yield cluster, ok, info
+            if error is not None:
+                raise error
+
+        def take_results(block: bool) -> Iterable[Tuple[int, bool, Dict[str, Any]]]:
+            while running and (block or not results.empty()):
+                yield from take_result()
+
+        def put_chunks(
+            bulk_chunk: Optional[_TYPE_BULK_CHUNK],
+        ) -> Iterable[Tuple[int, bool, Dict[str, Any]]]:
+            for chunk_queue in chunk_queues:
+                while True:
+                    # a cluster max_lag chunks behind may be waiting for its
+                    # results to be taken before taking the next chunk
+                    with progress:
+                        progress.wait_for(
+                            lambda: not chunk_queue.full() or not results.empty()
+                        )
+                    try:
+                        chunk_queue.put_nowait(bulk_chunk)
                         break
-                    # retry only subset of documents that didn't succeed
-                    bulk_actions, bulk_data = to_retry, to_retry_data
+                    except Full:
+                        yield from take_result()
 
+        threads = [
+            threading.Thread(target=send_chunks, args=(cluster, client), daemon=True)
+            for cluster, client in enumerate(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for bulk_chunk in _chunk_actions(
+                map(expand_action_callback, actions),
+                chunk_size,
+                max_chunk_bytes,
+                serializer,
+                max_chunk_compressed_bytes,
+            ):
+                yield from put_chunks(bulk_chunk)
+                yield from take_results(block=False)
+            yield from put_chunks(None)
+            yield from take_results(block=True)
+        finally:
+            unsent = [0] * len(clients)
+            if running:
+                stopped.set()
+                # unblock the clusters waiting to report a chunk, they
+                # report at most one more before stopping
+                while True:
+                    try:
+                        results.get_nowait()
+                    except Empty:
+                        break
+                for cluster, chunk_queue in enumerate(chunk_queues):
+                    while True:
+                        try:
+                            if chunk_queue.get_nowait() is not None:
+                                unsent[cluster] += 1
+                        except Empty:
+                            break
+                    chunk_queue.put(None)
+            for thread in threads:
+                thread.join()
+            for cluster, count in enumerate(dropped):
+                if count + unsent[cluster]:
+                    logger.warning(
+                        "%d chunks were not sent to cluster %d after fanout_bulk "
+                        "was stopped",
+                        count + unsent[cluster],
+                        cluster,
+                    )
 
-def bulk(
+
+def replay_dead_letters(
     client: Elasticsearch,
-    actions: Iterable[_TYPE_BULK_ACTION],
-    stats_only: bool = False,
-    ignore_status: Union[int, Collection[int]] = (),
+    dead_letters: _TYPE_DEAD_LETTERS,
     *args: Any,
     **kwargs: Any,
 ) -> Tuple[int, Union[int, List[Dict[str, Any]]]]:
     """
-    Helper for the :meth:`~elasticsearch.Elasticsearch.bulk` api that provides
-    a more human friendly interface - it consumes an iterator of actions and
-    sends them to elasticsearch in chunks. It returns a tuple with summary
-    information - number of successfully executed actions and either list of
-    errors or number of errors if ``stats_only`` is set to ``True``. Note that
-    by default we raise a ``BulkIndexError`` when we encounter an error so
-    options like ``stats_only`` only apply when ``raise_on_error`` is set to
-    ``False``.
-
-    When errors are being collected original document data is included in the
-    error dictionary which can lead to an extra high memory usage. If you need
-    to process a lot of data and want to ignore/collect errors please consider
-    using the :func:`~elasticsearch.helpers.streaming_bulk` helper which will
-    just return the errors and not store them in memory.
-
+    Send the items of a dead letter file written by
+    :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk` or
+    :func:`~elasticsearch.helpers.parallel_bulk` again, as they were sent the
+    first time, using :func:`~elasticsearch.helpers.bulk`::
+
+        bulk(client, actions, stats_only=True, dead_letters="failed.ndjson")
+        # fix the mappings...
+        replay_dead_letters(
+            client, "failed.ndjson", stats_only=True, dead_letters="failed-again.ndjson"
+        )
 
     :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
-    :arg actions: iterator containing the actions
-    :arg stats_only: if `True` only report number of successful/failed
-        operations instead of just number of successful and a list of error responses
-    :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg dead_letters: path of the dead letter file, or binary file object to
+        read it from
 
-    Any additional keyword arguments will be passed to
-    :func:`~elasticsearch.helpers.streaming_bulk` which is used to execute
-    the operation, see :func:`~elasticsearch.helpers.streaming_bulk` for more
-    accepted parameters.
+    Any additional argument will be passed to
+    :func:`~elasticsearch.helpers.bulk`, including another ``dead_letters``
+    file for the items that fail again.
     """
-    success, failed = 0, 0
+    with _open_dead_letters(dead_letters, "rb") as dead_letters_file:
+        assert dead_letters_file is not None
+        return bulk(client, _dead_letter_actions(dead_letters_file), *args, **kwargs)
 
-    # list of errors to be collected is not stats_only
-    errors = []
 
-    # make streaming_bulk yield successful results so we can count them
-    kwargs["yield_ok"] = True
-    for ok, item in streaming_bulk(
-        client, actions, ignore_status=ignore_status, span_name="helpers.bulk", *args, **kwargs  # type: ignore[misc]
-    ):
-        # go through request-response pairs and detect failures
-        if not ok:
-            if not stats_only:
-                errors.append(item)
-            failed += 1
+def _file_items(data: mmap.mmap) -> Iterator[_TYPE_BULK_FILE_ITEM]:
+    """
+    Locate the items of a bulk NDJSON body, only parsing the action lines that
+    mention a ``delete`` like :func:`~elasticsearch.helpers.ndjson_actions`.
+    """
+    header: Optional[Tuple[int, int, int]] = None
+    line, pos, size = 0, 0, len(data)
+    while pos < size:
+        start = pos
+        pos = data.find(b"\n", pos) + 1 or size
+        line += 1
+        if pos - start <= 2 and not data[start:pos].strip():
+            continue
+        if header is not None:
+            yield header + (start, pos)
+            header = None
+        elif data.find(b'"delete"', start, pos) != -1 and "delete" in json.loads(
+            data[start:pos]
+        ):
+            yield line, start, pos, pos, pos
         else:
-            success += 1
+            header = (line, start, pos)
+
+    if header is not None:
+        raise ValueError(f"Action line {header[0]} is missing its data line")
+
+
+def _file_chunks(
+    items: Iterable[_TYPE_BULK_FILE_ITEM], chunk_size: int, max_chunk_bytes: int
+) -> Iterator[List[_TYPE_BULK_FILE_ITEM]]:
+    chunk: List[_TYPE_BULK_FILE_ITEM] = []
+    chunk_bytes = 0
+    for item in items:
+        _, header_start, header_end, data_start, data_end = item
+        item_bytes = header_end - header_start + data_end - data_start
+        if chunk and (
+            len(chunk) == chunk_size or chunk_bytes + item_bytes > max_chunk_bytes
+        ):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(item)
+        chunk_bytes += item_bytes
+    if chunk:
+        yield chunk
 
-    return success, failed if stats_only else errors
+
+def _file_chunk_body(data: mmap.mmap, items: List[_TYPE_BULK_FILE_ITEM]) -> bytes:
+    """
+    Copy the lines of the items out of the file, in as few slices as possible
+    since the items of a chunk are usually contiguous.
+    """
+    pieces = []
+    start = end = items[0][1]
+    for _, header_start, header_end, data_start, data_end in items:
+        for line_start, line_end in (
+            (header_start, header_end),
+            (data_start, data_end),
+        ):
+            if line_start == line_end:
+                continue
+            if line_start != end:
+                pieces.append(data[start:end])
+                start = line_start
+            end = line_end
+    pieces.append(data[start:end])
+    body = b"".join(pieces)
+    # the last line of the file may not be terminated
+    return body if body.endswith(b"\n") else body + b"\n"
+
+
+def _process_file_chunk(
+    client: Elasticsearch,
+    data: mmap.mmap,
+    items: List[_TYPE_BULK_FILE_ITEM],
+    otel_span: OpenTelemetrySpan,
+    raise_on_exception: bool,
+    raise_on_error: bool,
+    ignore_status: Collection[int],
+    max_retries: int,
+    initial_backoff: float,
+    max_backoff: float,
+    retry_on_status: Collection[int],
+    *args: Any,
+    **kwargs: Any,
+) -> List[Tuple[bool, Dict[str, Any]]]:
+    """
+    Send a chunk of a bulk file to elasticsearch, retrying the items rejected
+    with a status in ``retry_on_status``, and return the result of each item
+    with the line number of the failed ones.
+    """
+    results: List[Tuple[bool, Dict[str, Any]]] = []
+    errors: List[Dict[str, Any]] = []
+    with client._otel.use_span(otel_span):
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(min(max_backoff, initial_backoff * 2 ** (attempt - 1)))
+            retry = attempt < max_retries
+            to_retry: List[_TYPE_BULK_FILE_ITEM] = []
+            try:
+                body = _file_chunk_body(data, items)
+                resp = client.bulk(*args, operations=[body], **kwargs)  # type: ignore[list-item]
+            except ApiError as e:
+                if retry and e.status_code in retry_on_status:
+                    continue
+                if raise_on_exception and e.status_code not in ignore_status:
+                    raise
+                for item in items:
+                    op_type, info = json.loads(data[item[1] : item[2]]).popitem()
+                    info.update(
+                        error=str(e), status=e.status_code, exception=e, line=item[0]
+                    )
+                    results.append((False, {op_type: info}))
+                    if e.status_code not in ignore_status:
+                        errors.append({op_type: info})
+                break
+
+            for item, (op_type, info) in zip(
+                items, map(methodcaller("popitem"), resp["items"])
+            ):
+                status_code = info.get("status", 500)
+                if 200 <= status_code < 300:
+                    results.append((True, {op_type: info}))
+                elif retry and status_code in retry_on_status:
+                    to_retry.append(item)
+                else:
+                    info["line"] = item[0]
+                    results.append((False, {op_type: info}))
+                    if status_code not in ignore_status:
+                        errors.append({op_type: info})
+            if not to_retry:
+                break
+            items = to_retry
+
+    if errors and raise_on_error:
+        raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+    return results
 
 
-def parallel_bulk(
+def bulk_from_file(
     client: Elasticsearch,
-    actions: Iterable[_TYPE_BULK_ACTION],
-    thread_count: int = 4,
+    path: Union[str, "os.PathLike[str]"],
     chunk_size: int = 500,
     max_chunk_bytes: int = 100 * 1024 * 1024,
+    thread_count: int = 1,
     queue_size: int = 4,
-    expand_action_callback: Callable[
-        [_TYPE_BULK_ACTION], _TYPE_BULK_ACTION_HEADER_AND_BODY
-    ] = expand_action,
+    stats_only: bool = False,
+    raise_on_error: bool = True,
+    raise_on_exception: bool = True,
     ignore_status: Union[int, Collection[int]] = (),
+    max_retries: int = 0,
+    initial_backoff: float = 2,
+    max_backoff: float = 600,
+    retry_on_status: Union[int, Collection[int]] = (429,),
     *args: Any,
     **kwargs: Any,
-) -> Iterable[Tuple[bool, Any]]:
+) -> Tuple[int, Union[int, List[Dict[str, Any]]]]:
     """
-    Parallel version of the bulk helper run in multiple threads at once.
+    Send a file in the bulk NDJSON format, alternating action and data lines
+    (for example an export of an index), to the
+    :meth:`~elasticsearch.Elasticsearch.bulk` api without decoding it. The
+    file is memory-mapped and its lines are sliced into chunks as they are,
+    only the action lines of ``delete`` actions and the responses are parsed.
+    It returns the same summary as :func:`~elasticsearch.helpers.bulk`, where
+    the errors mention the ``line`` of the action in the file::
+
+        success, errors = bulk_from_file(
+            client, "export.ndjson", thread_count=4, raise_on_error=False
+        )
+        for error in errors:
+            op_type, info = error.popitem()
+            print(f"line {info['line']}: {info['error']}")
 
     :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
-    :arg actions: iterator containing the actions
-    :arg thread_count: size of the threadpool to use for the bulk requests
+    :arg path: path of the file to send
     :arg chunk_size: number of docs in one chunk sent to es (default: 500)
     :arg max_chunk_bytes: the maximum size of the request in bytes (default: 100MB)
+    :arg thread_count: number of chunks sent to elasticsearch at the same time
+        from a thread pool (default: 1)
+    :arg queue_size: number of chunks read ahead of the ones being sent when
+        using threads (default: 4)
+    :arg stats_only: if `True` only report number of successful/failed
+        operations instead of just number of successful and a list of error responses
     :arg raise_on_error: raise ``BulkIndexError`` containing errors (as `.errors`)
         from the execution of the last chunk when some occur. By default we raise.
     :arg raise_on_exception: if ``False`` then don't propagate exceptions from
         call to ``bulk`` and just report the items that failed as failed.
-    :arg expand_action_callback: callback executed on each action passed in,
-        should return a tuple containing the action line and the data line
-        (`None` if data line should be omitted).
-    :arg queue_size: size of the task queue between the main thread (producing
-        chunks to send) and the processing threads.
     :arg ignore_status: list of HTTP status code that you want to ignore
+    :arg max_retries: maximum number of times a document will be retried when
+        retry_on_status (defaulting to ``429``) is received,
+        set to 0 (default) for no retries
+    :arg initial_backoff: number of seconds we should wait before the first
+        retry. Any subsequent retries will be powers of ``initial_backoff *
+        2**retry_number``
+    :arg max_backoff: maximum number of seconds a retry will wait
+    :arg retry_on_status: HTTP status code that will trigger a retry.
     """
-    # Avoid importing multiprocessing unless parallel_bulk is used
-    # to avoid exceptions on restricted environments like App Engine
-    from multiprocessing.pool import ThreadPool
+    from multiprocessing.pool import ApplyResult, ThreadPool
 
-    expanded_actions = map(expand_action_callback, actions)
-    serializer = client.transport.serializers.get_serializer("application/json")
+    client = client.options()
+    client._client_meta = (("h", "bp"),)
 
-    class BlockingPool(ThreadPool):
-        def _setup_queues(self) -> None:
-            super()._setup_queues()  # type: ignore[misc]
-            # The queue must be at least the size of the number of threads to
-            # prevent hanging when inserting sentinel values during teardown.
-            self._inqueue: Queue[
-                Tuple[
-                    List[
-                        Union[
-                            Tuple[Dict[str, Any]], Tuple[Dict[str, Any], Dict[str, Any]]
-                        ]
-                    ],
-                    List[bytes],
-                ]
-            ] = Queue(max(queue_size, thread_count))
-            self._quick_put = self._inqueue.put
+    if isinstance(ignore_status, int):
+        ignore_status = (ignore_status,)
+    if isinstance(retry_on_status, int):
+        retry_on_status = (retry_on_status,)
 
-    with client._otel.helpers_span("helpers.parallel_bulk") as otel_span:
-        pool = BlockingPool(thread_count)
+    success, failed = 0, 0
+    errors: List[Dict[str, Any]] = []
 
-        try:
-            for result in pool.imap(
-                lambda bulk_chunk: list(
-                    _process_bulk_chunk(
-                        client,
-                        bulk_chunk[1],
-                        bulk_chunk[0],
-                        otel_span=otel_span,
-                        ignore_status=ignore_status,  # type: ignore[misc]
-                        *args,
-                        **kwargs,
+    def collect(results: List[Tuple[bool, Dict[str, Any]]]) -> None:
+        nonlocal success, failed
+        for ok, item in results:
+            if ok:
+                success += 1
+            else:
+                if not stats_only:
+                    errors.append(item)
+                failed += 1
+
+    with open(path, "rb") as f, client._otel.helpers_span(
+        "helpers.bulk_from_file"
+    ) as otel_span:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0 if stats_only else []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            def process(
+                items: List[_TYPE_BULK_FILE_ITEM],
+            ) -> List[Tuple[bool, Dict[str, Any]]]:
+                return _process_file_chunk(
+                    client,
+                    data,
+                    items,
+                    otel_span,
+                    raise_on_exception,
+                    raise_on_error,
+                    ignore_status,
+                    max_retries,
+                    initial_backoff,
+                    max_backoff,
+                    retry_on_status,
+                    *args,
+                    **kwargs,
+                )
+
+            chunks = _file_chunks(_file_items(data), chunk_size, max_chunk_bytes)
+            if thread_count <= 1:
+                for items in chunks:
+                    collect(process(items))
+            else:
+                pool = ThreadPool(thread_count)
+                try:
+                    # read ahead a bounded number of chunks, in order
+                    pending: Deque["ApplyResult[List[Tuple[bool, Dict[str, Any]]]]"] = (
+                        deque()
                     )
-                ),
-                _chunk_actions(
-                    expanded_actions, chunk_size, max_chunk_bytes, serializer
-                ),
-            ):
-                yield from result
+                    for items in chunks:
+                        if len(pending) >= thread_count + queue_size:
+                            collect(pending.popleft().get())
+                        pending.append(pool.apply_async(process, (items,)))
+                    while pending:
+                        collect(pending.popleft().get())
+                finally:
+                    pool.close()
+                    pool.join()
 
-        finally:
-            pool.close()
-            pool.join()
+    return success, failed if stats_only else errors
+
+
+def _pop_transport_kwargs(kw: MutableMapping[str, Any]) -> Dict[str, Any]:
+    # Grab options that should be propagated to every
+    # API call within the scan helpers instead of just 'search()'
+    transport_kwargs = {}
+    for key in (
+        "headers",
+        "api_key",
+        "http_auth",
+        "basic_auth",
+        "bearer_auth",
+        "opaque_id",
+    ):
+        try:
+            value = kw.pop(key)
+            if key == "http_auth":
+                key = "basic_auth"
+            transport_kwargs[key] = value
+        except KeyError:
+            pass
+    return transport_kwargs
+
+
+def _check_shards(
+    shards_info: Mapping[str, int], request: str, id: str, raise_on_error: bool
+) -> None:
+    """
+    Log, and raise ``ScanError`` if ``raise_on_error`` is set, when some shards
+    failed to execute a search request.
+    """
+    # Default to 0 if the value isn't included in the response
+    shards_successful = shards_info.get("successful", 0)
+    shards_skipped = shards_info.get("skipped", 0)
+    shards_total = shards_info.get("total", 0)
+
+    # check if we have any errors
+    if (shards_successful + shards_skipped) < shards_total:
+        shards_message = (
+            f"{request} request has only succeeded on %d (+%d skipped) shards "
+            "out of %d."
+        )
+        logger.warning(
+            shards_message,
+            shards_successful,
+            shards_skipped,
+            shards_total,
+        )
+        if raise_on_error:
+            raise ScanError(
+                id,
+                shards_message % (shards_successful, shards_skipped, shards_total),
+            )
+
+
+def _pit_sort(sort: Any) -> List[Any]:
+    """
+    Sort of a point in time search ending with the ``_shard_doc`` tiebreaker,
+    which is the cheapest one to paginate with ``search_after``.
+    """
+    fields: List[Any]
+    if not sort:
+        fields = []
+    elif isinstance(sort, (str, dict)):
+        fields = [sort]
+    else:
+        fields = list(sort)
+    for field in fields:
+        name = field if isinstance(field, str) else next(iter(field), "")
+        if name.split(":", 1)[0] == "_shard_doc":
+            return fields
+    fields.append("_shard_doc")
+    return fields
 
 
 def scan(
@@ -645,6 +3034,7 @@ def scan(
     request_timeout: Optional[float] = None,
     clear_scroll: bool = True,
     scroll_kwargs: Optional[MutableMapping[str, Any]] = None,
+    prefetch: int = 0,
     **kwargs: Any,
 ) -> Iterable[Dict[str, Any]]:
     """
@@ -675,6 +3065,11 @@ def scan(
         to true.
     :arg scroll_kwargs: additional kwargs to be passed to
         :meth:`~elasticsearch.Elasticsearch.scroll`
+    :arg prefetch: number of pages to fetch ahead from a background thread
+        while the hits of the current one are being consumed, ``0`` (default)
+        to fetch each page once the previous one is consumed. At most
+        ``prefetch + 2`` pages are held in memory: the ones fetched ahead, the
+        one being consumed and the one fetched next, waiting for room.
 
     Any additional keyword arguments will be passed to the initial
     :meth:`~elasticsearch.Elasticsearch.search` call::
@@ -685,35 +3080,59 @@ def scan(
             doc_type="books"
         )
 
+    """
+    pages = scan_batches(
+        client,
+        query,
+        scroll=scroll,
+        raise_on_error=raise_on_error,
+        preserve_order=preserve_order,
+        size=size,
+        request_timeout=request_timeout,
+        clear_scroll=clear_scroll,
+        scroll_kwargs=scroll_kwargs,
+        prefetch=prefetch,
+        **kwargs,
+    )
+    try:
+        for page in pages:
+            yield from page
+    finally:
+        pages.close()  # type: ignore[attr-defined]
+
+
+def scan_batches(
+    client: Elasticsearch,
+    query: Optional[Any] = None,
+    scroll: str = "5m",
+    raise_on_error: bool = True,
+    preserve_order: bool = False,
+    size: int = 1000,
+    request_timeout: Optional[float] = None,
+    clear_scroll: bool = True,
+    scroll_kwargs: Optional[MutableMapping[str, Any]] = None,
+    prefetch: int = 0,
+    **kwargs: Any,
+) -> Iterable[List[Dict[str, Any]]]:
+    """
+    Version of :func:`~elasticsearch.helpers.scan` yielding the hits a whole
+    page at a time, as the lists returned by the scroll requests, for
+    consumers working on batches of documents rather than one by one::
+
+        for hits in scan_batches(client, index="orders-*", size=5000):
+            export([hit["_source"] for hit in hits])
+
+    The arguments are the same as the ones of
+    :func:`~elasticsearch.helpers.scan`, ``size`` being the (per shard)
+    number of hits of each page.
     """
     scroll_kwargs = scroll_kwargs or {}
     if not preserve_order:
         query = query.copy() if query else {}
         query["sort"] = "_doc"
 
-    def pop_transport_kwargs(kw: MutableMapping[str, Any]) -> Dict[str, Any]:
-        # Grab options that should be propagated to every
-        # API call within this helper instead of just 'search()'
-        transport_kwargs = {}
-        for key in (
-            "headers",
-            "api_key",
-            "http_auth",
-            "basic_auth",
-            "bearer_auth",
-            "opaque_id",
-        ):
-            try:
-                value = kw.pop(key)
-                if key == "http_auth":
-                    key = "basic_auth"
-                transport_kwargs[key] = value
-            except KeyError:
-                pass
-        return transport_kwargs
-
     client = client.options(
-        request_timeout=request_timeout, **pop_transport_kwargs(kwargs)
+        request_timeout=request_timeout, **_pop_transport_kwargs(kwargs)
     )
     client._client_meta = (("h", "s"),)
 
@@ -739,50 +3158,316 @@ def scan(
         search_kwargs["size"] = size
         resp = client.search(body=query, **search_kwargs)
 
-    scroll_id = resp.get("_scroll_id")
-    scroll_transport_kwargs = pop_transport_kwargs(scroll_kwargs)
+    scroll_transport_kwargs = _pop_transport_kwargs(scroll_kwargs)
     if scroll_transport_kwargs:
         scroll_client = client.options(**scroll_transport_kwargs)
     else:
         scroll_client = client
 
+    def scroll_pages(resp: Any) -> Iterable[List[Dict[str, Any]]]:
+        scroll_id = resp.get("_scroll_id")
+        try:
+            while scroll_id and resp["hits"]["hits"]:
+                yield resp["hits"]["hits"]
+
+                _check_shards(resp["_shards"], "Scroll", scroll_id, raise_on_error)
+                resp = scroll_client.scroll(
+                    scroll_id=scroll_id, scroll=scroll, **scroll_kwargs
+                )
+                scroll_id = resp.get("_scroll_id")
+
+        finally:
+            if scroll_id and clear_scroll:
+                client.options(ignore_status=404).clear_scroll(scroll_id=scroll_id)
+
+    pages = scroll_pages(resp)
+    if prefetch:
+        pages = _prefetch(pages, prefetch)
     try:
-        while scroll_id and resp["hits"]["hits"]:
-            yield from resp["hits"]["hits"]
-
-            # Default to 0 if the value isn't included in the response
-            shards_info: Dict[str, int] = resp["_shards"]
-            shards_successful = shards_info.get("successful", 0)
-            shards_skipped = shards_info.get("skipped", 0)
-            shards_total = shards_info.get("total", 0)
-
-            # check if we have any errors
-            if (shards_successful + shards_skipped) < shards_total:
-                shards_message = "Scroll request has only succeeded on %d (+%d skipped) shards out of %d."
-                logger.warning(
-                    shards_message,
-                    shards_successful,
-                    shards_skipped,
-                    shards_total,
+        yield from pages
+    finally:
+        pages.close()  # type: ignore[attr-defined]
+
+
+def pit_scan(
+    client: Elasticsearch,
+    query: Optional[Any] = None,
+    index: Optional[Union[str, Sequence[str]]] = None,
+    keep_alive: str = "5m",
+    raise_on_error: bool = True,
+    size: int = 1000,
+    request_timeout: Optional[float] = None,
+    pit_id: Optional[str] = None,
+    cursor: Optional[ScanCursor] = None,
+    **kwargs: Any,
+) -> Iterable[Dict[str, Any]]:
+    """
+    Version of :func:`~elasticsearch.helpers.scan` paginating with a point in
+    time and ``search_after`` instead of a scroll, which is lighter on the
+    cluster for deep pagination since no search context is kept on the shards
+    between the requests. The point in time is opened at the start, kept
+    alive by every request and closed at the end.
+
+    The hits are sorted by ``_shard_doc``, or by the given ``sort`` with
+    ``_shard_doc`` as a tiebreaker::
+
+        for hit in pit_scan(
+            client, query={"query": {"match": {"title": "python"}}}, index="orders-*"
+        ):
+            print(hit)
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg query: body for the :meth:`~elasticsearch.Elasticsearch.search` api
+    :arg index: indices to open the point in time against
+    :arg keep_alive: how long the point in time is kept alive between two
+        requests
+    :arg raise_on_error: raises an exception (``ScanError``) if an error is
+        encountered (some shards fail to execute). By default we raise.
+    :arg size: number of hits fetched by each request
+    :arg request_timeout: explicit timeout for each request
+    :arg pit_id: id of an already opened point in time to search instead of
+        opening one for ``index``, it isn't closed at the end
+    :arg cursor: :class:`~elasticsearch.helpers.ScanCursor` to resume the
+        scan from, and to move forward after each page
+
+    Any additional keyword arguments will be passed to the
+    :meth:`~elasticsearch.Elasticsearch.search` calls.
+    """
+    client = client.options(
+        request_timeout=request_timeout, **_pop_transport_kwargs(kwargs)
+    )
+    client._client_meta = (("h", "s"),)
+
+    search_kwargs = query.copy() if query else {}
+    search_kwargs.update(kwargs)
+    search_kwargs["sort"] = _pit_sort(search_kwargs.get("sort"))
+    search_kwargs["size"] = size
+    search_kwargs.setdefault("track_total_hits", False)
+
+    if cursor is not None:
+        if pit_id is not None:
+            raise ValueError("'pit_id' and 'cursor' can't be used together")
+        pit_id = cursor.pit_id
+        search_after = cursor.search_after
+        if search_after is not None and pit_id is None:
+            # the scan goes on in a new point in time
+            search_after = _reopened_search_after(search_kwargs["sort"], search_after)
+            if search_after is None:
+                raise ValueError(
+                    "Hits only sorted by '_shard_doc' can't be resumed "
+                    "without their point in time"
                 )
-                if raise_on_error:
-                    raise ScanError(
-                        scroll_id,
-                        shards_message
-                        % (
-                            shards_successful,
-                            shards_skipped,
-                            shards_total,
-                        ),
+        if search_after is not None:
+            search_kwargs["search_after"] = search_after
+
+    # the point in time of a cursor is kept open until the scan is complete
+    close_pit = pit_id is None and cursor is None
+    if pit_id is None:
+        if index is None:
+            raise ValueError("'index' is required to open a point in time")
+        pit_id = client.open_point_in_time(index=index, keep_alive=keep_alive)["id"]
+    done = False
+    try:
+        while True:
+            try:
+                resp = client.search(
+                    pit={"id": pit_id, "keep_alive": keep_alive}, **search_kwargs
+                )
+            except NotFoundError:
+                # the point in time of a resumed scan expired, go on from a new one
+                if cursor is None or index is None:
+                    raise
+                if "search_after" in search_kwargs:
+                    search_after = _reopened_search_after(
+                        search_kwargs["sort"], search_kwargs["search_after"]
                     )
-            resp = scroll_client.scroll(
-                scroll_id=scroll_id, scroll=scroll, **scroll_kwargs
-            )
-            scroll_id = resp.get("_scroll_id")
+                    if search_after is None:
+                        raise
+                    search_kwargs["search_after"] = search_after
+                pit = client.open_point_in_time(index=index, keep_alive=keep_alive)
+                pit_id = pit["id"]
+                resp = client.search(
+                    pit={"id": pit_id, "keep_alive": keep_alive}, **search_kwargs
+                )
+            # the id can change from one response to the next
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp["hits"]["hits"]
+            yield from hits
+
+            _check_shards(resp["_shards"], "Search", pit_id, raise_on_error)
+            if hits:
+                search_kwargs["search_after"] = hits[-1]["sort"]
+            if cursor is not None:
+                cursor.advance(pit_id, search_kwargs.get("search_after"))
+            if len(hits) < size:
+                done = True
+                break
+
+    finally:
+        if close_pit or (cursor is not None and done):
+            client.options(ignore_status=404).close_point_in_time(id=pit_id)
+        if cursor is not None:
+            if done:
+                cursor.pit_id = None
+            cursor.save()
+
+
+def _reopened_search_after(
+    sort: List[Any], search_after: List[Any]
+) -> Optional[List[Any]]:
+    """
+    Sort values to search a new point in time after the last hit of another
+    one: the value of the ``_shard_doc`` tiebreaker, which only makes sense
+    within a point in time, is replaced with one before every hit. ``None``
+    when the hits are only sorted by ``_shard_doc``.
+    """
+    search_after = list(search_after)
+    for i, field in enumerate(sort):
+        name = field if isinstance(field, str) else next(iter(field))
+        if name != "_shard_doc":
+            continue
+        if len(sort) == 1:
+            return None
+        order = "asc" if isinstance(field, str) else field[name]
+        if isinstance(order, Mapping):
+            order = order.get("order", "asc")
+        search_after[i] = 2**63 - 1 if order == "desc" else -1
+    return search_after
+
+
+def _slice_scan_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    slice_kwargs = dict(kwargs)
+    if slice_kwargs.get("scroll_kwargs"):
+        # scan takes the transport options out of it
+        slice_kwargs["scroll_kwargs"] = dict(slice_kwargs["scroll_kwargs"])
+    return slice_kwargs
+
+
+def parallel_scan(
+    client: Elasticsearch,
+    query: Optional[Any] = None,
+    slices: int = 4,
+    thread_count: Optional[int] = None,
+    queue_size: int = 4,
+    on_slice_error: Optional[Callable[[int, Exception], None]] = None,
+    point_in_time: bool = False,
+    size: int = 1000,
+    **kwargs: Any,
+) -> Iterable[Dict[str, Any]]:
+    """
+    Parallel version of :func:`~elasticsearch.helpers.scan` splitting the
+    scroll in ``slices`` sliced scrolls, read at the same time from a pool of
+    threads, so that the throughput grows with the number of shards instead
+    of being bound by a single scroll. The hits of all the slices are yielded
+    as they come, in no particular order::
+
+        for hit in parallel_scan(client, index="logs-*", slices=8):
+            export(hit)
+
+    Every slice is cleared when the iteration ends, including when it is
+    stopped early or fails. With ``point_in_time`` the slices are read with
+    :func:`~elasticsearch.helpers.pit_scan` from a single point in time
+    instead of scrolls.
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg query: body for the :meth:`~elasticsearch.Elasticsearch.search` api
+    :arg slices: number of slices to split the scroll in, usually a multiple
+        of the number of shards of the index (default: 4)
+    :arg thread_count: number of slices read at the same time, all of them by
+        default
+    :arg queue_size: number of pages of hits read ahead of the ones being
+        yielded
+    :arg on_slice_error: callback called with the id of a slice and the
+        exception it failed with, the other slices then go on. By default the
+        exception is raised and all the slices are stopped.
+    :arg point_in_time: slice a point in time opened for ``index`` instead
+        of a scroll
+    :arg size: size (per shard) of the batch send at each iteration.
+
+    Any additional keyword arguments (``scroll``, ``raise_on_error``...) will
+    be passed to :func:`~elasticsearch.helpers.scan`, or
+    :func:`~elasticsearch.helpers.pit_scan`, for each slice.
+    """
+    # Avoid importing multiprocessing unless parallel_scan is used
+    # to avoid exceptions on restricted environments like App Engine
+    from multiprocessing.pool import ThreadPool
 
+    if slices < 1:
+        raise ValueError("'slices' must be at least 1")
+    if point_in_time and kwargs.get("index") is None:
+        raise ValueError("point_in_time requires an index")
+    query = query.copy() if query else {}
+    # pages of hits of the slices, an exception when one failed and None once
+    # one is done
+    pages: Queue[Tuple[int, Union[None, Exception, List[Dict[str, Any]]]]] = Queue(
+        max(queue_size, 1)
+    )
+    stopped = threading.Event()
+
+    def scan_slice(slice_id: int) -> None:
+        if stopped.is_set():
+            pages.put((slice_id, None))
+            return
+        hits = iter(
+            (pit_scan if point_in_time else scan)(
+                client,
+                {**query, "slice": {"id": slice_id, "max": slices}},
+                size=size,
+                **_slice_scan_kwargs(kwargs),
+            )
+        )
+        try:
+            page: List[Dict[str, Any]] = []
+            for hit in hits:
+                page.append(hit)
+                if len(page) == size:
+                    pages.put((slice_id, page))
+                    page = []
+                    if stopped.is_set():
+                        break
+            else:
+                if page:
+                    pages.put((slice_id, page))
+        except Exception as e:
+            pages.put((slice_id, e))
+        finally:
+            # clears the scroll of the slice
+            hits.close()  # type: ignore[attr-defined]
+            pages.put((slice_id, None))
+
+    pit_client = client.options(**_pop_transport_kwargs(dict(kwargs)))
+    if point_in_time:
+        kwargs["pit_id"] = pit_client.open_point_in_time(
+            index=kwargs.pop("index"), keep_alive=kwargs.get("keep_alive", "5m")
+        )["id"]
+
+    pool = ThreadPool(min(thread_count or slices, slices))
+    running = slices
+    try:
+        for slice_id in range(slices):
+            pool.apply_async(scan_slice, (slice_id,))
+        while running:
+            slice_id, page = pages.get()
+            if page is None:
+                running -= 1
+            elif isinstance(page, Exception):
+                if on_slice_error is None:
+                    raise page
+                on_slice_error(slice_id, page)
+            else:
+                yield from page
     finally:
-        if scroll_id and clear_scroll:
-            client.options(ignore_status=404).clear_scroll(scroll_id=scroll_id)
+        stopped.set()
+        # let the slices still running take notice and clear their scroll
+        while running:
+            if pages.get()[1] is None:
+                running -= 1
+        pool.close()
+        pool.join()
+        if point_in_time:
+            pit_client.options(ignore_status=404).close_point_in_time(
+                id=kwargs["pit_id"]
+            )
 
 
 def reindex(
@@ -844,7 +3529,7 @@ def reindex(
                 h.update(h.pop("fields"))
             yield h
 
-    kwargs = {"stats_only": True}
+    kwargs: Dict[str, Any] = {"stats_only": True}
     kwargs.update(bulk_kwargs)
 
     is_data_stream = False
@@ -0,0 +1,566 @@
+#  Licensed to Elasticsearch B.V. under one or more contributor
+#  license agreements. See the NOTICE file distributed with
+#  this work for additional information regarding copyright
+#  ownership. Elasticsearch B.V. licenses this file to you under
+#  the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing,
+#  software distributed under the License is distributed on an
+#  "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied.  See the License for the
+#  specific language governing permissions and limitations
+#  under the License.
+
+import os
+import sys
+from base64 import b64encode
+from fnmatch import fnmatchcase
+from json.encoder import encode_basestring
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .. import Elasticsearch
+from ..serializer import JsonSerializer, Serializer
+from .actions import _ACTION_METADATA_KEYS, _TYPE_BULK_RAW_ACTION, bulk, scan_batches
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# Tables, DataFrames, datasets, Parquet files or iterables of record batches
+_TYPE_ARROW_DATA = Any
+
+
+def _record_batches(
+    data: _TYPE_ARROW_DATA, batch_size: int
+) -> Iterable["pa.RecordBatch"]:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if isinstance(data, (str, os.PathLike)):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(data).iter_batches(batch_size=batch_size)  # type: ignore[no-any-return]
+    if isinstance(data, pa.RecordBatch):
+        return [data]
+    if isinstance(data, pa.Table):
+        return data.to_batches(max_chunksize=batch_size)  # type: ignore[no-any-return]
+    if isinstance(data, ds.Dataset):
+        return data.to_batches(batch_size=batch_size)  # type: ignore[no-any-return]
+    # don't import pandas when it wasn't already
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False).to_batches(  # type: ignore[no-any-return]
+            max_chunksize=batch_size
+        )
+    return data  # type: ignore[no-any-return]
+
+
+def _json_values(array: "pa.Array", serializer: Serializer) -> "pa.Array":
+    """
+    JSON text of each value of an Arrow array as a string array, null where
+    the values are null. The conversion runs on whole arrays through the
+    Arrow compute functions, values of the types JSON has no counterpart for
+    are serialized one by one with ``serializer``.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    type_ = array.type
+    if pa.types.is_dictionary(type_):
+        return _json_values(array.dictionary_decode(), serializer)
+    if pa.types.is_null(type_):
+        return pa.nulls(len(array), pa.string())
+    if (
+        pa.types.is_boolean(type_)
+        or pa.types.is_integer(type_)
+        or pa.types.is_decimal(type_)
+    ):
+        return pc.cast(array, pa.string())
+    if pa.types.is_floating(type_):
+        # NaN and infinity aren't valid JSON
+        return pc.if_else(
+            pc.is_finite(array),
+            pc.cast(array, pa.string()),
+            pa.scalar(None, pa.string()),
+        )
+    if (
+        pa.types.is_string(type_)
+        or pa.types.is_large_string(type_)
+        or getattr(pa.types, "is_string_view", lambda _: False)(type_)
+    ):
+        return _json_strings(pc.cast(array, pa.string()))
+    if pa.types.is_timestamp(type_):
+        # "2024-01-01 12:00:00.000000Z" to ISO 8601
+        return _json_quote(
+            pc.replace_substring(
+                pc.cast(array, pa.string()), " ", "T", max_replacements=1
+            )
+        )
+    if pa.types.is_date(type_):
+        return _json_quote(pc.cast(array, pa.string()))
+    if (
+        pa.types.is_list(type_)
+        or pa.types.is_large_list(type_)
+        or pa.types.is_fixed_size_list(type_)
+    ):
+        if pa.types.is_fixed_size_list(type_):
+            array = pc.cast(array, pa.list_(type_.value_type))
+        # the offsets of sliced arrays point into their whole values
+        values = _json_values(array.values, serializer).fill_null("null")
+        lists = type(array).from_arrays(array.offsets, values)
+        return pc.if_else(
+            array.is_null(),
+            pa.scalar(None, pa.string()),
+            pc.binary_join_element_wise("[", pc.binary_join(lists, ","), "]", ""),
+        )
+    if pa.types.is_struct(type_):
+        objects = _json_objects(
+            array.flatten(),
+            [field.name for field in type_],
+            len(array),
+            serializer,
+        )
+        return pc.if_else(array.is_null(), pa.scalar(None, pa.string()), objects)
+
+    if (
+        pa.types.is_binary(type_)
+        or pa.types.is_large_binary(type_)
+        or pa.types.is_fixed_size_binary(type_)
+    ):
+        # binary fields take base64
+        return _json_quote(
+            pa.array(
+                [
+                    None if value is None else b64encode(value).decode("ascii")
+                    for value in array.to_pylist()
+                ],
+                pa.string(),
+            )
+        )
+
+    return pa.array(
+        [
+            # in a list so that strings aren't taken as already serialized
+            None if value is None else serializer.dumps([value])[1:-1].decode("utf-8")
+            for value in array.to_pylist()
+        ],
+        pa.string(),
+    )
+
+
+def _json_strings(array: "pa.Array") -> "pa.Array":
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    escaped = pc.replace_substring(array, "\\", "\\\\")
+    escaped = pc.replace_substring(escaped, '"', '\\"')
+    if pc.any(pc.match_substring_regex(escaped, "[\\x00-\\x1f]")).as_py():
+        # control characters are rare enough to not be worth vectorizing
+        return pa.array(
+            [
+                None if value is None else encode_basestring(value)
+                for value in array.to_pylist()
+            ],
+            pa.string(),
+        )
+    return _json_quote(escaped)
+
+
+def _json_quote(array: "pa.Array") -> "pa.Array":
+    import pyarrow.compute as pc
+
+    return pc.binary_join_element_wise('"', array, '"', "")
+
+
+def _json_objects(
+    columns: List["pa.Array"], names: List[str], length: int, serializer: Serializer
+) -> "pa.Array":
+    """
+    JSON objects made of the non-null values of the columns, by row.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # each member ends with a comma, so that the null ones can be left out
+    # by replacing them with nothing, and the last comma is trimmed after
+    members = [
+        pc.binary_join_element_wise(
+            encode_basestring(name) + ":", _json_values(column, serializer), ",", ""
+        ).fill_null("")
+        for column, name in zip(columns, names)
+    ]
+    if not members:
+        return pa.array(["{}"] * length, pa.string())
+    joined = pc.utf8_rtrim(pc.binary_join_element_wise(*members, ""), characters=",")
+    return pc.binary_join_element_wise("{", joined, "}", "")
+
+
+def arrow_actions(
+    data: _TYPE_ARROW_DATA,
+    op_type: str = "index",
+    batch_size: int = 10_000,
+    serializer: Serializer = JsonSerializer(),
+) -> Iterable[_TYPE_BULK_RAW_ACTION]:
+    """
+    Turn columnar data into already serialized actions accepted by
+    :func:`~elasticsearch.helpers.streaming_bulk`,
+    :func:`~elasticsearch.helpers.bulk` and
+    :func:`~elasticsearch.helpers.parallel_bulk`, one record batch at a time.
+    The documents are serialized column by column with the Arrow compute
+    functions instead of going through a dictionary per row. Requires the
+    ``pyarrow`` package.
+
+    Each row becomes a document, without its null values. The columns named
+    like the metadata fields of the actions (``_id``, ``_index``,
+    ``_routing``, ``pipeline``...) go to the action line instead. Timestamps
+    and dates are sent in the ISO 8601 format, lists (like vectors) as
+    arrays and structs as objects::
+
+        import pyarrow.parquet as pq
+
+        bulk(client, arrow_actions(pq.read_table("export.parquet")), index="export")
+
+    :arg data: ``pyarrow.RecordBatch``, ``pyarrow.Table``,
+        ``pyarrow.dataset.Dataset``, ``pandas.DataFrame``, path of a Parquet
+        file or iterable of ``pyarrow.RecordBatch``
+    :arg op_type: action of every row, ``index`` (default), ``create``,
+        ``update`` (the rows are the partial documents) or ``delete``
+    :arg batch_size: maximum number of rows serialized at once
+    :arg serializer: serializer of the values of the Arrow types that can't be
+        converted to JSON as a whole
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for batch in _record_batches(data, batch_size):
+        if not batch.num_rows:
+            continue
+        metadata = [
+            (_ACTION_METADATA_KEYS[name], column)
+            for name, column in zip(batch.schema.names, batch.columns)
+            if name in _ACTION_METADATA_KEYS
+        ]
+        headers = pc.cast(
+            pc.binary_join_element_wise(
+                "{" + encode_basestring(op_type) + ":",
+                _json_objects(
+                    [column for _, column in metadata],
+                    [key for key, _ in metadata],
+                    batch.num_rows,
+                    serializer,
+                ),
+                "}",
+                "",
+            ),
+            pa.binary(),
+        ).to_pylist()
+        if op_type == "delete":
+            yield from zip(headers, [None] * batch.num_rows)
+            continue
+
+        source = [
+            (name, column)
+            for name, column in zip(batch.schema.names, batch.columns)
+            if name not in _ACTION_METADATA_KEYS
+        ]
+        documents = _json_objects(
+            [column for _, column in source],
+            [name for name, _ in source],
+            batch.num_rows,
+            serializer,
+        )
+        if op_type == "update":
+            documents = pc.binary_join_element_wise('{"doc":', documents, "}", "")
+        yield from zip(headers, pc.cast(documents, pa.binary()).to_pylist())
+
+
+def bulk_from_arrow(
+    client: Elasticsearch,
+    data: _TYPE_ARROW_DATA,
+    op_type: str = "index",
+    batch_size: int = 10_000,
+    *args: Any,
+    **kwargs: Any,
+) -> Tuple[int, Union[int, List[Dict[str, Any]]]]:
+    """
+    Helper for the :meth:`~elasticsearch.Elasticsearch.bulk` api sending
+    columnar data, like :func:`~elasticsearch.helpers.bulk` does for
+    documents, see :func:`~elasticsearch.helpers.arrow_actions` for how the
+    rows are turned into actions::
+
+        bulk_from_arrow(client, "export.parquet", index="export")
+        bulk_from_arrow(client, dataframe, index="export", chunk_size=1000)
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg data: ``pyarrow.RecordBatch``, ``pyarrow.Table``,
+        ``pyarrow.dataset.Dataset``, ``pandas.DataFrame``, path of a Parquet
+        file or iterable of ``pyarrow.RecordBatch``
+    :arg op_type: action of every row, ``index`` (default), ``create``,
+        ``update`` or ``delete``
+    :arg batch_size: maximum number of rows serialized at once
+
+    Any additional keyword arguments will be passed to
+    :func:`~elasticsearch.helpers.bulk`.
+    """
+    serializer = client.transport.serializers.get_serializer("application/json")
+    return bulk(
+        client,
+        arrow_actions(data, op_type, batch_size, serializer),
+        *args,
+        **kwargs,
+    )
+
+
+def _arrow_type(field_type: str) -> Optional["pa.DataType"]:
+    """
+    Arrow type of the values of an elasticsearch field type, ``None`` for
+    the types without an obvious one (``geo_point``, ``nested``...).
+    """
+    import pyarrow as pa
+
+    if field_type in (
+        "keyword",
+        "constant_keyword",
+        "wildcard",
+        "text",
+        "match_only_text",
+        "search_as_you_type",
+        "ip",
+        "version",
+    ):
+        return pa.string()
+    if field_type in ("date", "date_nanos"):
+        return pa.timestamp("ns" if field_type == "date_nanos" else "ms", tz="UTC")
+    if field_type == "dense_vector":
+        return pa.list_(pa.float32())
+    return {
+        "long": pa.int64(),
+        "integer": pa.int32(),
+        "short": pa.int16(),
+        "byte": pa.int8(),
+        "unsigned_long": pa.uint64(),
+        "double": pa.float64(),
+        "float": pa.float32(),
+        "half_float": pa.float32(),
+        "scaled_float": pa.float64(),
+        "boolean": pa.bool_(),
+    }.get(field_type)
+
+
+def _mapping_fields(
+    properties: Mapping[str, Any], prefix: str = ""
+) -> Iterable[Tuple[str, "pa.DataType"]]:
+    """
+    Dotted names and Arrow types of the leaf fields of a mapping, the fields
+    of objects being flattened like the ``fields`` of the hits are.
+    """
+    for name, field in properties.items():
+        field_type = field.get("type", "object")
+        if field_type == "object":
+            yield from _mapping_fields(field.get("properties", {}), prefix + name + ".")
+            continue
+        type_ = _arrow_type(field_type)
+        if type_ is not None:
+            yield prefix + name, type_
+
+
+def _scan_schema(
+    client: Elasticsearch, index: Any, request: Mapping[str, Any]
+) -> "pa.Schema":
+    """
+    Schema of the hits of a search request derived from the mapping of the
+    indices it searches: the ``_id`` and the supported leaf fields, only the
+    ones requested through ``fields`` or ``docvalue_fields`` when the source
+    isn't returned.
+    """
+    import pyarrow as pa
+
+    if index is None:
+        raise ValueError("'index' is required to derive the schema from its mapping")
+    fields: Dict[str, "pa.DataType"] = {}
+    mappings = client.indices.get_mapping(index=index)
+    for _, mapping in sorted(mappings.items()):
+        for name, type_ in _mapping_fields(
+            mapping.get("mappings", {}).get("properties", {})
+        ):
+            # the first index wins when their mappings differ
+            fields.setdefault(name, type_)
+
+    if request.get("_source", request.get("source")) is False:
+        patterns = [
+            pattern if isinstance(pattern, str) else pattern["field"]
+            for pattern in list(request.get("fields") or ())
+            + list(request.get("docvalue_fields") or ())
+        ]
+        fields = {
+            name: type_
+            for name, type_ in fields.items()
+            if any(fnmatchcase(name, pattern) for pattern in patterns)
+        }
+    return pa.schema([("_id", pa.string())] + list(fields.items()))
+
+
+def _hit_value(hit: Mapping[str, Any], name: str, type_: "pa.DataType") -> Any:
+    import pyarrow as pa
+
+    is_list = pa.types.is_list(type_) or pa.types.is_large_list(type_)
+    if name in hit.get("fields", ()):
+        # the fields and docvalue_fields are always returned as arrays
+        values = hit["fields"][name]
+        if is_list:
+            return values
+        return values[0] if values else None
+    if name.startswith("_") and name in hit:
+        return hit[name]
+    value = hit.get("_source", {})
+    if name in value:
+        value = value[name]
+    else:
+        for key in name.split("."):
+            if not isinstance(value, Mapping) or key not in value:
+                return None
+            value = value[key]
+    # a single value is the same as an array of one for elasticsearch
+    if is_list and value is not None and not isinstance(value, list):
+        return [value]
+    return value
+
+
+def _timestamps(values: List[Any], type_: "pa.DataType") -> "pa.Array":
+    """
+    Timestamp array of dates as found in the sources: ISO 8601 strings, with
+    or without a time or a time zone (UTC then), or epoch milliseconds.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    strings = pa.array([v if isinstance(v, str) else None for v in values], pa.string())
+    # a date is the start of the day, and dates are in UTC unless told otherwise
+    strings = pc.replace_substring_regex(
+        strings, r"^(\d{4}-\d{2}-\d{2})$", r"\1T00:00:00"
+    )
+    strings = pc.replace_substring_regex(strings, r"^(.*T[\d:.,]*)$", r"\1Z")
+    millis = pa.array(
+        [None if v is None or isinstance(v, str) else int(v) for v in values],
+        pa.int64(),
+    )
+    return pc.if_else(
+        strings.is_valid(),
+        pc.cast(strings, type_),
+        millis.cast(pa.timestamp("ms", tz="UTC")).cast(type_),
+    )
+
+
+def _hits_record_batch(
+    hits: Sequence[Mapping[str, Any]], schema: "pa.Schema"
+) -> "pa.RecordBatch":
+    """
+    Record batch of the hits of a page, with a column per field of
+    ``schema`` taken from the ``fields`` of the hits (which includes the
+    ``docvalue_fields``), their metadata or their ``_source``, by dotted name.
+    """
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        values = [_hit_value(hit, field.name, field.type) for hit in hits]
+        if pa.types.is_timestamp(field.type):
+            columns.append(_timestamps(values, field.type))
+        else:
+            columns.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def scan_to_arrow(
+    client: Elasticsearch,
+    query: Optional[Any] = None,
+    schema: Optional["pa.Schema"] = None,
+    **kwargs: Any,
+) -> Iterable["pa.RecordBatch"]:
+    """
+    Version of :func:`~elasticsearch.helpers.scan` yielding the hits as
+    ``pyarrow.RecordBatch``, one per page of hits, to go straight into
+    columnar tooling. Requires the ``pyarrow`` package::
+
+        import pyarrow.parquet as pq
+
+        batches = scan_to_arrow(client, index="orders")
+        first = next(batches)
+        with pq.ParquetWriter("orders.parquet", first.schema) as writer:
+            writer.write_batch(first)
+            for batch in batches:
+                writer.write_batch(batch)
+
+    Each hit becomes a row, with a column per field of the schema. The values
+    are taken from the ``fields`` of the hit when the field was requested
+    through ``fields`` or ``docvalue_fields`` (the first one unless the type
+    of the column is a list), from the metadata of the hit for the names
+    starting with an underscore (like ``_id`` or ``_score``), or else from
+    its ``_source``, where the dotted names are looked up in the objects.
+    The dates are parsed from ISO 8601 strings or epoch milliseconds.
+
+    Without a ``schema`` it is derived from the mapping of ``index``: the
+    ``_id`` and a column per leaf field of a type having an Arrow equivalent
+    (strings, numbers, booleans, dates and dense vectors), the fields of
+    objects being flattened to dotted names. When ``_source`` is ``False``
+    the columns are limited to the ``fields`` and ``docvalue_fields``
+    requested. Fields of other types, or holding several values, need a
+    ``schema``.
+
+    :arg client: instance of :class:`~elasticsearch.Elasticsearch` to use
+    :arg query: body for the :meth:`~elasticsearch.Elasticsearch.search` api
+    :arg schema: ``pyarrow.Schema`` of the record batches, derived from the
+        mapping of the indices searched by default
+
+    Any additional keyword arguments will be passed to
+    :func:`~elasticsearch.helpers.scan_batches`.
+    """
+    if schema is None:
+        schema = _scan_schema(client, kwargs.get("index"), {**(query or {}), **kwargs})
+    pages = scan_batches(client, query, **kwargs)
+    try:
+        for hits in pages:
+            yield _hits_record_batch(hits, schema)
+    finally:
+        pages.close()  # type: ignore[attr-defined]
+
+
+def scan_to_pandas(
+    client: Elasticsearch,
+    query: Optional[Any] = None,
+    schema: Optional["pa.Schema"] = None,
+    **kwargs: Any,
+) -> Iterable["pd.DataFrame"]:
+    """
+    Version of :func:`~elasticsearch.helpers.scan_to_arrow` yielding a
+    ``pandas.DataFrame`` per page of hits, see it for how the columns are
+    made. Requires the ``pyarrow`` and ``pandas`` packages::
+
+        import pandas as pd
+
+        orders = pd.concat(scan_to_pandas(client, index="orders"))
+
+    Any keyword arguments will be passed to
+    :func:`~elasticsearch.helpers.scan_to_arrow`.
+    """
+    batches = scan_to_arrow(client, query, schema, **kwargs)
+    try:
+        for batch in batches:
+            yield batch.to_pandas()
+    finally:
+        batches.close()  # type: ignore[attr-defined]
@@ -0,0 +1,282 @@
+#  Licensed to Elasticsearch B.V. under one or more contributor
+#  license agreements. See the NOTICE file distributed with
+#  this work for additional information regarding copyright
+#  ownership. Elasticsearch B.V. licenses this file to you under
+#  the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing,
+#  software distributed under the License is distributed on an
+#  "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied.  See the License for the
+#  specific language governing permissions and limitations
+#  under the License.
+
+import logging
+import random
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from elastic_transport import BaseNode, NodeConfig, NodeSelector, Transport
+
+from .. import Elasticsearch
+from .._sync.client.utils import CLIENT_META_SERVICE
+from ..exceptions import ApiError, TransportError
+
+logger = logging.getLogger("elasticsearch.helpers")
+
+# number of shards, number of routing shards and node holding each primary
+_TYPE_INDEX_LAYOUT = Tuple[int, int, List[Optional[str]]]
+
+
+def _murmur3_32(key: bytes) -> int:
+    """
+    MurmurHash3 (x86, 32 bits) of ``key`` with a seed of 0, as an unsigned int.
+    """
+    h = 0
+    nblocks = len(key) // 4
+    for (k,) in struct.iter_unpack("<I", key[: nblocks * 4]):
+        k = (k * 0xCC9E2D51) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        h ^= (k * 0x1B873593) & 0xFFFFFFFF
+        h = ((h << 13) | (h >> 19)) & 0xFFFFFFFF
+        h = (h * 5 + 0xE6546B64) & 0xFFFFFFFF
+    tail = key[nblocks * 4 :]
+    if tail:
+        k = (int.from_bytes(tail, "little") * 0xCC9E2D51) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        h ^= (k * 0x1B873593) & 0xFFFFFFFF
+    h ^= len(key)
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+
+def _shard_id(routing: str, number_of_shards: int, routing_num_shards: int) -> int:
+    """
+    Shard of an index that a document with the given routing value (its
+    ``_id`` unless a custom routing is used) belongs to, computed like
+    Elasticsearch does: the hash of the UTF-16 code units of the value, as a
+    signed int, spread over the routing shards of the index.
+    """
+    h = _murmur3_32(routing.encode("utf-16-le", "surrogatepass"))
+    if h & 0x80000000:
+        h -= 1 << 32
+    return (h % routing_num_shards) // (routing_num_shards // number_of_shards)
+
+
+def _parse_publish_address(address: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not address or ":" not in address:
+        return None
+    if "/" in address:
+        # Support 7.x host/ip:port behavior where http.publish_host has been set.
+        host, address = address.split("/", 1)
+        return host, int(address.rsplit(":", 1)[1])
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class _PrimaryNodeSelector(NodeSelector):
+    """
+    Selects the first node the pool was created with, the one holding the
+    primary shards the requests are meant for, and falls back to any other
+    live node when that one is dead.
+    """
+
+    def __init__(self, node_configs: List[NodeConfig]):
+        super().__init__(node_configs)
+        self.fell_back = False
+
+    def select(self, nodes: Sequence[BaseNode]) -> BaseNode:
+        for node in nodes:
+            if node.config == self.node_configs[0]:
+                return node
+        self.fell_back = True
+        return random.choice(nodes)
+
+
+class _ShardRouter:
+    """
+    Finds the node holding the primary shard of documents from the shard
+    layout of their index, so that bulk requests can be sent to it directly
+    instead of through a coordinating node that forwards them.
+
+    Layouts are learned through the cluster state and ``search_shards`` the
+    first time an index is seen and thrown away every ``refresh_interval``
+    seconds, or as soon as a node holding primaries can't be reached, to
+    follow shards relocating and nodes joining or leaving the cluster.
+    """
+
+    def __init__(self, client: Elasticsearch, refresh_interval: float = 60) -> None:
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.expires = time.monotonic() + refresh_interval
+        # None for indices that can't be routed: unknown, aliases to several
+        # indices, custom routing partitions, time series...
+        self.layouts: Dict[str, Optional[_TYPE_INDEX_LAYOUT]] = {}
+        self.node_addresses: Dict[str, Optional[Tuple[str, int]]] = {}
+        self.node_clients: Dict[Tuple[str, int], Elasticsearch] = {}
+        self.unreachable: Set[Tuple[str, int]] = set()
+        # seconds spent resolving layouts, for the callers to account for
+        self.resolve_time = 0.0
+
+    def node_for(
+        self, index: Optional[str], routing: Optional[str]
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Address of the node holding the primary shard for a document, ``None``
+        if it can't be known.
+        """
+        if index is None or routing is None:
+            return None
+        try:
+            layout = self.layouts[index]
+        except KeyError:
+            start = time.perf_counter()
+            layout = self.layouts[index] = self._resolve(index)
+            self.resolve_time += time.perf_counter() - start
+        if layout is None:
+            return None
+        number_of_shards, routing_num_shards, primaries = layout
+        node_id = primaries[_shard_id(routing, number_of_shards, routing_num_shards)]
+        if node_id is None:
+            return None
+        address = self.node_addresses.get(node_id)
+        if address is None or address in self.unreachable:
+            return None
+        return address
+
+    def client_for(self, address: Tuple[str, int]) -> Elasticsearch:
+        """
+        Client sending its requests to the node at ``address`` first, and to
+        the other nodes of the cluster only when it's not available.
+        """
+        node_client = self.node_clients.get(address)
+        if node_client is None:
+            transport = self.client.transport
+            node_pool = transport.node_pool
+            nodes = node_pool.all()
+            # Use a node the client knows about as a base, like sniffing does.
+            host, port = address
+            node_config = nodes[0].config.replace(host=host, port=port)
+            node_client = self.client.options()
+            # Same options as the client's transport, except for sniffing on
+            # start which it already did.
+            node_client._transport = Transport(
+                [node_config]
+                + [node.config for node in nodes if node.config != node_config],
+                node_class=type(nodes[0]),
+                node_pool_class=type(node_pool),
+                randomize_nodes_in_pool=False,
+                node_selector_class=_PrimaryNodeSelector,
+                dead_node_backoff_factor=node_pool.dead_node_backoff_factor,
+                max_dead_node_backoff=node_pool.max_dead_node_backoff,
+                serializers=transport.serializers.serializers,
+                max_retries=transport.max_retries,
+                retry_on_status=transport.retry_on_status,
+                retry_on_timeout=transport.retry_on_timeout,
+                sniff_before_requests=transport._sniff_before_requests,
+                sniff_on_node_failure=transport._sniff_on_node_failure,
+                sniff_timeout=transport._sniff_timeout,
+                min_delay_between_sniffing=transport._min_delay_between_sniffing,
+                sniff_callback=transport._sniff_callback,
+                meta_header=transport.meta_header,
+                client_meta_service=CLIENT_META_SERVICE,
+            )
+            node_client._client_meta = self.client._client_meta
+            self.node_clients[address] = node_client
+        return node_client
+
+    def refresh(self) -> bool:
+        """
+        Forget the layouts when they expired or when a node holding primaries
+        went away. Returns ``True`` if they were.
+        """
+        stale = time.monotonic() >= self.expires
+        for address, node_client in self.node_clients.items():
+            selector = node_client.transport.node_pool.node_selector
+            if isinstance(selector, _PrimaryNodeSelector) and selector.fell_back:
+                if address not in self.unreachable:
+                    logger.warning(
+                        "Node %s:%s is unreachable, not sending bulk requests "
+                        "to it directly anymore",
+                        *address,
+                    )
+                    self.unreachable.add(address)
+                selector.fell_back = False
+                stale = True
+        if stale:
+            self.layouts.clear()
+            self.node_addresses.clear()
+            self.expires = time.monotonic() + self.refresh_interval
+        return stale
+
+    def close(self) -> None:
+        for node_client in self.node_clients.values():
+            node_client.close()
+        self.node_clients.clear()
+
+    def _resolve(self, index: str) -> Optional[_TYPE_INDEX_LAYOUT]:
+        try:
+            state = self.client.cluster.state(
+                metric="metadata",
+                index=index,
+                filter_path=[
+                    "metadata.indices.*.routing_num_shards",
+                    "metadata.indices.*.settings.index",
+                ],
+            )
+            indices = state.get("metadata", {}).get("indices", {})
+            if len(indices) != 1:
+                return None
+            ((name, metadata),) = indices.items()
+            settings = metadata["settings"]["index"]
+            if (
+                int(settings.get("routing_partition_size", 1)) != 1
+                or "routing_path" in settings
+            ):
+                return None
+            number_of_shards = int(settings["number_of_shards"])
+            routing_num_shards = int(metadata["routing_num_shards"])
+
+            primaries: List[Optional[str]] = [None] * number_of_shards
+            for copies in self.client.search_shards(index=name)["shards"]:
+                for copy in copies:
+                    if (
+                        copy["primary"]
+                        and copy["index"] == name
+                        and copy["state"] in ("STARTED", "RELOCATING")
+                    ):
+                        primaries[copy["shard"]] = copy["node"]
+
+            unknown = {
+                node_id
+                for node_id in primaries
+                if node_id is not None and node_id not in self.node_addresses
+            }
+            if unknown:
+                node_infos = self.client.nodes.info(
+                    node_id=",".join(sorted(unknown)),
+                    metric="http",
+                    filter_path="nodes.*.http.publish_address",
+                )
+                for node_id, node_info in node_infos.get("nodes", {}).items():
+                    self.node_addresses[node_id] = _parse_publish_address(
+                        node_info.get("http", {}).get("publish_address")
+                    )
+        except (ApiError, TransportError) as e:
+            logger.warning(
+                "Unable to resolve the shards of index %r, "
+                "sending its documents to any node: %s",
+                index,
+                e,
+            )
+            return None
+
+        return number_of_shards, routing_num_shards, primaries
@@ -98,6 +98,17 @@ if _OrjsonSerializer is not None:
 class NdjsonSerializer(JsonSerializer, _NdjsonSerializer):
     mimetype: ClassVar[str] = "application/x-ndjson"
 
+    def dumps(self, data: Any) -> bytes:
+        # Bodies that were already assembled into a single
+        # newline-terminated buffer (like the ones built by
+        # the bulk helpers) are forwarded without being copied.
+        body = data
+        if isinstance(body, (list, tuple)) and len(body) == 1:
+            body = body[0]
+        if isinstance(body, bytes) and body.endswith(b"\n"):
+            return body
+        return super().dumps(data)
+
     def default(self, data: Any) -> Any:
         return JsonSerializer.default(self, data)
 
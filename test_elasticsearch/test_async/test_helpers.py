@@ -0,0 +1,654 @@
+#  Licensed to Elasticsearch B.V. under one or more contributor
+#  license agreements. See the NOTICE file distributed with
+#  this work for additional information regarding copyright
+#  ownership. Elasticsearch B.V. licenses this file to you under
+#  the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+# 	http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing,
+#  software distributed under the License is distributed on an
+#  "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#  KIND, either express or implied.  See the License for the
+#  specific language governing permissions and limitations
+#  under the License.
+
+import asyncio
+import gzip
+from unittest import mock
+
+import pytest
+from elastic_transport import ApiResponseMeta, ObjectApiResponse
+
+from elasticsearch import AsyncElasticsearch, NotFoundError, helpers
+
+pytestmark = pytest.mark.asyncio
+
+
+def bulk_response(*statuses):
+    return ObjectApiResponse(
+        meta=ApiResponseMeta(
+            status=200, headers={}, http_version="1.1", duration=0, node=None
+        ),
+        body={
+            "errors": any(status >= 300 for status in statuses),
+            "items": [{"index": {"status": status}} for status in statuses],
+        },
+    )
+
+
+class SlowBulk:
+    """Mock of AsyncElasticsearch.bulk() answering each document '{"x": <delay>}'
+    after the delay, rejecting documents with a negative delay once."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rejected = set()
+
+    async def __call__(self, operations, **_):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            lines = operations[0].splitlines()[1::2]
+            await asyncio.sleep(max(abs(float(line[5:-1])) for line in lines))
+            statuses = []
+            for line in lines:
+                if line.startswith(b'{"x":-') and line not in self.rejected:
+                    self.rejected.add(line)
+                    statuses.append(429)
+                else:
+                    statuses.append(201)
+            return bulk_response(*statuses)
+        finally:
+            self.in_flight -= 1
+
+
+class TestStreamingBulk:
+    @pytest.mark.parametrize("ordered", [True, False])
+    async def test_chunks_are_sent_concurrently(self, ordered):
+        bulk = SlowBulk()
+        actions = [{"x": 0.01 * (i % 4)} for i in range(20)]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=1,
+                    max_concurrency=4,
+                    ordered=ordered,
+                )
+            ]
+
+        assert 4 == bulk.max_in_flight
+        assert [True] * 20 == [ok for ok, _ in results]
+
+    async def test_results_are_ordered(self):
+        bulk = SlowBulk()
+        actions = [{"x": 0.05}, {"x": 0.0}, {"x": -0.01}, {"x": 0.0}]
+        with mock.patch.object(
+            AsyncElasticsearch, "bulk", side_effect=bulk
+        ), mock.patch.object(
+            helpers.AdaptiveChunkSize, "record", autospec=True
+        ) as record:
+            chunk_size = helpers.AdaptiveChunkSize(
+                initial_chunk_size=1, min_chunk_size=1
+            )
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=chunk_size,
+                    max_concurrency=4,
+                    max_retries=1,
+                    initial_backoff=0,
+                    raise_on_error=False,
+                )
+            ]
+
+        assert [True] * 4 == [ok for ok, _ in results]
+        # the rejected document was retried on its own
+        assert 5 == record.call_count
+        assert 4 == bulk.max_in_flight
+
+    async def test_unordered_results_come_as_soon_as_done(self):
+        order = []
+        bulk = SlowBulk()
+        actions = [{"x": 0.05}, {"x": 0.0}]
+
+        async def track(operations, **kwargs):
+            resp = await bulk(operations, **kwargs)
+            order.append(operations[0])
+            return resp
+
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=track):
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=1,
+                    max_concurrency=2,
+                    ordered=False,
+                )
+            ]
+
+        assert [b'{"index":{}}\n{"x":0.0}\n', b'{"index":{}}\n{"x":0.05}\n'] == order
+        assert 2 == len(results)
+
+    async def test_adaptive_chunk_size(self):
+        async def bulk(operations, **_):
+            return bulk_response(
+                *[429 if b"rejected" in operations[0] else 201]
+                * operations[0].count(b"index")
+            )
+
+        adjustments = []
+        chunk_size = helpers.AdaptiveChunkSize(
+            initial_chunk_size=2,
+            min_chunk_size=1,
+            increase_step=2,
+            on_adjust=lambda *args: adjustments.append(args),
+        )
+        actions = [{"x": i} for i in range(10)] + [{"rejected": True}] + [{}] * 5
+
+        with mock.patch.object(
+            AsyncElasticsearch, "bulk", side_effect=bulk
+        ) as bulk_mock:
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=chunk_size,
+                    raise_on_error=False,
+                )
+            ]
+
+        assert 16 == len(results)
+        assert [2, 4, 6, 3, 1] == [
+            call.kwargs["operations"][0].count(b"index")
+            for call in bulk_mock.call_args_list
+        ]
+        assert [
+            (2, 4, "increase"),
+            (4, 6, "increase"),
+            (6, 3, "rejected"),
+            (3, 5, "increase"),
+        ] == adjustments
+
+    async def test_chunks_are_chopped_by_compressed_size(self):
+        async def bulk(operations, **_):
+            return bulk_response(*[201] * operations[0].count(b"index"))
+
+        actions = [
+            {"i": i, "text": " ".join(map(str, range(i % 50, 100)))}
+            for i in range(5000)
+        ]
+        with mock.patch.object(
+            AsyncElasticsearch, "bulk", side_effect=bulk
+        ) as bulk_mock:
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=100000,
+                    max_chunk_compressed_bytes=10000,
+                )
+            ]
+
+        sizes = [
+            len(gzip.compress(call.kwargs["operations"][0]))
+            for call in bulk_mock.call_args_list
+        ]
+        assert 5000 == len(results)
+        assert len(sizes) > 1
+        assert max(sizes) <= 10000
+
+    async def test_pending_chunks_are_cancelled_on_error(self):
+        bulk = SlowBulk()
+        actions = [{"x": 0.0}, {"x": -0.0}, {"x": 1.0}]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            with pytest.raises(helpers.BulkIndexError):
+                async for _ in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=1,
+                    max_concurrency=3,
+                ):
+                    pass
+        assert 0 == bulk.in_flight
+
+    async def test_invalid_max_concurrency(self):
+        with pytest.raises(ValueError):
+            async for _ in helpers.async_streaming_bulk(
+                AsyncElasticsearch("http://localhost:9200"), [], max_concurrency=0
+            ):
+                pass
+
+    @pytest.mark.parametrize("max_concurrency", [1, 3])
+    async def test_checkpoint_resumes_ingest(self, max_concurrency, tmp_path):
+        bulk = SlowBulk()
+        (tmp_path / "checkpoint").write_bytes(b"2\n")
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint")
+        actions = [{"x": 0.01 * (i % 3)} for i in range(8)]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=2,
+                    max_concurrency=max_concurrency,
+                    ordered=False,
+                    checkpoint=checkpoint,
+                )
+            ]
+
+        assert 6 == len(results)
+        assert 8 == checkpoint.offset
+        assert b"8\n" == (tmp_path / "checkpoint").read_bytes()
+
+    async def test_checkpoint_only_counts_consumed_results(self, tmp_path):
+        bulk = SlowBulk()
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint", interval=0)
+        actions = [{"x": 0.0} for _ in range(6)]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            results = helpers.async_streaming_bulk(
+                AsyncElasticsearch("http://localhost:9200"),
+                actions,
+                chunk_size=2,
+                max_concurrency=2,
+                checkpoint=checkpoint,
+            )
+            async for _ in results:
+                break
+            await results.aclose()
+
+        # the second result of the first chunk wasn't consumed
+        assert 0 == checkpoint.offset
+        assert not (tmp_path / "checkpoint").exists()
+
+    async def test_coalesce(self):
+        bulk = SlowBulk()
+        coalescer = helpers.ActionCoalescer()
+        actions = [{"_id": i % 2, "x": 0.0} for i in range(5)]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    coalesce=coalescer,
+                )
+            ]
+
+        assert 2 == len(results)
+        assert 3 == coalescer.merged_count
+
+    async def test_bounded_errors(self):
+        bulk = SlowBulk()
+        actions = [{"x": -0.0}, {"x": 0.0}, {"x": -0.001}]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            success, errors = await helpers.async_bulk(
+                AsyncElasticsearch("http://localhost:9200"),
+                actions,
+                raise_on_error=False,
+                max_errors=1,
+            )
+
+        assert 1 == success
+        assert [{"index": {"status": 429}}] == errors
+        assert 2 == errors.total
+        assert {(429, None): 2} == errors.counts
+
+    async def test_chunk_stats(self):
+        bulk = SlowBulk()
+        stats = []
+        actions = [{"x": 0.0}, {"x": -0.0}, {"x": 0.0}]
+        with mock.patch.object(AsyncElasticsearch, "bulk", side_effect=bulk):
+            results = [
+                item
+                async for item in helpers.async_streaming_bulk(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=2,
+                    max_concurrency=2,
+                    max_retries=1,
+                    initial_backoff=0,
+                    raise_on_error=False,
+                    on_chunk_complete=stats.append,
+                )
+            ]
+
+        assert 3 == len(results)
+        assert [(2, 0, {201: 1, 429: 1}), (1, 0, {201: 1}), (1, 1, {201: 1})] == [
+            (s.action_count, s.attempt, s.status_counts) for s in stats
+        ]
+
+
+class SlicedScroll:
+    """Mock of the scroll apis serving 3 hits per slice, 2 per page, with
+    shard failures for the slices in ``failing``."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.remaining = {}
+        self.cleared = []
+
+    def page(self, slice_id):
+        hits = self.remaining[slice_id]
+        self.remaining[slice_id] = hits[2:]
+        return {
+            "_scroll_id": f"scroll-{slice_id}",
+            "_shards": {"total": 2, "successful": 1 if slice_id in self.failing else 2},
+            "hits": {"hits": hits[:2]},
+        }
+
+    async def search(self, slice, **_):
+        self.remaining[slice["id"]] = [{"_id": f"{slice['id']}-{i}"} for i in range(3)]
+        await asyncio.sleep(0)
+        return self.page(slice["id"])
+
+    async def scroll(self, scroll_id, **_):
+        await asyncio.sleep(0)
+        return self.page(int(scroll_id[7:]))
+
+    async def clear_scroll(self, scroll_id):
+        self.cleared.append(int(scroll_id[7:]))
+
+
+class TestParallelScan:
+    @pytest.fixture(autouse=True)
+    def scroll(self):
+        scroll = SlicedScroll(failing=(1,))
+        with mock.patch.object(
+            AsyncElasticsearch, "search", side_effect=scroll.search
+        ), mock.patch.object(
+            AsyncElasticsearch, "scroll", side_effect=scroll.scroll
+        ), mock.patch.object(
+            AsyncElasticsearch, "clear_scroll", side_effect=scroll.clear_scroll
+        ):
+            yield scroll
+
+    async def test_hits_of_all_slices_are_yielded(self, scroll):
+        errors = []
+        hits = [
+            hit
+            async for hit in helpers.async_parallel_scan(
+                AsyncElasticsearch("http://localhost:9200"),
+                slices=4,
+                max_concurrency=2,
+                size=2,
+                on_slice_error=lambda slice_id, e: errors.append(slice_id),
+            )
+        ]
+
+        assert [1] == errors
+        assert sorted(
+            f"{s}-{i}" for s in range(4) for i in range(3 if s != 1 else 2)
+        ) == sorted(hit["_id"] for hit in hits)
+        assert [0, 1, 2, 3] == sorted(scroll.cleared)
+
+    async def test_slices_are_cleared_on_early_exit(self, scroll):
+        hits = helpers.async_parallel_scan(
+            AsyncElasticsearch("http://localhost:9200"), slices=3, size=2
+        )
+        await hits.__anext__()
+        await hits.aclose()
+
+        # every scroll opened is cleared
+        assert sorted(scroll.remaining) == sorted(scroll.cleared)
+
+    async def test_slice_error_stops_all_slices(self, scroll):
+        with pytest.raises(helpers.ScanError):
+            async for _ in helpers.async_parallel_scan(
+                AsyncElasticsearch("http://localhost:9200"), slices=3, size=2
+            ):
+                pass
+
+        assert 1 in scroll.cleared
+        assert sorted(scroll.remaining) == sorted(scroll.cleared)
+
+    async def test_point_in_time_requires_an_index(self, scroll):
+        with pytest.raises(ValueError, match="point_in_time requires an index"):
+            async for _ in helpers.async_parallel_scan(
+                AsyncElasticsearch("http://localhost:9200"), point_in_time=True
+            ):
+                pass
+
+
+class TestScanPrefetch:
+    async def test_scroll_is_cleared_on_early_exit(self):
+        scroll = SlicedScroll()
+        with mock.patch.object(
+            AsyncElasticsearch, "search", side_effect=scroll.search
+        ), mock.patch.object(
+            AsyncElasticsearch, "scroll", side_effect=scroll.scroll
+        ), mock.patch.object(
+            AsyncElasticsearch, "clear_scroll", side_effect=scroll.clear_scroll
+        ):
+            client = AsyncElasticsearch("http://localhost:9200")
+            hits = [
+                hit["_id"]
+                async for hit in helpers.async_scan(
+                    client, {"slice": {"id": 0, "max": 2}}, size=2, prefetch=1
+                )
+            ]
+            assert ["0-0", "0-1", "0-2"] == hits
+            assert [0] == scroll.cleared
+
+            hits = helpers.async_scan(
+                client, {"slice": {"id": 1, "max": 2}}, size=2, prefetch=4
+            )
+            await hits.__anext__()
+            await hits.aclose()
+            assert [0, 1] == scroll.cleared
+
+            pages = [
+                [hit["_id"] for hit in hits]
+                async for hits in helpers.async_scan_batches(
+                    client, {"slice": {"id": 2, "max": 3}}, size=2
+                )
+            ]
+            assert [["2-0", "2-1"], ["2-2"]] == pages
+
+
+class TestScanBatches:
+    async def test_pages_and_transport_options(self):
+        scroll = SlicedScroll()
+        calls = []
+
+        def recorded(name):
+            async def side_effect(client, **kwargs):
+                calls.append((name, client._headers.get("x-opaque-id")))
+                return await getattr(scroll, name)(**kwargs)
+
+            return side_effect
+
+        with mock.patch.object(
+            AsyncElasticsearch, "search", autospec=True, side_effect=recorded("search")
+        ), mock.patch.object(
+            AsyncElasticsearch, "scroll", autospec=True, side_effect=recorded("scroll")
+        ), mock.patch.object(
+            AsyncElasticsearch,
+            "clear_scroll",
+            autospec=True,
+            side_effect=recorded("clear_scroll"),
+        ):
+            client = AsyncElasticsearch("http://localhost:9200")
+            pages = [
+                [hit["_id"] for hit in hits]
+                async for hits in helpers.async_scan_batches(
+                    client, {"slice": {"id": 0, "max": 2}}, size=2, opaque_id="export"
+                )
+            ]
+            assert [["0-0", "0-1"], ["0-2"]] == pages
+            assert [0] == scroll.cleared
+
+            pages = helpers.async_scan_batches(
+                client, {"slice": {"id": 1, "max": 2}}, size=2, opaque_id="export"
+            )
+            assert ["1-0", "1-1"] == [hit["_id"] for hit in await pages.__anext__()]
+            await pages.aclose()
+            assert [0, 1] == scroll.cleared
+
+        assert {"search", "scroll", "clear_scroll"} == {name for name, _ in calls}
+        # the transport options are forwarded to every request
+        assert {"export"} == {opaque_id for _, opaque_id in calls}
+
+
+class TestPitScan:
+    async def test_hits_are_paginated_with_search_after(self):
+        searches, closed = [], []
+
+        async def search(pit, size, search_after=None, **kwargs):
+            searches.append((pit["id"], search_after, kwargs["sort"]))
+            start = 0 if search_after is None else search_after[0] + 1
+            return ObjectApiResponse(
+                meta=ApiResponseMeta(
+                    status=200, headers={}, http_version="1.1", duration=0, node=None
+                ),
+                body={
+                    "pit_id": "pit-1",
+                    "_shards": {"total": 1, "successful": 1},
+                    "hits": {
+                        "hits": [
+                            {"_id": str(i), "sort": [i]}
+                            for i in range(start, min(start + size, 3))
+                        ]
+                    },
+                },
+            )
+
+        async def open_point_in_time(index, keep_alive):
+            return {"id": "pit-0"}
+
+        async def close_point_in_time(id):
+            closed.append(id)
+
+        with mock.patch.object(
+            AsyncElasticsearch, "search", side_effect=search
+        ), mock.patch.object(
+            AsyncElasticsearch, "open_point_in_time", side_effect=open_point_in_time
+        ), mock.patch.object(
+            AsyncElasticsearch, "close_point_in_time", side_effect=close_point_in_time
+        ):
+            hits = [
+                hit["_id"]
+                async for hit in helpers.async_pit_scan(
+                    AsyncElasticsearch("http://localhost:9200"),
+                    {"sort": "date"},
+                    index="i",
+                    size=2,
+                )
+            ]
+
+        assert ["0", "1", "2"] == hits
+        assert [
+            ("pit-0", None, ["date", "_shard_doc"]),
+            ("pit-1", [1], ["date", "_shard_doc"]),
+        ] == searches
+        assert ["pit-1"] == closed
+
+    async def test_shard_failures(self):
+        async def search(pit, size, **kwargs):
+            return ObjectApiResponse(
+                meta=ApiResponseMeta(
+                    status=200, headers={}, http_version="1.1", duration=0, node=None
+                ),
+                body={
+                    "pit_id": "pit-1",
+                    "_shards": {"total": 2, "successful": 1},
+                    "hits": {"hits": [{"_id": "0", "sort": [0]}]},
+                },
+            )
+
+        async def open_point_in_time(index, keep_alive):
+            return {"id": "pit-0"}
+
+        with mock.patch.object(
+            AsyncElasticsearch, "search", side_effect=search
+        ), mock.patch.object(
+            AsyncElasticsearch, "open_point_in_time", side_effect=open_point_in_time
+        ), mock.patch.object(
+            AsyncElasticsearch, "close_point_in_time", new_callable=mock.AsyncMock
+        ) as close_point_in_time:
+            client = AsyncElasticsearch("http://localhost:9200")
+            with pytest.raises(helpers.ScanError):
+                async for _ in helpers.async_pit_scan(client, index="i", size=2):
+                    pass
+            hits = [
+                hit["_id"]
+                async for hit in helpers.async_pit_scan(
+                    client, index="i", size=2, raise_on_error=False
+                )
+            ]
+
+        assert ["0"] == hits
+        assert 2 == close_point_in_time.call_count
+
+    async def test_cursor_replaces_expired_point_in_time(self):
+        searches = []
+
+        async def search(pit, size, search_after=None, **kwargs):
+            searches.append((pit["id"], search_after))
+            if pit["id"] == "pit-x":
+                raise NotFoundError(
+                    message="search_context_missing_exception",
+                    body={},
+                    meta=ApiResponseMeta(
+                        status=404,
+                        headers={},
+                        http_version="1.1",
+                        duration=0,
+                        node=None,
+                    ),
+                )
+            return ObjectApiResponse(
+                meta=ApiResponseMeta(
+                    status=200, headers={}, http_version="1.1", duration=0, node=None
+                ),
+                body={
+                    "pit_id": "pit-1",
+                    "_shards": {"total": 2, "successful": 1},
+                    "hits": {"hits": [{"_id": "2", "sort": [2, 0]}]},
+                },
+            )
+
+        async def open_point_in_time(index, keep_alive):
+            return {"id": "pit-0"}
+
+        cursor = helpers.ScanCursor(pit_id="pit-x", search_after=[1, 7])
+        with mock.patch.object(
+            AsyncElasticsearch, "search", side_effect=search
+        ), mock.patch.object(
+            AsyncElasticsearch, "open_point_in_time", side_effect=open_point_in_time
+        ), mock.patch.object(
+            AsyncElasticsearch, "close_point_in_time", new_callable=mock.AsyncMock
+        ) as close_point_in_time:
+            client = AsyncElasticsearch("http://localhost:9200")
+            hits = [
+                hit["_id"]
+                async for hit in helpers.async_pit_scan(
+                    client,
+                    {"sort": "n"},
+                    index="i",
+                    size=2,
+                    raise_on_error=False,
+                    cursor=cursor,
+                )
+            ]
+            with pytest.raises(helpers.ScanError):
+                async for _ in helpers.async_pit_scan(client, index="i"):
+                    pass
+
+        assert ["2"] == hits
+        assert [("pit-x", [1, 7]), ("pit-0", [1, -1]), ("pit-0", None)] == searches
+        assert (None, [2, 0]) == (cursor.pit_id, cursor.search_after)
+        assert 2 == close_point_in_time.call_count
@@ -15,10 +15,12 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
+import time
 from copy import deepcopy
 from typing import Any
 
 import pytest
+from elastic_transport import ObjectApiResponse
 from pytest import raises
 
 from elasticsearch.dsl import (
@@ -31,6 +33,7 @@ from elasticsearch.dsl import (
     wrappers,
 )
 from elasticsearch.dsl.exceptions import IllegalOperation
+from elasticsearch.helpers import ScanCursor
 
 
 def test_expand__to_dot_is_respected() -> None:
@@ -66,6 +69,73 @@ def test_iter_iterates_over_hits() -> None:
     assert [1, 2, 3] == [hit for hit in s]
 
 
+@pytest.mark.sync
+def test_iterate_with_cursor(mock_client: Any) -> None:
+    mock_client.options.return_value = mock_client
+    mock_client.search.return_value = {
+        "_shards": {"total": 1, "successful": 1},
+        "hits": {
+            "hits": [
+                {"_index": "i", "_id": str(n), "_source": {"n": n}, "sort": [n, n]}
+                for n in range(2)
+            ]
+        },
+    }
+    cursor = ScanCursor()
+    s = Search(using="mock", index="i").sort("n")
+
+    hits = [hit for hit in s.iterate(cursor=cursor)]
+
+    assert [0, 1] == [hit.n for hit in hits]
+    assert ["n", "_shard_doc"] == mock_client.search.call_args.kwargs["sort"]
+    mock_client.close_point_in_time.assert_called_once_with(id="pit")
+    assert (None, [1, 1]) == (cursor.pit_id, cursor.search_after)
+    with raises(ValueError):
+        [hit for hit in s.iterate(cursor=cursor, prefetch=1)]
+
+
+@pytest.mark.sync
+def test_iterate_with_prefetch_stops_before_closing_pit(
+    mock_client: Any,
+) -> None:
+    requests = []
+
+    def search(**kwargs: Any) -> Any:
+        # slow enough for the next page to be fetched when the iteration stops
+        time.sleep(0.01)
+        requests.append("search")
+        start = kwargs["body"].get("search_after", [-1])[0] + 1
+        return ObjectApiResponse(
+            meta=None,
+            body={
+                "pit_id": "pit",
+                "hits": {
+                    "hits": [
+                        {"_index": "i", "_id": str(n), "_source": {"n": n}, "sort": [n]}
+                        for n in range(start, start + 2)
+                    ]
+                },
+            },
+        )
+
+    def close_point_in_time(**kwargs: Any) -> None:
+        requests.append("close_point_in_time")
+
+    mock_client.search.side_effect = search
+    mock_client.close_point_in_time.side_effect = close_point_in_time
+    hits = Search(using="mock", index="i").sort("n").iterate(prefetch=1)
+
+    for hit in hits:
+        break
+    hits.close()  # type: ignore[attr-defined]
+    # leave the time to show up to pages still being fetched in the background
+    time.sleep(0.05)
+
+    assert 0 == hit.n
+    assert "close_point_in_time" == requests[-1]
+    assert 1 == requests.count("close_point_in_time")
+
+
 def test_cache_isnt_cloned() -> None:
     s = Search()
     s._response = object()  # type: ignore[assignment]
@@ -172,6 +172,7 @@ def mock_client(
     client = Mock()
     client.search.return_value = dummy_response
     client.update_by_query.return_value = dummy_response
+    client.open_point_in_time.return_value = {"id": "pit"}
     add_connection("mock", client)
 
     yield client
@@ -188,6 +189,8 @@ def async_mock_client(
     client.indices = AsyncMock()
     client.update_by_query = AsyncMock()
     client.delete_by_query = AsyncMock()
+    client.open_point_in_time = AsyncMock(return_value={"id": "pit"})
+    client.close_point_in_time = AsyncMock()
     add_async_connection("mock", client)
 
     yield client
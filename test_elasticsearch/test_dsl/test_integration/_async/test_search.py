@@ -239,6 +239,16 @@ async def test_iterate(async_data_client: AsyncElasticsearch) -> None:
     assert {d["_id"] for d in FLAT_DATA} == {c.meta.id for c in commits}
 
 
+@pytest.mark.asyncio
+async def test_iterate_with_prefetch(async_data_client: AsyncElasticsearch) -> None:
+    s = AsyncSearch(index="flat-git").extra(size=10)
+
+    commits = [commit async for commit in s.iterate(prefetch=2)]
+
+    assert 52 == len(commits)
+    assert {d["_id"] for d in FLAT_DATA} == {c.meta.id for c in commits}
+
+
 @pytest.mark.asyncio
 async def test_response_is_cached(async_data_client: AsyncElasticsearch) -> None:
     s = Repository.search()
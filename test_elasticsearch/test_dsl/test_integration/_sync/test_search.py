@@ -237,6 +237,16 @@ def test_iterate(data_client: Elasticsearch) -> None:
     assert {d["_id"] for d in FLAT_DATA} == {c.meta.id for c in commits}
 
 
+@pytest.mark.sync
+def test_iterate_with_prefetch(data_client: Elasticsearch) -> None:
+    s = Search(index="flat-git").extra(size=10)
+
+    commits = [commit for commit in s.iterate(prefetch=2)]
+
+    assert 52 == len(commits)
+    assert {d["_id"] for d in FLAT_DATA} == {c.meta.id for c in commits}
+
+
 @pytest.mark.sync
 def test_response_is_cached(data_client: Elasticsearch) -> None:
     s = Repository.search()
@@ -15,14 +15,32 @@
 #  specific language governing permissions and limitations
 #  under the License.
 
+import contextlib
+import gzip
+import io
+import json
 import pickle
 import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from unittest import mock
 
 import pytest
 
-from elasticsearch import Elasticsearch, helpers
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+from elastic_transport import ApiResponseMeta, NodeConfig, ObjectApiResponse, Transport
+
+from elasticsearch import ApiError, Elasticsearch, NotFoundError, helpers
 from elasticsearch.serializer import JSONSerializer
 
 lock_side_effect = threading.Lock()
@@ -43,6 +61,18 @@ def mock_process_bulk_chunk(*args, **kwargs):
 mock_process_bulk_chunk.call_count = 0
 
 
+def bulk_response(*statuses):
+    return ObjectApiResponse(
+        meta=ApiResponseMeta(
+            status=200, headers={}, http_version="1.1", duration=0, node=None
+        ),
+        body={
+            "errors": any(status >= 300 for status in statuses),
+            "items": [{"index": {"status": status}} for status in statuses],
+        },
+    )
+
+
 class TestParallelBulk:
     @mock.patch(
         "elasticsearch.helpers.actions._process_bulk_chunk",
@@ -77,6 +107,1416 @@ class TestParallelBulk:
         )
         assert len({r[1] for r in results}) > 1
 
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [
+            (True, (bulk_data, bulk_actions))
+        ],
+    )
+    def test_actions_serialized_in_processes(self, _process_bulk_chunk):
+        actions = ({"_id": i, "x": "y" * (i % 7)} for i in range(100))
+        results = list(
+            helpers.parallel_bulk(
+                Elasticsearch("http://localhost:9200"),
+                actions,
+                chunk_size=10,
+                max_chunk_bytes=200,
+                process_count=2,
+            )
+        )
+
+        chunks = [chunk for _, chunk in results]
+        assert all(len(data) <= 10 for data, _ in chunks)
+        assert all(len(body) <= 200 for _, (body,) in chunks)
+        # all actions made it, in order
+        ((data, (body,)),) = helpers._chunk_actions(
+            map(
+                helpers.expand_action,
+                ({"_id": i, "x": "y" * (i % 7)} for i in range(100)),
+            ),
+            100,
+            100000,
+            JSONSerializer(),
+        )
+        assert data == [item for data, _ in chunks for item in data]
+        assert body == b"".join(body for _, (body,) in chunks)
+
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [
+            (True, len(bulk_data))
+        ],
+    )
+    def test_serializing_processes_are_spawned(self, _process_bulk_chunk):
+        executors = []
+
+        def process_pool_executor(*args, **kwargs):
+            executors.append(ProcessPoolExecutor(*args, **kwargs))
+            return executors[-1]
+
+        actions = ({"_id": i} for i in range(20))
+        with mock.patch(
+            "concurrent.futures.ProcessPoolExecutor", process_pool_executor
+        ):
+            results = list(
+                helpers.parallel_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    actions,
+                    chunk_size=5,
+                    process_count=2,
+                )
+            )
+
+        assert [(True, 5)] * 4 == results
+        # the pool is started from a thread of parallel_bulk(), forking there
+        # isn't safe
+        assert "spawn" == executors[0]._mp_context.get_start_method()
+
+    @pytest.mark.parametrize("ordered", [True, False])
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        # the first chunk is much slower than the others
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [
+            (True, time.sleep(0.2 if bulk_data[0][1]["x"] == 0 else 0) or bulk_data)
+        ],
+    )
+    def test_unordered_results(self, _process_bulk_chunk, ordered):
+        actions = ({"x": i} for i in range(10))
+        results = list(
+            helpers.parallel_bulk(
+                Elasticsearch("http://localhost:9200"),
+                actions,
+                thread_count=2,
+                chunk_size=2,
+                ordered=ordered,
+            )
+        )
+
+        first_chunk = [({"index": {}}, {"x": 0}), ({"index": {}}, {"x": 1})]
+        assert 5 == len(results)
+        assert (results[0] if ordered else results[-1]) == (True, first_chunk)
+
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [
+            (
+                data[1]["x"] % 2 == 0,
+                {"index": {"status": 201 if data[1]["x"] % 2 == 0 else 400}},
+            )
+            for data in bulk_data
+        ],
+    )
+    def test_failed_documents_are_written_to_dead_letters(
+        self, _process_bulk_chunk, tmp_path
+    ):
+        dead_letters = tmp_path / "dead_letters.ndjson"
+        actions = ({"x": i} for i in range(5))
+        results = list(
+            helpers.parallel_bulk(
+                Elasticsearch("http://localhost:9200"),
+                actions,
+                chunk_size=2,
+                dead_letters=str(dead_letters),
+            )
+        )
+
+        assert [True, False, True, False, True] == [ok for ok, _ in results]
+        assert (
+            b'{"index":{"status":400}}\n{"index":{}}\n{"x":1}\n'
+            b'{"index":{"status":400}}\n{"index":{}}\n{"x":3}\n'
+        ) == dead_letters.read_bytes()
+        assert not _process_bulk_chunk.call_args.kwargs["raise_on_error"]
+
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        # the first chunk is much slower than the others
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [
+            (True, time.sleep(0.2 if bulk_data[0][1]["x"] == 0 else 0) or {})
+            for _ in bulk_data
+        ],
+    )
+    def test_checkpoint_with_unordered_results(self, _process_bulk_chunk, tmp_path):
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint", interval=0)
+        acks = []
+        ack = checkpoint.ack
+        checkpoint.ack = lambda start, count: acks.append(start) or ack(start, count)
+
+        results = list(
+            helpers.parallel_bulk(
+                Elasticsearch("http://localhost:9200"),
+                ({"x": i} for i in range(10)),
+                thread_count=2,
+                chunk_size=2,
+                ordered=False,
+                checkpoint=checkpoint,
+            )
+        )
+
+        assert 10 == len(results)
+        assert 0 == acks[-1]
+        assert 10 == checkpoint.offset
+        assert b"10\n" == (tmp_path / "checkpoint").read_bytes()
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_chunk_stats(self, bulk):
+        bulk.side_effect = lambda operations, **_: ObjectApiResponse(
+            meta=bulk_response().meta,
+            body={
+                "took": 7,
+                "errors": False,
+                "items": [
+                    {"index": {"status": 201}}
+                    for _ in range(operations[0].count(b"index"))
+                ],
+            },
+        )
+        stats = []
+
+        results = list(
+            helpers.parallel_bulk(
+                Elasticsearch("http://localhost:9200"),
+                ({"x": i} for i in range(5)),
+                chunk_size=2,
+                on_chunk_complete=stats.append,
+            )
+        )
+
+        assert 5 == len(results)
+        assert [2, 2, 1] == sorted((s.action_count for s in stats), reverse=True)
+        assert all(s.took == 7 and s.attempt == 0 for s in stats)
+        assert 5 == sum(s.status_counts[201] for s in stats)
+
+    def test_in_flight_bytes_are_bounded(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def process_bulk_chunk(client, bulk_actions, bulk_data, *_, **__):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return [(True, {})] * len(bulk_data)
+
+        # chunks of 2 actions are 2 * len(b'{"index":{}}\n{"x":0}\n') bytes
+        with mock.patch(
+            "elasticsearch.helpers.actions._process_bulk_chunk",
+            side_effect=process_bulk_chunk,
+        ):
+            results = list(
+                helpers.parallel_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    ({"x": i % 10} for i in range(40)),
+                    thread_count=4,
+                    chunk_size=2,
+                    max_in_flight_bytes=100,
+                )
+            )
+
+        assert 40 == len(results)
+        assert 2 == in_flight[1]
+
+    def test_in_flight_bytes_count_actions_serialized_in_processes(self):
+        lock = threading.Lock()
+        # batches sent to the processes whose results weren't handled yet
+        in_flight = [0, 0]
+        process_pool_submit = ProcessPoolExecutor.submit
+
+        def submit(executor, *args, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            return process_pool_submit(executor, *args, **kwargs)
+
+        def process_bulk_chunk(client, bulk_actions, bulk_data, *_, **__):
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return [(True, {})] * len(bulk_data)
+
+        # chunks of 2 actions are 2 * len(b'{"index":{}}\n{"x":0}\n') bytes
+        with mock.patch(
+            "elasticsearch.helpers.actions._process_bulk_chunk",
+            side_effect=process_bulk_chunk,
+        ), mock.patch.object(ProcessPoolExecutor, "submit", submit):
+            results = list(
+                helpers.parallel_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    ({"x": i % 10} for i in range(40)),
+                    thread_count=4,
+                    chunk_size=2,
+                    process_count=2,
+                    max_in_flight_bytes=100,
+                )
+            )
+
+        assert 40 == len(results)
+        assert 2 == in_flight[1]
+
+    @mock.patch(
+        "elasticsearch.helpers.actions._process_bulk_chunk",
+        side_effect=lambda client, bulk_actions, bulk_data, *_, **__: [(True, {})]
+        * len(bulk_data),
+    )
+    def test_in_flight_bytes_larger_chunks_and_early_stop(self, _):
+        results = helpers.parallel_bulk(
+            Elasticsearch("http://localhost:9200"),
+            ({"x": i} for i in range(100)),
+            chunk_size=10,
+            max_in_flight_bytes=1,
+        )
+
+        # each chunk goes alone, and stopping doesn't leave the producer stuck
+        assert (True, {}) == next(results)
+        results.close()
+
+
+class TestStreamingBulk:
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_rejected_documents_are_retried_from_serialized_bytes(self, bulk):
+        bulk.side_effect = [bulk_response(201, 429, 201, 429), bulk_response(201, 201)]
+        client = Elasticsearch("http://localhost:9200")
+        actions = [{"x": 1}, {"_id": "a", "y": 2}, '{"z":3}\n', {"w": 4}]
+
+        with mock.patch.object(
+            JSONSerializer, "dumps", side_effect=JSONSerializer().dumps
+        ) as dumps:
+            results = list(
+                helpers.streaming_bulk(
+                    client,
+                    actions,
+                    raise_on_error=False,
+                    max_retries=1,
+                    initial_backoff=0,
+                )
+            )
+            # each source and the shared action line were only serialized once
+            assert 4 == dumps.call_count
+
+        assert [True] * 4 == [ok for ok, _ in results]
+        assert [
+            b'{"index":{}}\n{"x":1}\n'
+            b'{"index":{"_id":"a"}}\n{"y":2}\n'
+            b'{"index":{}}\n{"z":3}\n'
+            b'{"index":{}}\n{"w":4}\n'
+        ] == bulk.call_args_list[0].kwargs["operations"]
+        assert [
+            b'{"index":{"_id":"a"}}\n{"y":2}\n{"index":{}}\n{"w":4}\n'
+        ] == bulk.call_args_list[1].kwargs["operations"]
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_serialized_actions_are_sent_as_is(self, bulk):
+        bulk.return_value = bulk_response(201, 200)
+        client = Elasticsearch("http://localhost:9200")
+        actions = helpers.ndjson_actions(
+            [
+                b'{"index":{"_index":"i","_id":"1"}}\n',
+                b'{"a":1}\n',
+                "\n",
+                '{"delete":{"_index":"i","_id":"2"}}',
+            ]
+        )
+
+        with mock.patch.object(JSONSerializer, "dumps") as dumps:
+            results = list(helpers.streaming_bulk(client, actions))
+            dumps.assert_not_called()
+
+        assert [True, True] == [ok for ok, _ in results]
+        assert [
+            b'{"index":{"_index":"i","_id":"1"}}\n{"a":1}\n'
+            b'{"delete":{"_index":"i","_id":"2"}}\n'
+        ] == bulk.call_args.kwargs["operations"]
+
+    @mock.patch(
+        "elasticsearch.Elasticsearch.bulk",
+        side_effect=ApiError(
+            message="Error!",
+            body={},
+            meta=ApiResponseMeta(
+                status=599, headers={}, http_version="1.1", duration=0, node=None
+            ),
+        ),
+    )
+    def test_serialized_actions_are_reported_on_exception(self, _):
+        client = Elasticsearch("http://localhost:9200")
+        actions = [(b'{"index":{"_id":"1"}}', b'{"a":1}')]
+
+        results = list(
+            helpers.streaming_bulk(
+                client, actions, raise_on_exception=False, raise_on_error=False
+            )
+        )
+
+        assert 1 == len(results)
+        ok, info = results[0]
+        assert not ok
+        assert "1" == info["index"]["_id"]
+        assert b'{"a":1}' == info["index"]["data"]
+        assert 599 == info["index"]["status"]
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_failed_documents_are_written_to_dead_letters(self, bulk):
+        bulk.return_value = bulk_response(201, 400, 404, 429)
+        client = Elasticsearch("http://localhost:9200")
+        actions = [{"_id": i, "x": i} for i in range(4)]
+        dead_letters = io.BytesIO()
+
+        results = list(
+            helpers.streaming_bulk(
+                client, actions, ignore_status=404, dead_letters=dead_letters
+            )
+        )
+
+        assert [True, False, False, False] == [ok for ok, _ in results]
+        assert (
+            b'{"index":{"status":400}}\n{"index":{"_id":1}}\n{"x":1}\n'
+            b'{"index":{"status":429}}\n{"index":{"_id":3}}\n{"x":3}\n'
+        ) == dead_letters.getvalue()
+
+    @mock.patch(
+        "elasticsearch.Elasticsearch.bulk",
+        side_effect=ApiError(
+            message="Error!",
+            body={},
+            meta=ApiResponseMeta(
+                status=599, headers={}, http_version="1.1", duration=0, node=None
+            ),
+        ),
+    )
+    def test_dead_letters_on_exception(self, _, tmp_path):
+        client = Elasticsearch("http://localhost:9200")
+        actions = [(b'{"index":{"_id":"1"}}', b'{"a":1}')]
+
+        results = list(
+            helpers.streaming_bulk(
+                client,
+                actions,
+                raise_on_exception=False,
+                dead_letters=tmp_path / "dead_letters.ndjson",
+            )
+        )
+
+        assert [False] == [ok for ok, _ in results]
+        assert (
+            b'{"index":{"error":"ApiError(599, \'Error!\')","status":599,"_id":"1"}}\n'
+            b'{"index":{"_id":"1"}}\n{"a":1}\n'
+        ) == (tmp_path / "dead_letters.ndjson").read_bytes()
+
+    @mock.patch(
+        "elasticsearch.Elasticsearch.bulk", return_value=bulk_response(201, 201)
+    )
+    def test_replay_dead_letters(self, bulk):
+        dead_letters = io.BytesIO(
+            b'{"index":{"status":400,"error":{"type":"x"}}}\n'
+            b'{"index":{"_id":1}}\n{"x":1}\n'
+            b'{"delete":{"status":503}}\n'
+            b'{"delete":{"_id":2}}\n'
+        )
+
+        assert (2, 0) == helpers.replay_dead_letters(
+            Elasticsearch("http://localhost:9200"), dead_letters, stats_only=True
+        )
+        assert [
+            b'{"index":{"_id":1}}\n{"x":1}\n{"delete":{"_id":2}}\n'
+        ] == bulk.call_args.kwargs["operations"]
+
+    def test_replay_truncated_dead_letters(self):
+        dead_letters = io.BytesIO(b'{"index":{"status":400}}\n{"index":{}}\n')
+        with pytest.raises(ValueError):
+            helpers.replay_dead_letters(
+                Elasticsearch("http://localhost:9200"), dead_letters
+            )
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_chunk_stats(self, bulk):
+        bulk.side_effect = [
+            bulk_response(201, 429, 400),
+            bulk_response(201),
+            ApiError(
+                message="Error!",
+                body={},
+                meta=ApiResponseMeta(
+                    status=503, headers={}, http_version="1.1", duration=0, node=None
+                ),
+            ),
+        ]
+        stats = []
+
+        results = list(
+            helpers.streaming_bulk(
+                Elasticsearch("http://localhost:9200"),
+                [{"x": i} for i in range(4)],
+                chunk_size=3,
+                max_retries=1,
+                initial_backoff=0,
+                raise_on_error=False,
+                raise_on_exception=False,
+                on_chunk_complete=stats.append,
+            )
+        )
+
+        assert 4 == len(results)
+        assert [
+            (3, 0, {201: 1, 429: 1, 400: 1}),
+            (1, 1, {201: 1}),
+            (1, 0, {503: 1}),
+        ] == [(s.action_count, s.attempt, s.status_counts) for s in stats]
+        assert [63, 21, 21] == [s.body_size for s in stats]
+        assert stats[0].serialization_time > 0
+        assert 0 == stats[1].serialization_time
+        assert all(s.request_time >= 0 for s in stats)
+        assert 503 == stats[2].error.status_code
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_checkpoint_resumes_ingest(self, bulk, tmp_path):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[201] * operations[0].count(b"index")
+        )
+        client = Elasticsearch("http://localhost:9200")
+        (tmp_path / "checkpoint").write_bytes(b"3\n")
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint")
+
+        results = list(
+            helpers.streaming_bulk(
+                client,
+                ({"_id": i} for i in range(10)),
+                chunk_size=4,
+                checkpoint=checkpoint,
+            )
+        )
+
+        assert 7 == len(results)
+        assert (
+            b'{"index":{"_id":3}}'
+            == bulk.call_args_list[0].kwargs["operations"][0].split(b"\n", 1)[0]
+        )
+        assert b"10\n" == (tmp_path / "checkpoint").read_bytes()
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk", return_value=bulk_response(400))
+    def test_checkpoint_stops_at_errors(self, _, tmp_path):
+        client = Elasticsearch("http://localhost:9200")
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint")
+
+        with pytest.raises(helpers.BulkIndexError):
+            list(
+                helpers.streaming_bulk(
+                    client, [{"x": 1}], chunk_size=1, checkpoint=checkpoint
+                )
+            )
+
+        assert 0 == checkpoint.offset
+        assert not (tmp_path / "checkpoint").exists()
+
+    def test_checkpoint_and_shard_routing(self, tmp_path):
+        with pytest.raises(ValueError):
+            list(
+                helpers.streaming_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    [],
+                    shard_routing=True,
+                    checkpoint=helpers.BulkCheckpoint(tmp_path / "checkpoint"),
+                )
+            )
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_coalesce(self, bulk):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[200] * operations[0].count(b"\n", 0, -1)
+        )
+        client = Elasticsearch("http://localhost:9200")
+        coalescer = helpers.ActionCoalescer()
+        actions = [
+            {"_op_type": "update", "_id": i % 2, "doc": {"n": i}} for i in range(6)
+        ]
+
+        results = list(
+            helpers.streaming_bulk(client, actions, chunk_size=10, coalesce=coalescer)
+        )
+
+        assert 2 == len(results)
+        assert 4 == coalescer.merged_count
+        assert (
+            b'{"update":{"_id":0}}\n{"doc":{"n":4}}\n'
+            b'{"update":{"_id":1}}\n{"doc":{"n":5}}\n'
+        ) == bulk.call_args.kwargs["operations"][0]
+
+    def test_checkpoint_and_coalesce(self, tmp_path):
+        with pytest.raises(ValueError):
+            list(
+                helpers.streaming_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    [],
+                    coalesce=helpers.ActionCoalescer(),
+                    checkpoint=helpers.BulkCheckpoint(tmp_path / "checkpoint"),
+                )
+            )
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_chunk_results(self, bulk):
+        def side_effect(operations, **_):
+            if b'"fail"' in operations[0]:
+                return bulk_response(201, 400, 429)
+            return bulk_response(*[201] * operations[0].count(b"index"))
+
+        bulk.side_effect = side_effect
+        client = Elasticsearch("http://localhost:9200")
+        actions = [{"x": 1}, {"x": 2}, {"x": 3}, {"ok": 1}, {"fail": 1}, {"x": 4}]
+
+        results = list(
+            helpers.streaming_bulk_chunks(
+                client,
+                actions,
+                chunk_size=3,
+                max_retries=1,
+                initial_backoff=0,
+                raise_on_error=False,
+            )
+        )
+
+        assert [
+            (3, 3, []),
+            (3, 2, [{"index": {"status": 400, "data": {"fail": 1}}}]),
+        ] == [(r.action_count, r.success_count, r.failed) for r in results]
+        # only the rejected document is retried
+        assert b'{"index":{}}\n{"x":4}\n' == bulk.call_args.kwargs["operations"][0]
+
+    @mock.patch(
+        "elasticsearch.Elasticsearch.bulk",
+        side_effect=[bulk_response(201), bulk_response(400), bulk_response(201)],
+    )
+    def test_chunk_results_raise_on_error(self, _):
+        results = helpers.streaming_bulk_chunks(
+            Elasticsearch("http://localhost:9200"),
+            [{"x": 1}, {"x": 2}, {"x": 3}],
+            chunk_size=1,
+        )
+
+        assert 1 == next(results).success_count
+        with pytest.raises(helpers.BulkIndexError):
+            next(results)
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_bounded_errors(self, bulk):
+        def side_effect(operations, **_):
+            resp = bulk_response(*[201, 400, 400, 429][: operations[0].count(b"index")])
+            for item in resp.body["items"]:
+                if item["index"]["status"] == 400:
+                    item["index"]["error"] = {"type": "mapper_parsing_exception"}
+            return resp
+
+        bulk.side_effect = side_effect
+        client = Elasticsearch("http://localhost:9200")
+        streamed = []
+
+        success, errors = helpers.bulk(
+            client,
+            [{"x": i} for i in range(8)],
+            chunk_size=4,
+            raise_on_error=False,
+            max_errors=3,
+            on_error=streamed.append,
+        )
+
+        assert 2 == success
+        assert isinstance(errors, helpers.BulkErrors)
+        assert 3 == len(errors)
+        assert 6 == errors.total == len(streamed)
+        assert errors == streamed[:3]
+        assert {(400, "mapper_parsing_exception"): 4, (429, None): 2} == errors.counts
+
+        streamed.clear()
+        assert (2, 6) == helpers.bulk(
+            client,
+            [{"x": i} for i in range(8)],
+            chunk_size=4,
+            raise_on_error=False,
+            stats_only=True,
+            on_error=streamed.append,
+        )
+        assert 6 == len(streamed)
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_adaptive_chunk_size(self, bulk):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[429 if b"rejected" in operations[0] else 201]
+            * operations[0].count(b"index")
+        )
+        client = Elasticsearch("http://localhost:9200")
+        adjustments = []
+        chunk_size = helpers.AdaptiveChunkSize(
+            initial_chunk_size=2,
+            min_chunk_size=1,
+            increase_step=2,
+            on_adjust=lambda *args: adjustments.append(args),
+        )
+        actions = [{"x": i} for i in range(10)] + [{"rejected": True}] + [{}] * 5
+
+        results = list(
+            helpers.streaming_bulk(
+                client, actions, chunk_size=chunk_size, raise_on_error=False
+            )
+        )
+
+        assert 16 == len(results)
+        assert [2, 4, 6, 3, 1] == [
+            call.kwargs["operations"][0].count(b"index") for call in bulk.call_args_list
+        ]
+        assert [
+            (2, 4, "increase"),
+            (4, 6, "increase"),
+            (6, 3, "rejected"),
+            (3, 5, "increase"),
+        ] == adjustments
+
+
+class TestFanoutBulk:
+    clients = [
+        Elasticsearch("http://node-a:9200"),
+        Elasticsearch("http://node-b:9200"),
+    ]
+
+    @staticmethod
+    def host(client):
+        return client.transport.node_pool.all()[0].config.host
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    def test_chunks_are_serialized_once(self, bulk):
+        bulk.side_effect = lambda _, operations, **__: bulk_response(
+            *[201] * operations[0].count(b"index")
+        )
+        results = list(
+            helpers.fanout_bulk(
+                self.clients, [{"x": i} for i in range(5)], chunk_size=2
+            )
+        )
+
+        assert [(0, True)] * 5 + [(1, True)] * 5 == sorted(
+            (cluster, ok) for cluster, ok, _ in results
+        )
+        sent = {}
+        for call in bulk.call_args_list:
+            sent.setdefault(self.host(call.args[0]), []).append(
+                call.kwargs["operations"]
+            )
+        assert 3 == len(sent["node-a"]) == len(sent["node-b"])
+        for a, b in zip(sent["node-a"], sent["node-b"]):
+            assert a is b
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    def test_clusters_retry_on_their_own(self, bulk):
+        rejected = set()
+
+        def side_effect(client, operations, **_):
+            host = self.host(client)
+            if host == "node-b" and host not in rejected:
+                rejected.add(host)
+                return bulk_response(201, 429)
+            return bulk_response(*[201] * operations[0].count(b"index"))
+
+        bulk.side_effect = side_effect
+        results = list(
+            helpers.fanout_bulk(
+                self.clients,
+                [{"x": 1}, {"x": 2}],
+                max_retries=1,
+                initial_backoff=0,
+                raise_on_error=False,
+            )
+        )
+
+        assert 4 == len(results)
+        assert all(ok for _, ok, _ in results)
+        assert ["node-a", "node-b", "node-b"] == sorted(
+            self.host(call.args[0]) for call in bulk.call_args_list
+        )
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    def test_error_on_one_cluster_stops_all(self, bulk):
+        bulk.side_effect = lambda client, operations, **_: bulk_response(
+            400 if self.host(client) == "node-b" else 201
+        )
+        with pytest.raises(helpers.BulkIndexError):
+            list(
+                helpers.fanout_bulk(
+                    self.clients, [{"x": i} for i in range(100)], chunk_size=1
+                )
+            )
+
+        assert len(bulk.call_args_list) < 200
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    def test_chunks_dropped_on_error_are_logged(self, bulk, caplog):
+        failed = threading.Event()
+
+        def side_effect(client, operations, **_):
+            if self.host(client) == "node-b":
+                # leave the time for chunks to be queued for both clusters
+                time.sleep(0.1)
+                failed.set()
+                return bulk_response(400)
+            failed.wait()
+            return bulk_response(201)
+
+        bulk.side_effect = side_effect
+        with pytest.raises(helpers.BulkIndexError):
+            list(
+                helpers.fanout_bulk(
+                    self.clients, [{"x": i} for i in range(10)], chunk_size=1
+                )
+            )
+
+        # both clusters had chunks queued when node-b failed
+        assert [0, 1] == [record.args[1] for record in caplog.records]
+        assert all(
+            "chunks were not sent to cluster" in record.getMessage()
+            for record in caplog.records
+        )
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    def test_slow_cluster_holds_back_others_after_max_lag(self, bulk):
+        slow = threading.Event()
+        sent = []
+
+        def side_effect(client, operations, **_):
+            if self.host(client) == "node-b":
+                slow.wait()
+            else:
+                sent.append(operations)
+            return bulk_response(201)
+
+        bulk.side_effect = side_effect
+        results = []
+        consumer = threading.Thread(
+            target=lambda: results.extend(
+                helpers.fanout_bulk(
+                    self.clients, [{"x": i} for i in range(10)], chunk_size=1, max_lag=1
+                )
+            )
+        )
+        consumer.start()
+        time.sleep(0.2)
+        # one chunk sent to the slow cluster, one queued for it
+        assert 3 == len(sent)
+        slow.set()
+        consumer.join()
+        assert 20 == len(results)
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            list(helpers.fanout_bulk([], []))
+        with pytest.raises(ValueError):
+            list(helpers.fanout_bulk(self.clients, [], max_lag=0))
+
+
+class TestBulkFromFile:
+    lines = (
+        b'{"index":{"_id":"1"}}\n{"a":1}\n'
+        b"\n"
+        b'{"delete":{"_id":"2"}}\n'
+        b'{"create":{"_id":"3"}}\n{"a":3}\n'
+        b'{"index":{"_id":"4"}}\n{"a":4}'
+    )
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_file_is_sent_as_is(self, bulk, tmp_path):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[201] * operations[0].count(b"_id")
+        )
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(self.lines)
+
+        assert (4, []) == helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"), path, chunk_size=3
+        )
+        assert [
+            [
+                b'{"index":{"_id":"1"}}\n{"a":1}\n{"delete":{"_id":"2"}}\n'
+                b'{"create":{"_id":"3"}}\n{"a":3}\n'
+            ],
+            [b'{"index":{"_id":"4"}}\n{"a":4}\n'],
+        ] == [call.kwargs["operations"] for call in bulk.call_args_list]
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_chunks_are_bounded_by_bytes(self, bulk, tmp_path):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[201] * operations[0].count(b"_id")
+        )
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(self.lines)
+
+        helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"), path, max_chunk_bytes=60
+        )
+        assert [2, 2] == [
+            call.kwargs["operations"][0].count(b"_id") for call in bulk.call_args_list
+        ]
+
+    @pytest.mark.parametrize("thread_count", [1, 3])
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_errors_report_line_numbers(self, bulk, tmp_path, thread_count):
+        bulk.side_effect = lambda operations, **_: bulk_response(
+            *[400 if b'"a":3' in operations[0] else 201]
+        )
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(self.lines)
+
+        success, errors = helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"),
+            path,
+            chunk_size=1,
+            thread_count=thread_count,
+            raise_on_error=False,
+        )
+        assert 3 == success
+        assert [{"index": {"status": 400, "line": 5}}] == errors
+
+        with pytest.raises(helpers.BulkIndexError):
+            helpers.bulk_from_file(
+                Elasticsearch("http://localhost:9200"),
+                path,
+                chunk_size=1,
+                thread_count=thread_count,
+            )
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk")
+    def test_rejected_items_are_retried(self, bulk, tmp_path):
+        bulk.side_effect = [
+            bulk_response(201, 429, 201),
+            bulk_response(201),
+            bulk_response(201),
+        ]
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(self.lines)
+
+        assert (4, 0) == helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"),
+            path,
+            chunk_size=3,
+            max_retries=1,
+            initial_backoff=0,
+            stats_only=True,
+        )
+        assert [b'{"delete":{"_id":"2"}}\n'] == bulk.call_args_list[1].kwargs[
+            "operations"
+        ]
+
+    @mock.patch(
+        "elasticsearch.Elasticsearch.bulk",
+        side_effect=ApiError(
+            message="Error!",
+            body={},
+            meta=ApiResponseMeta(
+                status=599, headers={}, http_version="1.1", duration=0, node=None
+            ),
+        ),
+    )
+    def test_exceptions_fail_all_items(self, _, tmp_path):
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(self.lines)
+
+        success, errors = helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"),
+            path,
+            raise_on_exception=False,
+            raise_on_error=False,
+        )
+        assert 0 == success
+        assert [1, 4, 5, 7] == [
+            info["line"] for error in errors for info in error.values()
+        ]
+        assert {"_id": "2", "status": 599, "line": 4} == {
+            k: v
+            for k, v in errors[1]["delete"].items()
+            if k in ("_id", "status", "line")
+        }
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(b"")
+        assert (0, []) == helpers.bulk_from_file(
+            Elasticsearch("http://localhost:9200"), path
+        )
+
+    def test_missing_data_line(self, tmp_path):
+        path = tmp_path / "export.ndjson"
+        path.write_bytes(b'{"index":{}}\n')
+        with pytest.raises(ValueError, match="line 1"):
+            helpers.bulk_from_file(Elasticsearch("http://localhost:9200"), path)
+
+
+@pytest.mark.skipif(pa is None, reason="Test requires pyarrow to be available")
+class TestArrowActions:
+    def test_types(self):
+        table = pa.table(
+            {
+                "_id": [1, 2],
+                "_routing": ["r", None],
+                "text": ['a "quoted" \\ word', "line\nbreak\x01"],
+                "count": pa.array([1, None], pa.int32()),
+                "score": [0.5, float("nan")],
+                "flag": [True, None],
+                "at": pa.array(
+                    [datetime(2024, 1, 1, 12, tzinfo=timezone.utc), None],
+                    pa.timestamp("ms", tz="UTC"),
+                ),
+                "vector": pa.array([[0.5, 1.0], None], pa.list_(pa.float32(), 2)),
+                "tags": [["x", None], []],
+                "user": [{"name": "u", "age": None}, None],
+                "category": pa.array(["p", "q"]).dictionary_encode(),
+                "raw": [b"x", None],
+            }
+        )
+
+        assert [
+            (
+                b'{"index":{"_id":1,"routing":"r"}}',
+                {
+                    "text": 'a "quoted" \\ word',
+                    "count": 1,
+                    "score": 0.5,
+                    "flag": True,
+                    "at": "2024-01-01T12:00:00.000Z",
+                    "vector": [0.5, 1.0],
+                    "tags": ["x", None],
+                    "user": {"name": "u"},
+                    "category": "p",
+                    "raw": "eA==",
+                },
+            ),
+            (
+                b'{"index":{"_id":2}}',
+                {"text": "line\nbreak\x01", "tags": [], "category": "q"},
+            ),
+        ] == [
+            (header, json.loads(document))
+            for header, document in helpers.arrow_actions(table)
+        ]
+
+    def test_op_types(self):
+        table = pa.table({"_id": ["a", "b"], "x": [1, 2]})
+
+        assert [(b'{"update":{"_id":"b"}}', b'{"doc":{"x":2}}')] == list(
+            helpers.arrow_actions(table.slice(1), op_type="update")
+        )
+        assert [
+            (b'{"delete":{"_id":"a"}}', None),
+            (b'{"delete":{"_id":"b"}}', None),
+        ] == list(helpers.arrow_actions(table, op_type="delete"))
+
+    def test_sources(self, tmp_path):
+        table = pa.table({"x": list(range(5))})
+        pq.write_table(table, tmp_path / "export.parquet")
+        expected = [(b'{"index":{}}', b'{"x":%d}' % i) for i in range(5)]
+
+        assert expected == list(helpers.arrow_actions(table, batch_size=2))
+        assert expected == list(
+            helpers.arrow_actions(tmp_path / "export.parquet", batch_size=2)
+        )
+        assert expected == list(helpers.arrow_actions(table.to_batches()))
+        if pd is not None:
+            assert expected == list(helpers.arrow_actions(table.to_pandas()))
+
+    @mock.patch("elasticsearch.Elasticsearch.bulk", return_value=bulk_response(201))
+    def test_bulk_from_arrow(self, bulk):
+        assert (1, []) == helpers.bulk_from_arrow(
+            Elasticsearch("http://localhost:9200"),
+            pa.table({"_id": [1], "x": [1]}),
+            index="i",
+        )
+        assert [b'{"index":{"_id":1}}\n{"x":1}\n'] == bulk.call_args.kwargs[
+            "operations"
+        ]
+        assert "i" == bulk.call_args.kwargs["index"]
+
+
+class TestAdaptiveChunkSize:
+    def test_size_is_bounded(self):
+        chunk_size = helpers.AdaptiveChunkSize(
+            initial_chunk_size=100,
+            min_chunk_size=40,
+            max_chunk_size=150,
+            increase_step=100,
+        )
+        chunk_size.record(100, 0.1)
+        assert 150 == chunk_size.chunk_size
+        chunk_size.record(150, 0.1)
+        assert 150 == chunk_size.chunk_size
+        chunk_size.record(150, 0.1, rejected_count=1)
+        assert 75 == chunk_size.chunk_size
+        chunk_size.record(75, 0.1, rejected_count=75)
+        assert 40 == chunk_size.chunk_size
+
+    def test_latency_and_took_decrease_size(self):
+        chunk_size = helpers.AdaptiveChunkSize(initial_chunk_size=100, target_latency=1)
+        chunk_size.record(100, 1.5)
+        assert 50 == chunk_size.chunk_size
+        chunk_size.record(50, 0.5, took=1500)
+        assert 25 == chunk_size.chunk_size
+
+    def test_partial_chunks_do_not_increase_size(self):
+        chunk_size = helpers.AdaptiveChunkSize(initial_chunk_size=100)
+        chunk_size.record(30, 0.1)
+        assert 100 == chunk_size.chunk_size
+
+    def test_rejected_ratio_is_tolerated(self):
+        chunk_size = helpers.AdaptiveChunkSize(
+            initial_chunk_size=100, max_rejected_ratio=0.1
+        )
+        chunk_size.record_response(
+            100,
+            0.1,
+            {
+                "took": 10,
+                "errors": True,
+                "items": [{"index": {"status": 429}}] * 10
+                + [{"index": {"status": 201}}] * 90,
+            },
+        )
+        assert 200 == chunk_size.chunk_size
+        chunk_size.record_error(
+            200,
+            0.1,
+            ApiError(
+                message="Too many requests",
+                body={},
+                meta=ApiResponseMeta(
+                    status=429, headers={}, http_version="1.1", duration=0, node=None
+                ),
+            ),
+        )
+        assert 100 == chunk_size.chunk_size
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            helpers.AdaptiveChunkSize(min_chunk_size=0)
+        with pytest.raises(ValueError):
+            helpers.AdaptiveChunkSize(min_chunk_size=20, max_chunk_size=10)
+        with pytest.raises(ValueError):
+            helpers.AdaptiveChunkSize(decrease_factor=1)
+
+
+class TestBulkCheckpoint:
+    def test_offset_follows_contiguous_acks(self, tmp_path):
+        checkpoint = helpers.BulkCheckpoint(tmp_path / "checkpoint")
+        assert 0 == checkpoint.offset
+        checkpoint.ack(5, 5)
+        checkpoint.ack(15, 5)
+        assert 0 == checkpoint.offset
+        checkpoint.ack(0, 5)
+        assert 10 == checkpoint.offset
+        checkpoint.ack(10, 5)
+        assert 20 == checkpoint.offset
+
+    def test_offset_is_saved_and_reloaded(self, tmp_path):
+        path = tmp_path / "checkpoint"
+        with helpers.BulkCheckpoint(path) as checkpoint:
+            checkpoint.ack(0, 42)
+            # not saved before the interval elapsed
+            assert not path.exists()
+
+        assert 42 == helpers.BulkCheckpoint(path).offset
+        assert not (tmp_path / "checkpoint.tmp").exists()
+
+    def test_offset_is_saved_every_interval(self, tmp_path):
+        path = tmp_path / "checkpoint"
+        checkpoint = helpers.BulkCheckpoint(path, interval=0)
+        checkpoint.ack(0, 7)
+        assert b"7\n" == path.read_bytes()
+
+
+class TestActionCoalescer:
+    def coalesce(self, actions, window=500):
+        coalescer = helpers.ActionCoalescer(window=window)
+        return (
+            list(coalescer.coalesce(map(helpers.expand_action, actions))),
+            coalescer.merged_count,
+        )
+
+    def test_index_replaces_previous_actions(self):
+        actions = [
+            {"_id": 1, "_index": "i", "x": 1},
+            {"_op_type": "update", "_id": 1, "_index": "i", "doc": {"y": 1}},
+            {"_id": 1, "_index": "i", "x": 2},
+        ]
+        assert (
+            [({"index": {"_id": 1, "_index": "i"}}, {"x": 2})],
+            2,
+        ) == self.coalesce(actions)
+
+    def test_updates_are_merged(self):
+        actions = [
+            {"_id": 1, "x": {"a": 1, "b": 1}},
+            {"_op_type": "update", "_id": 1, "doc": {"x": {"b": 2}, "y": 1}},
+            {"_op_type": "update", "_id": 2, "doc": {"x": 1}, "doc_as_upsert": True},
+            {"_op_type": "update", "_id": 2, "doc": {"y": 1}, "doc_as_upsert": True},
+            {"_op_type": "update", "_id": 2, "doc": {"z": 1}},
+        ]
+        assert (
+            [
+                ({"index": {"_id": 1}}, {"x": {"a": 1, "b": 2}, "y": 1}),
+                (
+                    {"update": {"_id": 2}},
+                    {"doc": {"x": 1, "y": 1}, "doc_as_upsert": True},
+                ),
+                ({"update": {"_id": 2}}, {"doc": {"z": 1}}),
+            ],
+            2,
+        ) == self.coalesce(actions)
+
+    def test_actions_are_not_merged_past_others(self):
+        actions = [
+            {"_id": 1, "x": 1},
+            {"_op_type": "delete", "_id": 1},
+            {"_id": 1, "x": 2},
+            {"_op_type": "update", "_id": 1, "script": {"source": "..."}},
+            {"_op_type": "update", "_id": 1, "doc": {"x": 3}},
+            {"_id": 1, "_routing": "r", "x": 4},
+            {"x": 5},
+            {"x": 6},
+        ]
+        assert (
+            list(map(helpers.expand_action, actions)),
+            0,
+        ) == self.coalesce(actions)
+
+    def test_window(self):
+        actions = [{"_id": i % 2, "x": i} for i in range(7)]
+        assert (
+            [
+                ({"index": {"_id": 0}}, {"x": 2}),
+                ({"index": {"_id": 1}}, {"x": 1}),
+                ({"index": {"_id": 1}}, {"x": 5}),
+                ({"index": {"_id": 0}}, {"x": 4}),
+                ({"index": {"_id": 0}}, {"x": 6}),
+            ],
+            2,
+        ) == self.coalesce(actions, window=3)
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            helpers.ActionCoalescer(window=0)
+
+
+class TestShardRouting:
+    @pytest.mark.parametrize(
+        "routing, expected",
+        [
+            # from Elasticsearch's Murmur3HashFunctionTests
+            ("hell", 0x5A0CB7C3),
+            ("hello", 0xD7C31989),
+            ("hello w", 0x22AB2984),
+            ("hello wo", 0xDF0CA123),
+            ("hello wor", 0xE7744D61),
+            ("The quick brown fox jumps over the lazy dog", 0xE07DB09C),
+            ("The quick brown fox jumps over the lazy cog", 0x4E63D2AD),
+        ],
+    )
+    def test_routing_hash_matches_elasticsearch(self, routing, expected):
+        assert expected == helpers.routing._murmur3_32(routing.encode("utf-16-le"))
+
+    def test_shard_id(self):
+        # 0xd7c31989 is negative as a signed int
+        assert 4 == helpers.routing._shard_id("hello", 5, 640)
+        assert 1 == helpers.routing._shard_id("hell", 5, 640)
+        assert 0 == helpers.routing._shard_id("hello", 1, 1024)
+
+    @mock.patch.object(Elasticsearch, "bulk", autospec=True)
+    @mock.patch.object(
+        Elasticsearch,
+        "search_shards",
+        return_value={
+            "shards": [
+                [
+                    {
+                        "index": "i",
+                        "shard": 0,
+                        "node": "a",
+                        "primary": True,
+                        "state": "STARTED",
+                    },
+                    {
+                        "index": "i",
+                        "shard": 0,
+                        "node": "b",
+                        "primary": False,
+                        "state": "STARTED",
+                    },
+                ],
+                [
+                    {
+                        "index": "i",
+                        "shard": 1,
+                        "node": "b",
+                        "primary": True,
+                        "state": "STARTED",
+                    }
+                ],
+            ]
+        },
+    )
+    @mock.patch(
+        "elasticsearch._sync.client.cluster.ClusterClient.state",
+        return_value={
+            "metadata": {
+                "indices": {
+                    "i": {
+                        "routing_num_shards": 2,
+                        "settings": {"index": {"number_of_shards": "2"}},
+                    }
+                }
+            }
+        },
+    )
+    @mock.patch(
+        "elasticsearch._sync.client.nodes.NodesClient.info",
+        return_value={
+            "nodes": {
+                "a": {"http": {"publish_address": "10.0.0.1:9200"}},
+                "b": {"http": {"publish_address": "es-b/10.0.0.2:9201"}},
+            }
+        },
+    )
+    def test_documents_are_sent_to_their_primary_node(self, info, state, _, bulk):
+        hosts = []
+
+        def bulk_side_effect(client, operations, **kwargs):
+            node = client.transport.node_pool.all()[0].config
+            hosts.append((f"{node.host}:{node.port}", operations[0]))
+            return bulk_response(*[201] * operations[0].count(b"{}"))
+
+        bulk.side_effect = bulk_side_effect
+        actions = [{"_id": i, "_source": {}} for i in range(1, 11)]
+        actions.append({"_source": {}})
+        results = list(
+            helpers.streaming_bulk(
+                Elasticsearch("http://localhost:9200"),
+                actions,
+                index="i",
+                chunk_size=3,
+                shard_routing=True,
+            )
+        )
+
+        assert 11 == len(results)
+        assert [
+            (
+                "es-b:9201",
+                b'{"index":{"_id":1}}\n{}\n'
+                b'{"index":{"_id":2}}\n{}\n'
+                b'{"index":{"_id":4}}\n{}\n',
+            ),
+            (
+                "10.0.0.1:9200",
+                b'{"index":{"_id":3}}\n{}\n'
+                b'{"index":{"_id":7}}\n{}\n'
+                b'{"index":{"_id":8}}\n{}\n',
+            ),
+            (
+                "es-b:9201",
+                b'{"index":{"_id":5}}\n{}\n'
+                b'{"index":{"_id":6}}\n{}\n'
+                b'{"index":{"_id":10}}\n{}\n',
+            ),
+            ("10.0.0.1:9200", b'{"index":{"_id":9}}\n{}\n'),
+            ("localhost:9200", b'{"index":{}}\n{}\n'),
+        ] == hosts
+        # the layout is resolved once
+        assert 1 == state.call_count
+        assert 1 == info.call_count
+
+    @mock.patch.object(Elasticsearch, "bulk", return_value=bulk_response(201, 201))
+    @mock.patch(
+        "elasticsearch._sync.client.cluster.ClusterClient.state",
+        side_effect=ApiError(
+            "security_exception",
+            meta=ApiResponseMeta(
+                status=403, headers={}, http_version="1.1", duration=0, node=None
+            ),
+            body={},
+        ),
+    )
+    def test_documents_of_unknown_layouts_are_sent_to_any_node(self, state, bulk):
+        actions = [{"_id": 1, "_index": "i"}, {"_id": 2, "_index": "i"}]
+        results = list(
+            helpers.streaming_bulk(
+                Elasticsearch("http://localhost:9200"), actions, shard_routing=True
+            )
+        )
+
+        assert [True, True] == [ok for ok, _ in results]
+        assert 1 == bulk.call_count
+        # unroutable indices are remembered as such
+        assert 1 == state.call_count
+
+    @mock.patch.object(Elasticsearch, "bulk", return_value=bulk_response(201, 201))
+    def test_resolving_layouts_is_not_serialization_time(self, bulk):
+        def state(**_):
+            time.sleep(0.2)
+            raise ApiError(
+                "security_exception",
+                meta=ApiResponseMeta(
+                    status=403, headers={}, http_version="1.1", duration=0, node=None
+                ),
+                body={},
+            )
+
+        stats = []
+        with mock.patch(
+            "elasticsearch._sync.client.cluster.ClusterClient.state",
+            side_effect=state,
+        ):
+            list(
+                helpers.streaming_bulk(
+                    Elasticsearch("http://localhost:9200"),
+                    [{"_id": 1, "_index": "i"}, {"_id": 2, "_index": "i"}],
+                    shard_routing=True,
+                    on_chunk_complete=stats.append,
+                )
+            )
+
+        assert 1 == len(stats)
+        assert stats[0].serialization_time < 0.1
+
+    def test_unreachable_nodes_are_not_used_anymore(self):
+        router = helpers.routing._ShardRouter(Elasticsearch("http://localhost:9200"))
+        router.layouts["i"] = (1, 1, ["a"])
+        router.node_addresses["a"] = ("10.0.0.1", 9200)
+        node_client = router.client_for(("10.0.0.1", 9200))
+        assert ("10.0.0.1", 9200) == router.node_for("i", "1")
+        assert not router.refresh()
+
+        # the node was marked dead by the transport of its client
+        node_client.transport.node_pool.node_selector.fell_back = True
+        assert router.refresh()
+        assert {} == router.layouts
+        router.layouts["i"] = (1, 1, ["a"])
+        router.node_addresses["a"] = ("10.0.0.1", 9200)
+        assert router.node_for("i", "1") is None
+        router.close()
+
+    def test_node_clients_keep_transport_options(self):
+        transport = Transport(
+            [NodeConfig("http", "localhost", 9200)],
+            dead_node_backoff_factor=2.0,
+            max_dead_node_backoff=60.0,
+            max_retries=7,
+            retry_on_status=(503,),
+            retry_on_timeout=True,
+            sniff_on_node_failure=True,
+            sniff_callback=lambda *_: [],
+        )
+        router = helpers.routing._ShardRouter(Elasticsearch(_transport=transport))
+        node_transport = router.client_for(("10.0.0.1", 9200)).transport
+
+        assert 7 == node_transport.max_retries
+        assert (503,) == node_transport.retry_on_status
+        assert node_transport.retry_on_timeout
+        assert node_transport._sniff_on_node_failure
+        assert 2.0 == node_transport.node_pool.dead_node_backoff_factor
+        assert 60.0 == node_transport.node_pool.max_dead_node_backoff
+        router.close()
+
 
 class TestChunkActions:
     def setup_method(self, _):
@@ -156,6 +1596,37 @@ class TestChunkActions:
             {"_source": {"key2": "val2"}, "key": "val", "_op_type": "update"}
         ) == ({"update": {}}, {"key2": "val2"})
 
+    def test_expand_action_serialized(self):
+        assert helpers.expand_action((b'{"index":{}}', b'{"key":"val"}')) == (
+            b'{"index":{}}',
+            b'{"key":"val"}',
+        )
+        assert helpers.expand_action((b'{"delete":{"_id":"id"}}', None)) == (
+            b'{"delete":{"_id":"id"}}',
+            None,
+        )
+
+    def test_ndjson_actions(self):
+        assert [
+            (b'{"create":{"_id":"delete"}}', b'{"delete":true}'),
+            (b'{"delete":{"_id":"id"}}', None),
+            (b'{"index":{}}', b'{"key":"val"}'),
+        ] == list(
+            helpers.ndjson_actions(
+                [
+                    b'{"create":{"_id":"delete"}}\n',
+                    b'{"delete":true}\r\n',
+                    b'{"delete":{"_id":"id"}}\n',
+                    b'{"index":{}}\n',
+                    b'{"key":"val"}',
+                ]
+            )
+        )
+
+    def test_ndjson_actions_missing_data_line(self):
+        with pytest.raises(ValueError, match="missing its data line"):
+            list(helpers.ndjson_actions([b'{"index":{}}\n']))
+
     def test_chunks_are_chopped_by_byte_size(self):
         assert 100 == len(
             list(helpers._chunk_actions(self.actions, 100000, 1, JSONSerializer()))
@@ -178,6 +1649,85 @@ class TestChunkActions:
             chunk = b"".join(chunk_actions)
             assert len(chunk) <= max_byte_size
 
+    def test_chunks_are_chopped_by_compressed_size(self):
+        actions = [
+            ({"index": {}}, {"i": i, "text": " ".join(map(str, range(i % 50, 100)))})
+            for i in range(5000)
+        ]
+        max_compressed_size = 10000
+        chunks = list(
+            helpers._chunk_actions(
+                actions,
+                100000,
+                99999999,
+                JSONSerializer(),
+                max_chunk_compressed_bytes=max_compressed_size,
+            )
+        )
+        sizes = [len(gzip.compress(chunk_actions[0])) for _, chunk_actions in chunks]
+        assert sum(len(chunk_data) for chunk_data, _ in chunks) == 5000
+        assert max(sizes) <= max_compressed_size
+        # the uncompressed body is well above the limit, chunks are filled up
+        # to what a faster compression than the transport's still fits
+        assert min(sizes[:-1]) >= 0.7 * max_compressed_size
+        assert all(len(chunk_actions[0]) > 50000 for _, chunk_actions in chunks[:-1])
+
+    @pytest.mark.parametrize(
+        "action",
+        [
+            {"index": {}},
+            {"index": {"_index": "i"}},
+            {"index": {"_index": "i", "pipeline": "p", "_id": "1"}},
+            {"create": {"_id": 'é\\"\n', "routing": 5, "_index": "i"}},
+            {"update": {"_index": "i", "_id": 1, "retry_on_conflict": 3}},
+            {"update": {"_index": "i", "_id": 1, "_source": ["a", "b"]}},
+            {"delete": {"_index": "i", "_id": 1, "version": 2, "flag": True}},
+            {"index": {"_index": None, "_id": "1"}},
+        ],
+    )
+    def test_action_lines_match_serializer(self, action):
+        serializer = JSONSerializer()
+        chunker = helpers.actions._ActionChunker(10, 99999999, serializer)
+        # twice to go through the cached template as well
+        for _ in range(2):
+            assert serializer.loads(chunker._dumps_header(action)) == action
+
+    def test_action_line_templates_are_cached(self):
+        serializer = JSONSerializer()
+        chunker = helpers.actions._ActionChunker(100, 99999999, serializer)
+        with mock.patch.object(
+            JSONSerializer, "dumps", side_effect=serializer.dumps
+        ) as dumps:
+            for i in range(10):
+                chunker.feed({"index": {"_index": "i", "_id": str(i)}}, b"{}")
+            chunker.feed({"index": {"_index": "j", "_id": "10"}}, b"{}")
+        assert 2 == dumps.call_count
+        assert [b'{"index":{"_index":"i","_id":"%d"}}' % i for i in range(10)] + [
+            b'{"index":{"_index":"j","_id":"10"}}'
+        ] == chunker.buffer[::4]
+
+    def test_action_lines_of_custom_serializers(self):
+        class SpacedSerializer(JSONSerializer):
+            def dumps(self, data):
+                return json.dumps(data).encode()
+
+        chunker = helpers.actions._ActionChunker(10, 99999999, SpacedSerializer())
+        assert b'{"index": {"_index": "i", "_id": "1"}}' == chunker._dumps_header(
+            {"index": {"_index": "i", "_id": "1"}}
+        )
+
+    def test_chunks_are_assembled_into_a_single_body(self):
+        chunks = list(
+            helpers._chunk_actions(self.actions[:2], 10, 99999999, JSONSerializer())
+        )
+        assert 1 == len(chunks)
+        chunk_data, chunk_actions = chunks[0]
+        assert chunk_data == self.actions[:2]
+        assert [
+            '{"index":{}}\n{"some":"datá","i":0}\n'
+            '{"index":{}}\n{"some":"datá","i":1}\n'.encode()
+        ] == chunk_actions
+
 
 class TestExpandActions:
     @pytest.mark.parametrize("action", ["whatever", b"whatever"])
@@ -185,6 +1735,476 @@ class TestExpandActions:
         assert ({"index": {}}, b"whatever") == helpers.expand_action(action)
 
 
+class SlicedScroll:
+    """Mock of the scroll apis serving 3 hits per slice, 2 per page, with
+    shard failures for the slices in ``failing``."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.remaining = {}
+        self.cleared = []
+
+    def page(self, slice_id):
+        hits = self.remaining[slice_id]
+        self.remaining[slice_id] = hits[2:]
+        return {
+            "_scroll_id": f"scroll-{slice_id}",
+            "_shards": {"total": 2, "successful": 1 if slice_id in self.failing else 2},
+            "hits": {"hits": hits[:2]},
+        }
+
+    def search(self, slice, **_):
+        self.remaining[slice["id"]] = [{"_id": f"{slice['id']}-{i}"} for i in range(3)]
+        return self.page(slice["id"])
+
+    def scroll(self, scroll_id, **_):
+        return self.page(int(scroll_id[7:]))
+
+    def clear_scroll(self, scroll_id):
+        self.cleared.append(int(scroll_id[7:]))
+
+
+class TestParallelScan:
+    def scan(self, scroll, **kwargs):
+        client = Elasticsearch("http://localhost:9200")
+        with mock.patch.object(
+            Elasticsearch, "search", side_effect=scroll.search
+        ), mock.patch.object(
+            Elasticsearch, "scroll", side_effect=scroll.scroll
+        ), mock.patch.object(
+            Elasticsearch, "clear_scroll", side_effect=scroll.clear_scroll
+        ):
+            yield from helpers.parallel_scan(client, size=2, **kwargs)
+
+    def test_hits_of_all_slices_are_yielded(self):
+        scroll = SlicedScroll()
+        hits = list(self.scan(scroll, slices=4, thread_count=2, query={"x": 1}))
+
+        assert sorted(f"{s}-{i}" for s in range(4) for i in range(3)) == sorted(
+            hit["_id"] for hit in hits
+        )
+        assert [0, 1, 2, 3] == sorted(scroll.cleared)
+
+    def test_slices_are_cleared_on_early_exit(self):
+        scroll = SlicedScroll()
+        hits = self.scan(scroll, slices=3, queue_size=1)
+        next(hits)
+        hits.close()
+
+        # every scroll opened is cleared
+        assert sorted(scroll.remaining) == sorted(scroll.cleared)
+
+    def test_slice_error_stops_all_slices(self):
+        scroll = SlicedScroll(failing=(1,))
+        with pytest.raises(helpers.ScanError):
+            list(self.scan(scroll, slices=3))
+
+        assert 1 in scroll.cleared
+        assert sorted(scroll.remaining) == sorted(scroll.cleared)
+
+    def test_slice_error_callback(self):
+        scroll = SlicedScroll(failing=(1,))
+        errors = []
+        hits = list(
+            self.scan(
+                scroll,
+                slices=3,
+                on_slice_error=lambda slice_id, e: errors.append((slice_id, type(e))),
+            )
+        )
+
+        assert [(1, helpers.ScanError)] == errors
+        # the first page of the failing slice is yielded before its shards are checked
+        assert 8 == len(hits)
+
+    def test_point_in_time_requires_an_index(self):
+        with pytest.raises(ValueError, match="point_in_time requires an index"):
+            next(self.scan(SlicedScroll(), point_in_time=True))
+
+
+class TestScanPrefetch:
+    client = Elasticsearch("http://localhost:9200")
+
+    @pytest.fixture(autouse=True)
+    def scroll(self):
+        scroll = SlicedScroll(failing=(1,))
+        with mock.patch.object(
+            Elasticsearch, "search", side_effect=scroll.search
+        ), mock.patch.object(
+            Elasticsearch, "scroll", side_effect=scroll.scroll
+        ), mock.patch.object(
+            Elasticsearch, "clear_scroll", side_effect=scroll.clear_scroll
+        ):
+            yield scroll
+
+    def test_all_hits_are_yielded(self, scroll):
+        hits = helpers.scan(
+            self.client, {"slice": {"id": 0, "max": 2}}, size=2, prefetch=1
+        )
+
+        assert ["0-0", "0-1", "0-2"] == [hit["_id"] for hit in hits]
+        assert [0] == scroll.cleared
+
+    def test_scroll_is_cleared_on_early_exit(self, scroll):
+        hits = helpers.scan(
+            self.client, {"slice": {"id": 0, "max": 2}}, size=2, prefetch=4
+        )
+        next(hits)
+        hits.close()
+
+        assert [0] == scroll.cleared
+
+    def test_shard_failures_are_raised(self, scroll):
+        hits = helpers.scan(
+            self.client, {"slice": {"id": 1, "max": 2}}, size=2, prefetch=1
+        )
+
+        with pytest.raises(helpers.ScanError):
+            list(hits)
+        assert [1] == scroll.cleared
+
+
+class TestScanBatches:
+    def test_hits_are_yielded_by_page(self):
+        scroll = SlicedScroll()
+        with mock.patch.object(
+            Elasticsearch, "search", side_effect=scroll.search
+        ), mock.patch.object(
+            Elasticsearch, "scroll", side_effect=scroll.scroll
+        ), mock.patch.object(
+            Elasticsearch, "clear_scroll", side_effect=scroll.clear_scroll
+        ):
+            pages = list(
+                helpers.scan_batches(
+                    Elasticsearch("http://localhost:9200"),
+                    {"slice": {"id": 0, "max": 2}},
+                    size=2,
+                )
+            )
+
+        assert [["0-0", "0-1"], ["0-2"]] == [
+            [hit["_id"] for hit in hits] for hits in pages
+        ]
+        assert [0] == scroll.cleared
+
+
+@pytest.mark.skipif(pa is None, reason="Test requires pyarrow to be available")
+class TestScanToArrow:
+    client = Elasticsearch("http://localhost:9200")
+    mapping = {
+        "properties": {
+            "title": {"type": "text", "fields": {"raw": {"type": "keyword"}}},
+            "count": {"type": "integer"},
+            "at": {"type": "date"},
+            "user": {"properties": {"name": {"type": "keyword"}}},
+            "location": {"type": "geo_point"},
+        }
+    }
+    hits = [
+        {
+            "_id": "1",
+            "_source": {
+                "title": "a",
+                "count": 1,
+                "at": "2024-01-01T12:00:00Z",
+                "user": {"name": "u"},
+                "location": {"lat": 0, "lon": 0},
+            },
+        },
+        {"_id": "2", "_source": {"at": 1704067200000, "user.name": "v"}},
+        {"_id": "3", "_source": {"at": "2024-01-02"}, "fields": {"count": [3, 4]}},
+    ]
+
+    def scan(self, query=None, **kwargs):
+        with mock.patch.object(
+            Elasticsearch,
+            "search",
+            return_value={
+                "_scroll_id": "scroll",
+                "_shards": {"total": 1, "successful": 1},
+                "hits": {"hits": self.hits},
+            },
+        ) as search, mock.patch.object(
+            Elasticsearch,
+            "scroll",
+            return_value={"_scroll_id": "scroll", "hits": {"hits": []}},
+        ), mock.patch.object(
+            Elasticsearch, "clear_scroll"
+        ), mock.patch(
+            "elasticsearch._sync.client.indices.IndicesClient.get_mapping",
+            return_value={"i": {"mappings": self.mapping}},
+        ):
+            batches = list(helpers.scan_to_arrow(self.client, query, **kwargs))
+        assert "i" == search.call_args.kwargs["index"]
+        return batches
+
+    def test_schema_from_mapping(self):
+        (batch,) = self.scan(index="i")
+
+        assert (
+            pa.schema(
+                [
+                    ("_id", pa.string()),
+                    ("title", pa.string()),
+                    ("count", pa.int32()),
+                    ("at", pa.timestamp("ms", tz="UTC")),
+                    ("user.name", pa.string()),
+                ]
+            )
+            == batch.schema
+        )
+        assert {
+            "_id": ["1", "2", "3"],
+            "title": ["a", None, None],
+            "count": [1, None, 3],
+            "at": [
+                datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+                datetime(2024, 1, 1, tzinfo=timezone.utc),
+                datetime(2024, 1, 2, tzinfo=timezone.utc),
+            ],
+            "user.name": ["u", "v", None],
+        } == batch.to_pydict()
+
+    def test_columns_of_requested_fields(self):
+        (batch,) = self.scan(
+            {"_source": False, "docvalue_fields": [{"field": "c*"}]}, index="i"
+        )
+
+        assert ["_id", "count"] == batch.schema.names
+
+    def test_given_schema(self):
+        schema = pa.schema(
+            [
+                ("_id", pa.string()),
+                ("count", pa.list_(pa.int64())),
+                ("user", pa.struct([("name", pa.string())])),
+            ]
+        )
+        (batch,) = self.scan(schema=schema, index="i")
+
+        assert {
+            "_id": ["1", "2", "3"],
+            "count": [[1], None, [3, 4]],
+            "user": [{"name": "u"}, None, None],
+        } == batch.to_pydict()
+
+    @pytest.mark.skipif(pd is None, reason="Test requires pandas to be available")
+    def test_scan_to_pandas(self):
+        with mock.patch.object(
+            helpers.arrow,
+            "scan_batches",
+            return_value=(hits for hits in [self.hits[:1]]),
+        ):
+            (df,) = helpers.scan_to_pandas(
+                self.client, schema=pa.schema([("title", pa.string())])
+            )
+
+        assert ["a"] == df["title"].tolist()
+
+
+class PointInTime:
+    """Mock of the point in time apis serving ``count`` hits, ``count`` per
+    slice when sliced, with shard failures when ``failing``."""
+
+    def __init__(self, count=5, failing=False, expired=()):
+        self.count = count
+        self.failing = failing
+        self.expired = expired
+        self.searches = []
+        self.closed = []
+
+    def open_point_in_time(self, index, keep_alive):
+        return {"id": "pit-0"}
+
+    def search(self, pit, size, search_after=None, slice=None, **kwargs):
+        self.searches.append(
+            dict(kwargs, pit=pit, size=size, search_after=search_after, slice=slice)
+        )
+        if pit["id"] in self.expired:
+            raise NotFoundError(
+                message="search_context_missing_exception",
+                body={},
+                meta=ApiResponseMeta(
+                    status=404, headers={}, http_version="1.1", duration=0, node=None
+                ),
+            )
+        start = 0 if search_after is None else search_after[0] + 1
+        prefix = "" if slice is None else f"{slice['id']}-"
+        return ObjectApiResponse(
+            meta=ApiResponseMeta(
+                status=200, headers={}, http_version="1.1", duration=0, node=None
+            ),
+            body={
+                "pit_id": "pit-1",
+                "_shards": {"total": 2, "successful": 1 if self.failing else 2},
+                "hits": {
+                    "hits": [
+                        {"_id": f"{prefix}{i}", "sort": [i] * len(kwargs["sort"])}
+                        for i in range(start, min(start + size, self.count))
+                    ]
+                },
+            },
+        )
+
+    def close_point_in_time(self, id):
+        self.closed.append(id)
+
+    @contextlib.contextmanager
+    def patch(self):
+        with mock.patch.object(
+            Elasticsearch, "open_point_in_time", side_effect=self.open_point_in_time
+        ), mock.patch.object(
+            Elasticsearch, "search", side_effect=self.search
+        ), mock.patch.object(
+            Elasticsearch, "close_point_in_time", side_effect=self.close_point_in_time
+        ):
+            yield
+
+
+class TestPitScan:
+    client = Elasticsearch("http://localhost:9200")
+
+    def test_hits_are_paginated_with_search_after(self):
+        pit = PointInTime()
+        with pit.patch():
+            hits = list(
+                helpers.pit_scan(
+                    self.client, {"query": {"match_all": {}}}, index="i", size=2
+                )
+            )
+
+        assert ["0", "1", "2", "3", "4"] == [hit["_id"] for hit in hits]
+        assert [None, [1], [3]] == [search["search_after"] for search in pit.searches]
+        assert [{"id": "pit-0", "keep_alive": "5m"}] + [
+            {"id": "pit-1", "keep_alive": "5m"}
+        ] * 2 == [search["pit"] for search in pit.searches]
+        assert ["_shard_doc"] == pit.searches[0]["sort"]
+        assert {"match_all": {}} == pit.searches[0]["query"]
+        assert not pit.searches[0]["track_total_hits"]
+        assert ["pit-1"] == pit.closed
+
+    @pytest.mark.parametrize(
+        "sort, expected",
+        [
+            ("date", ["date", "_shard_doc"]),
+            ([{"date": "desc"}], [{"date": "desc"}, "_shard_doc"]),
+            (["date", {"_shard_doc": "desc"}], ["date", {"_shard_doc": "desc"}]),
+        ],
+    )
+    def test_shard_doc_tiebreaker(self, sort, expected):
+        pit = PointInTime()
+        with pit.patch():
+            list(helpers.pit_scan(self.client, {"sort": sort}, index="i"))
+
+        assert expected == pit.searches[0]["sort"]
+
+    def test_shard_failures(self):
+        pit = PointInTime(failing=True)
+        with pit.patch():
+            with pytest.raises(helpers.ScanError):
+                list(helpers.pit_scan(self.client, index="i", size=2))
+            assert 5 == len(
+                list(helpers.pit_scan(self.client, index="i", raise_on_error=False))
+            )
+
+        assert ["pit-1", "pit-1"] == pit.closed
+
+    def test_existing_point_in_time_is_not_closed(self):
+        pit = PointInTime()
+        with pit.patch():
+            list(helpers.pit_scan(self.client, pit_id="pit-0"))
+            with pytest.raises(ValueError):
+                list(helpers.pit_scan(self.client))
+
+        assert [] == pit.closed
+
+    def test_cursor_resumes_the_scan(self, tmp_path):
+        pit = PointInTime()
+        path = tmp_path / "cursor"
+        with pit.patch():
+            hits = helpers.pit_scan(
+                self.client,
+                index="i",
+                size=2,
+                cursor=helpers.ScanCursor(path, interval=0),
+            )
+            assert ["0", "1", "2"] == [next(hits)["_id"] for _ in range(3)]
+            hits.close()
+
+            # the point in time is kept to resume from the last page consumed
+            assert {"pit_id": "pit-1", "search_after": [1]} == json.loads(
+                path.read_bytes()
+            )
+            assert [] == pit.closed
+
+            hits = list(
+                helpers.pit_scan(
+                    self.client, index="i", size=2, cursor=helpers.ScanCursor(path)
+                )
+            )
+
+        assert ["2", "3", "4"] == [hit["_id"] for hit in hits]
+        assert [[1], [3]] == [search["search_after"] for search in pit.searches[-2:]]
+        assert ["pit-1"] == pit.closed
+        assert {"pit_id": None, "search_after": [4]} == json.loads(path.read_bytes())
+        assert not (tmp_path / "cursor.tmp").exists()
+
+    def test_expired_point_in_time_is_replaced(self):
+        pit = PointInTime(expired=("pit-x",))
+        cursor = helpers.ScanCursor(pit_id="pit-x", search_after=[1, 7])
+        with pit.patch():
+            hits = list(
+                helpers.pit_scan(
+                    self.client, {"sort": "n"}, index="i", size=2, cursor=cursor
+                )
+            )
+
+        assert ["2", "3", "4"] == [hit["_id"] for hit in hits]
+        # the _shard_doc of another point in time is replaced with one before all
+        assert [[1, 7], [1, -1], [3, 3]] == [
+            search["search_after"] for search in pit.searches
+        ]
+        assert ["pit-x", "pit-0", "pit-1"] == [
+            search["pit"]["id"] for search in pit.searches
+        ]
+        assert (None, [4, 4]) == (cursor.pit_id, cursor.search_after)
+
+    def test_shard_doc_sorted_scan_cant_change_point_in_time(self):
+        pit = PointInTime(expired=("pit-x",))
+        with pit.patch():
+            with pytest.raises(NotFoundError):
+                list(
+                    helpers.pit_scan(
+                        self.client,
+                        index="i",
+                        cursor=helpers.ScanCursor(pit_id="pit-x", search_after=[1]),
+                    )
+                )
+            with pytest.raises(ValueError):
+                list(
+                    helpers.pit_scan(
+                        self.client,
+                        index="i",
+                        cursor=helpers.ScanCursor(search_after=[1]),
+                    )
+                )
+
+    def test_parallel_scan_with_point_in_time(self):
+        pit = PointInTime(count=3)
+        with pit.patch():
+            hits = list(
+                helpers.parallel_scan(
+                    self.client, index="i", slices=2, point_in_time=True, size=2
+                )
+            )
+
+        assert ["0-0", "0-1", "0-2", "1-0", "1-1", "1-2"] == sorted(
+            hit["_id"] for hit in hits
+        )
+        assert {"pit-0", "pit-1"} == {search["pit"]["id"] for search in pit.searches}
+        assert ["pit-0"] == pit.closed
+
+
 def test_serialize_bulk_index_error():
     error = helpers.BulkIndexError("message", [{"error": 1}])
     pickled = pickle.loads(pickle.dumps(error))
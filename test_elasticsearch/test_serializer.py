@@ -38,7 +38,12 @@ import re
 
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import SerializationError
-from elasticsearch.serializer import JSONSerializer, OrjsonSerializer, TextSerializer
+from elasticsearch.serializer import (
+    JSONSerializer,
+    NdjsonSerializer,
+    OrjsonSerializer,
+    TextSerializer,
+)
 
 requires_numpy_and_pandas = pytest.mark.skipif(
     np is None or pd is None, reason="Test requires numpy and pandas to be available"
@@ -207,6 +212,15 @@ def test_text_raises_serialization_error_on_dump_error():
         TextSerializer().dumps({})
 
 
+def test_ndjson_forwards_newline_terminated_bytes_untouched():
+    serializer = NdjsonSerializer()
+    body = b'{"index":{}}\n{"some":"data"}\n'
+    assert serializer.dumps(body) is body
+    assert serializer.dumps([body]) is body
+    assert b'{"some":"data"}\n' == serializer.dumps(b'{"some":"data"}')
+    assert b'{"some":"data"}\n' == serializer.dumps([{"some": "data"}])
+
+
 class TestDeserializer:
     def setup_method(self, _):
         self.serializers = Elasticsearch("http://localhost:9200").transport.serializers
@@ -64,6 +64,8 @@ def main(check=False):
         "AsyncUsingType": "UsingType",
         "async_connections": "connections",
         "async_scan": "scan",
+        "async_pit_scan": "pit_scan",
+        "_aprefetch": "_prefetch",
         "async_simulate": "simulate",
         "async_bulk": "bulk",
         "async_mock_client": "mock_client",
@@ -73,6 +75,7 @@ def main(check=False):
         "async_pull_request": "pull_request",
         "async_examples": "examples",
         "async_sleep": "sleep",
+        "aclose": "close",
         "assert_awaited_once_with": "assert_called_once_with",
         "pytest_asyncio": "pytest",
         "asynccontextmanager": "contextmanager",